@@ -1,48 +1,285 @@
-from typing import Dict, List
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
 
-from irony.config import config, logger
+from pymongo.errors import OperationFailure
+
+from irony.config import config
+from irony.config.cache.cache_config import CacheConfig
+from irony.config.logger import logger
 from irony.db import db
 from irony.exception.WhatsappException import WhatsappException
 from irony.models.message import MessageConfig
 from irony.models.service import Service
+from irony.util import metrics, price_catalog, redis_cache
+from irony.util.message_template import compile_templates
+from irony.util.service_location_index import build_index
 
+CALL_TO_ACTION = "call_to_action"
+SERVICE = "service"
+MESSAGE_CONFIG = "message_config"
+CONFIG = "config"
+SERVICE_LOCATIONS = "service_locations"
+PRICES = "prices"
 
-# Example data-fetching function
-async def fetch_data_from_db(db_cache: Dict):
-    # Simulate a database fetch operation
+# Mongo error code for change streams on a standalone server.
+CHANGE_STREAM_NOT_SUPPORTED = 40573
+
+
+async def load_call_to_action() -> Dict:
     call_to_action_docs = (
         await db.get_collection("call_to_action").find().sort("order", 1).to_list(None)
     )
-    set_call_to_action_cache(call_to_action_docs, db_cache)
+    slices: Dict = {}
+    set_call_to_action_cache(call_to_action_docs, slices)
+    return slices
 
-    config.BUTTONS = db_cache["call_to_action"]
 
-    # additional data fetching as needed
+async def load_services() -> Dict:
     service_docs = await db.get_collection("service").find().to_list(None)
-
-    db_cache["services"] = {
-        doc["call_to_action_key"]: Service(**doc) for doc in service_docs
+    return {
+        "services": {
+            doc["call_to_action_key"]: Service(**doc) for doc in service_docs
+        },
+        "id_to_service_map": {doc["_id"]: Service(**doc) for doc in service_docs},
     }
 
-    db_cache["id_to_service_map"] = {doc["_id"]: Service(**doc) for doc in service_docs}
 
-    # additional data fetching as needed
+async def load_message_configs() -> Dict:
     message_configs = await db.get_collection("message_config").find().to_list(None)
-
-    db_cache["message_config"] = {
-        message_config["message_key"]: MessageConfig(**message_config)
-        for message_config in message_configs
+    return {
+        "message_config": {
+            message_config["message_key"]: MessageConfig(**message_config)
+            for message_config in message_configs
+        }
     }
 
+
+async def load_configs() -> Dict:
     configs = await db.get_collection("config").find().to_list(None)
-    db_cache["config"] = {config["key"]: config for config in configs}
-    db_cache["ordered_time_slots"] = get_time_slots_ordered_list(configs)
+    return {
+        "config": {config["key"]: config for config in configs},
+        "ordered_time_slots": get_time_slots_ordered_list(configs),
+    }
+
+
+async def load_service_locations() -> Dict:
+    service_location_docs = (
+        await db.get_collection("service_locations")
+        .find({"is_active": True})
+        .to_list(None)
+    )
+    return {"service_location_index": build_index(service_location_docs)}
+
+
+async def load_prices() -> Dict:
+    price_docs = (
+        await db.get_collection("prices").find().sort("sort_order", 1).to_list(None)
+    )
+    return price_catalog.build_catalog(price_docs)
+
+
+# Each cached collection and the loader that builds its DB_CACHE slices.
+LOADERS: Dict[str, Callable[[], Awaitable[Dict]]] = {
+    CALL_TO_ACTION: load_call_to_action,
+    SERVICE: load_services,
+    MESSAGE_CONFIG: load_message_configs,
+    CONFIG: load_configs,
+    SERVICE_LOCATIONS: load_service_locations,
+    PRICES: load_prices,
+}
+
+
+def swap_slices(db_cache: Dict, slices: Dict):
+    # Slices are fully built before this point and replaced without awaiting,
+    # so a request never sees a half loaded collection.
+    if "message_config" in slices or "call_to_action" in slices:
+        message_configs = slices.get("message_config", db_cache.get("message_config"))
+        call_to_action = slices.get("call_to_action", db_cache.get("call_to_action"))
+        if message_configs is not None and call_to_action is not None:
+            slices["message_templates"] = compile_templates(
+                message_configs, call_to_action
+            )
+    if "location_service_prices" in slices or "id_to_service_map" in slices:
+        location_service_prices = slices.get(
+            "location_service_prices", db_cache.get("location_service_prices")
+        )
+        id_to_service_map = slices.get(
+            "id_to_service_map", db_cache.get("id_to_service_map")
+        )
+        if location_service_prices is not None and id_to_service_map is not None:
+            slices.update(
+                price_catalog.serialize_location_prices(
+                    location_service_prices, id_to_service_map
+                )
+            )
+    db_cache.update(slices)
+    if "call_to_action" in slices:
+        config.BUTTONS = db_cache["call_to_action"]
+
+
+async def fetch_data_from_db(db_cache: Dict):
+    for collection in LOADERS:
+        swap_slices(db_cache, await LOADERS[collection]())
 
     db_cache["google_maps_link"] = "https://www.google.com/maps/search/?api=1&query="
 
     return db_cache
 
 
+async def reload_collection(collection: str):
+    """
+    Rebuild the DB_CACHE slices of one collection and swap them in.
+
+    Args:
+        collection (str): Name of a collection in LOADERS
+    """
+    start_time = time.perf_counter()
+    slices = await LOADERS[collection]()
+    swap_slices(config.DB_CACHE, slices)
+    metrics.latency("cache.reload").record(time.perf_counter() - start_time)
+    metrics.increment(f"cache.reloaded.{collection}")
+    logger.info(f"Cache reloaded for {collection}")
+
+
+async def bump(*collections: str):
+    """
+    Tell every worker that the given collections changed, so they reload them.
+
+    Args:
+        *collections (str): Names of collections in LOADERS
+    """
+    redis = redis_cache.get_redis()
+    async with redis.pipeline(transaction=True) as pipe:
+        for collection in collections:
+            pipe.hincrby(CacheConfig.VERSIONS_KEY, collection, 1)
+        versions = await pipe.execute()
+    async with redis.pipeline(transaction=False) as pipe:
+        for collection, version in zip(collections, versions):
+            pipe.publish(CacheConfig.BUMP_CHANNEL, f"{collection}:{version}")
+        await pipe.execute()
+    logger.info(f"Cache bumped for {list(zip(collections, versions))}")
+
+
+_local_versions: Dict[str, int] = {}
+_target_versions: Dict[str, int] = {}
+_reload_tasks: Dict[str, asyncio.Task] = {}
+_dirty: Set[str] = set()
+_sync_tasks: List[asyncio.Task] = []
+
+
+def request_reload(collection: str, version: Optional[int] = None):
+    """Reload `collection` in the background, coalescing requests made while a reload runs."""
+    if collection not in LOADERS:
+        return
+    if version is not None:
+        _target_versions[collection] = max(version, _target_versions.get(collection, 0))
+    task = _reload_tasks.get(collection)
+    if task is not None and not task.done():
+        _dirty.add(collection)
+        return
+    _reload_tasks[collection] = asyncio.create_task(_reload(collection))
+
+
+async def _reload(collection: str):
+    while True:
+        _dirty.discard(collection)
+        target = _target_versions.get(collection)
+        try:
+            await reload_collection(collection)
+            if target is not None:
+                _local_versions[collection] = max(
+                    target, _local_versions.get(collection, 0)
+                )
+        except Exception as e:
+            # The version is left behind, so the next poll retries the reload.
+            metrics.increment("cache.reload_failed")
+            logger.error(f"Error reloading cache for {collection}: {e}")
+        if collection not in _dirty:
+            return
+
+
+async def _read_versions() -> Dict[str, int]:
+    versions = await redis_cache.get_redis().hgetall(CacheConfig.VERSIONS_KEY)
+    return {collection: int(version) for collection, version in versions.items()}
+
+
+async def _poll_versions():
+    while True:
+        await asyncio.sleep(CacheConfig.VERSION_POLL_INTERVAL_SECONDS)
+        try:
+            for collection, version in (await _read_versions()).items():
+                if version > _local_versions.get(collection, 0):
+                    request_reload(collection, version)
+        except Exception as e:
+            logger.error(f"Error polling cache versions: {e}")
+
+
+async def _listen_for_bumps():
+    while True:
+        pubsub = redis_cache.get_redis().pubsub()
+        try:
+            await pubsub.subscribe(CacheConfig.BUMP_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                collection, _, version = message["data"].rpartition(":")
+                request_reload(collection, int(version))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Cache bump listener failed, resubscribing: {e}")
+            await asyncio.sleep(CacheConfig.VERSION_POLL_INTERVAL_SECONDS)
+        finally:
+            await pubsub.aclose()
+
+
+async def _watch_change_streams():
+    pipeline = [{"$match": {"ns.coll": {"$in": list(LOADERS.keys())}}}]
+    while True:
+        try:
+            async with db.watch(pipeline=pipeline) as stream:
+                async for change in stream:
+                    request_reload(change["ns"]["coll"])
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAM_NOT_SUPPORTED:
+                logger.info(f"Change streams unavailable, relying on cache bumps: {e}")
+                return
+            logger.error(f"Cache change stream failed, rewatching: {e}")
+            await asyncio.sleep(CacheConfig.CHANGE_STREAM_RETRY_SECONDS)
+        except Exception as e:
+            logger.error(f"Cache change stream failed, rewatching: {e}")
+            await asyncio.sleep(CacheConfig.CHANGE_STREAM_RETRY_SECONDS)
+
+
+async def start_sync():
+    """
+    Start following cache bumps and change streams. Call before the first
+    fetch_data_from_db so a bump racing the initial load is not missed.
+    """
+    try:
+        _local_versions.update(await _read_versions())
+    except Exception as e:
+        logger.error(f"Unable to read cache versions, polling will catch up: {e}")
+
+    _sync_tasks.append(asyncio.create_task(_poll_versions()))
+    _sync_tasks.append(asyncio.create_task(_listen_for_bumps()))
+    if CacheConfig.WATCH_CHANGE_STREAMS:
+        _sync_tasks.append(asyncio.create_task(_watch_change_streams()))
+    logger.info("Cache sync started")
+
+
+async def stop_sync():
+    tasks = _sync_tasks + list(_reload_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _sync_tasks.clear()
+    _reload_tasks.clear()
+
+
 def get_time_slots_ordered_list(config_docs: List[Dict]):
     time_slot_docs = [
         config_doc
@@ -0,0 +1,9 @@
+class AgentCacheConfig:
+    # Agents resolved from the token's mobile number are kept in process for
+    # this long, bounding how stale one can be if an invalidation is missed.
+    TTL_SECONDS: float = 60.0
+    MAX_SIZE: int = 10_000
+    # Drop cached agents on Mongo change streams on service_agent (needs a
+    # replica set, the TTL alone applies otherwise).
+    WATCH_CHANGE_STREAM: bool = True
+    CHANGE_STREAM_RETRY_SECONDS: float = 5.0
@@ -1,3 +1,15 @@
 class AuthConfig:
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
     MIN_PASSWORD_LENGTH: int = 8
+
+    # bcrypt cost of new hashes, stored hashes below it are rehashed on login.
+    BCRYPT_ROUNDS: int = 12
+    # Passwords are hashed and verified off the event loop in a dedicated pool
+    # of this many workers per process. Threads suffice as bcrypt releases the
+    # GIL, processes also isolate a backend that does not.
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_USE_PROCESSES: bool = False
+    # Hashes waiting for a worker beyond this are refused with a 503, so a
+    # login burst queues no further than it can drain.
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
@@ -0,0 +1,9 @@
+class OrderListConfig:
+    # Orders per page of the agent order lists when the client sends no limit,
+    # keeps a busy laundry's dashboard from loading its whole history.
+    DEFAULT_PAGE_SIZE: int = 500
+    MAX_PAGE_SIZE: int = 2000
+
+    # Groups read from mongo per round trip when an order list is streamed, one
+    # so that no more than a group is held while it is being sent.
+    STREAM_BATCH_SIZE: int = 1
@@ -0,0 +1,10 @@
+class CacheConfig:
+    # Redis hash of collection -> version, bumped whenever a cached collection changes.
+    VERSIONS_KEY: str = "irony:cache:versions"
+    # Channel on which "<collection>:<version>" is published after a bump.
+    BUMP_CHANNEL: str = "irony:cache:bumped"
+    # Fallback for missed pub/sub messages, workers converge within this interval.
+    VERSION_POLL_INTERVAL_SECONDS: float = 1.0
+    # Also reload on Mongo change streams (needs a replica set, disabled automatically otherwise).
+    WATCH_CHANGE_STREAMS: bool = True
+    CHANGE_STREAM_RETRY_SECONDS: float = 5.0
@@ -0,0 +1,7 @@
+class IndexConfig:
+    # Create the registered indexes when the app starts (idempotent).
+    ENSURE_ON_STARTUP: bool = True
+    # explain() every registered query when the app starts.
+    VERIFY_ON_STARTUP: bool = False
+    # Refuse to start when a registered query plan contains a COLLSCAN.
+    FAIL_ON_COLLSCAN: bool = True
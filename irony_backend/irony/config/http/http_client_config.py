@@ -0,0 +1,24 @@
+class HttpClientConfig:
+    HTTP2: bool = True
+    MAX_CONNECTIONS: int = 20
+    MAX_KEEPALIVE_CONNECTIONS: int = 10
+    KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    TIMEOUT_SECONDS: float = 10.0
+    CONNECT_TIMEOUT_SECONDS: float = 5.0
+    MAX_CONCURRENCY_PER_HOST: int = 50
+
+
+class WhatsappClientConfig(HttpClientConfig):
+    # Graph API allows many concurrent streams over one HTTP/2 connection.
+    MAX_CONNECTIONS: int = 10
+    MAX_KEEPALIVE_CONNECTIONS: int = 10
+    MAX_CONCURRENCY_PER_HOST: int = 80
+
+
+class OsrmClientConfig(HttpClientConfig):
+    # OSRM serves HTTP/1.1 only, keep-alive connections are reused instead.
+    HTTP2: bool = False
+    MAX_CONNECTIONS: int = 20
+    MAX_KEEPALIVE_CONNECTIONS: int = 20
+    TIMEOUT_SECONDS: float = 30.0
+    MAX_CONCURRENCY_PER_HOST: int = 20
@@ -0,0 +1,10 @@
+class MatchingConfig:
+    # Find candidate service locations in the in-memory index kept in DB_CACHE,
+    # the $geoNear pipeline is used when disabled or before the index is loaded.
+    USE_SERVICE_LOCATION_INDEX: bool = True
+
+    # create_order_requests matches due orders together, one distance matrix
+    # and one insert for the whole batch instead of a pipeline per order.
+    BATCH_MATCHING: bool = True
+    # Orders per orders x locations matrix, bounds memory for large bursts.
+    BATCH_CHUNK_SIZE: int = 256
@@ -0,0 +1,57 @@
+from typing import List
+
+from irony.models.order_status_enum import OrderStatusEnum
+
+
+class OrderViewConfig:
+    # Serve the agent dashboards from per service location views kept in redis,
+    # the aggregation pipelines are used when disabled or while no view is built.
+    ENABLED: bool = True
+
+    # Hash per service location of order id -> order JSON, under this prefix.
+    VIEW_KEY_PREFIX: str = "irony:order_view:"
+    # Hash per service location of order id -> the order's summary JSON.
+    SUMMARY_KEY_PREFIX: str = "irony:order_view_summary:"
+    # Sorted set per service location and latest status of the orders, ordered
+    # by pickup start then id, read a page at a time.
+    INDEX_KEY_PREFIX: str = "irony:order_view_index:"
+    # Hash of order id -> service location id of the view holding the order.
+    LOCATIONS_KEY: str = "irony:order_view_locations"
+    # Hash of order id -> version of the order last applied to the views.
+    VERSIONS_KEY: str = "irony:order_view_versions"
+    # Hash of order id -> the index key and member of the order.
+    INDEX_MEMBERS_KEY: str = "irony:order_view_index_members"
+    # Orders updated since the last rebuild, re-applied after it.
+    TOUCHED_KEY: str = "irony:order_view_touched"
+    # Present while the views are complete, dropped when an update fails.
+    READY_KEY: str = "irony:order_view_ready"
+
+    # Views are rebuilt from mongo on this interval, correcting anything missed.
+    REBUILD_INTERVAL_MINUTES: int = 10
+    # Views not rebuilt for this long, e.g. with no scheduler leader, are not used.
+    READY_TTL_SECONDS: int = 3 * REBUILD_INTERVAL_MINUTES * 60
+
+    # Only allotted orders in these statuses are kept, the views hold what the
+    # dashboards show and nothing delivered or closed.
+    STATUSES: List[OrderStatusEnum] = [
+        OrderStatusEnum.PICKUP_PENDING,
+        OrderStatusEnum.PICKUP_USER_NO_RESP,
+        OrderStatusEnum.PICKUP_USER_REJECTED,
+        OrderStatusEnum.PICKUP_COMPLETE,
+        OrderStatusEnum.WORK_IN_PROGRESS,
+        OrderStatusEnum.WORK_DONE,
+        OrderStatusEnum.TO_BE_DELIVERED,
+        OrderStatusEnum.DELIVERY_PENDING,
+        OrderStatusEnum.DELIVERY_ATTEMPTED,
+    ]
+
+    # Publish a delta on every view update, pushed to the agents' live order
+    # streams. Needs ENABLED, the deltas come from the view updates.
+    EVENTS_ENABLED: bool = True
+    # Channel per service location the deltas are published on.
+    EVENTS_CHANNEL_PREFIX: str = "irony:order_events:"
+    # Deltas held for a slow client before it is told to reload instead.
+    EVENTS_QUEUE_SIZE: int = 256
+    # Comment line sent on idle streams so proxies keep the connection open.
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    EVENTS_RETRY_SECONDS: float = 1.0
@@ -0,0 +1,12 @@
+class RedisConfig:
+    HOST: str = "redis"
+    PORT: int = 6379
+    DB: int = 0
+    MAX_CONNECTIONS: int = 50
+    SOCKET_TIMEOUT_SECONDS: float = 2.0
+    SOCKET_CONNECT_TIMEOUT_SECONDS: float = 2.0
+
+    # Webhook message ids are remembered this long to drop Meta's retries.
+    MESSAGE_ID_TTL_SECONDS: int = 10
+    # In-process front cache of recently seen message ids.
+    LOCAL_MESSAGE_ID_CACHE_SIZE: int = 10000
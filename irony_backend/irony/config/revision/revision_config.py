@@ -0,0 +1,9 @@
+class RevisionConfig:
+    # Hash of "<kind>:<service location id>" -> revision, bumped on every change
+    # to that location's orders, and "<kind>" -> a generation token replaced
+    # whenever changes may have been missed.
+    REVISIONS_KEY: str = "irony:revisions"
+
+    # Routed lists change as orders come within the delivery time gap, so their
+    # ETags also change on this interval.
+    ROUTED_ETAG_INTERVAL_SECONDS: int = 60
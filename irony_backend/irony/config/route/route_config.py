@@ -0,0 +1,31 @@
+class RouteConfig:
+    # "osrm" or "local" (in-process solver), requests may pick one themselves.
+    ENGINE: str = "osrm"
+    # Route with the local solver when OSRM errors or misses its deadline.
+    FALLBACK_TO_LOCAL: bool = True
+    OSRM_DEADLINE_SECONDS: float = 3.0
+    # Time the local solver may spend improving a route after construction.
+    LOCAL_TIME_BUDGET_SECONDS: float = 0.005
+    # Date/time slot groups of one request are routed concurrently, those not
+    # done by the deadline are returned unsorted and flagged.
+    GROUP_ROUTING_CONCURRENCY: int = 4
+    GROUP_ROUTING_DEADLINE_SECONDS: float = 5.0
+    # Solve every agent's delivery groups in the background, before they ask.
+    PRECOMPUTE_ROUTES: bool = True
+
+    # Solved /trip results keyed by their stop set, road data rarely changes.
+    TRIP_CACHE_SIZE: int = 1000
+    TRIP_CACHE_TTL_SECONDS: int = 3600
+    # Also keep solved trips in redis so every worker reuses them.
+    SHARE_TRIPS_IN_REDIS: bool = True
+    TRIP_KEY_PREFIX: str = "irony:osrm:trip:"
+
+    # Pairwise /table durations and distances between stops.
+    MATRIX_CACHE_SIZE: int = 50000
+    MATRIX_CACHE_TTL_SECONDS: int = 3600
+
+    # A stop set that is a cached trip plus one stop is solved by inserting the
+    # new stop where it adds the least duration, without calling /trip.
+    INSERT_INTO_CACHED_TRIP: bool = True
+    # Insertion drifts from the optimum, /trip re-solves after this many.
+    MAX_INSERTED_STOPS: int = 3
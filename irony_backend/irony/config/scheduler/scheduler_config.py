@@ -0,0 +1,19 @@
+class SchedulerConfig:
+    # Mongo collection holding one lease document per lock name.
+    LEASE_COLLECTION: str = "scheduler_lease"
+
+    # Only the worker holding this lease runs the scheduler.
+    LEADER_LEASE_NAME: str = "scheduler_leader"
+    LEADER_LEASE_TTL_SECONDS: int = 30
+    # Followers retry and the leader renews at this interval.
+    LEADER_RENEW_INTERVAL_SECONDS: float = 10.0
+
+    # Held while a single job runs, renewed every third of the TTL.
+    JOB_LEASE_TTL_SECONDS: int = 60
+
+    # Redis sorted set of "<kind>:<id>" scored by trigger time (epoch seconds).
+    DELAY_QUEUE_KEY: str = "irony:delay_queue"
+    # Longest the dispatcher sleeps, also bounds how late an item added by
+    # another worker can fire.
+    DELAY_QUEUE_MAX_IDLE_SECONDS: float = 0.25
+    DELAY_QUEUE_BATCH_SIZE: int = 100
@@ -0,0 +1,21 @@
+class OutboundQueueConfig:
+    ENABLED: bool = True
+    BACKEND: str = "redis"  # "redis" or "memory" (single process, used in tests)
+    KEY_PREFIX: str = "irony:outbound"
+    WORKER_COUNT: int = 8
+    MAX_QUEUE_SIZE: int = 10000
+    ENQUEUE_TIMEOUT_SECONDS: float = 5.0
+    POLL_INTERVAL_SECONDS: float = 0.1
+    VISIBILITY_TIMEOUT_SECONDS: int = 60
+    DRAIN_TIMEOUT_SECONDS: float = 5.0
+
+    # Shared by every worker sending from the same WhatsApp phone number id.
+    MESSAGES_PER_SECOND_PER_SENDER: float = 20.0
+    BURST_PER_SENDER: int = 40
+
+    MAX_ATTEMPTS: int = 5
+    RETRY_BASE_DELAY_SECONDS: float = 1.0
+    RETRY_MAX_DELAY_SECONDS: float = 60.0
+
+    LAST_MESSAGE_BATCH_SIZE: int = 100
+    LAST_MESSAGE_FLUSH_INTERVAL_SECONDS: float = 0.05
@@ -0,0 +1,17 @@
+class WebhookConfig:
+    # When enabled the webhook only validates, dedupes and enqueues messages and
+    # answers Meta straight away; the conversation flow runs in the background.
+    ASYNC_PROCESSING: bool = True
+    # Messages of one wa_id are queued in redis and drained by one worker at a
+    # time, so they run one at a time in arrival order across every worker and
+    # host. Messages of different users run in parallel up to this limit per
+    # worker.
+    MAX_CONCURRENCY: int = 32
+    MAX_QUEUE_SIZE: int = 10000
+    DRAIN_TIMEOUT_SECONDS: float = 5.0
+
+    KEY_PREFIX: str = "irony:webhook"
+    # A worker's claim on a wa_id's queue, extended with every message it takes.
+    # Queues whose worker died are drained by another once the claim expires.
+    CLAIM_TTL_SECONDS: float = 60.0
+    SWEEP_INTERVAL_SECONDS: float = 5.0
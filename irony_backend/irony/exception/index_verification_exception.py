@@ -0,0 +1,13 @@
+from typing import Dict, List
+
+
+class IndexVerificationException(Exception):
+    """Raised when registered queries are not served by an index"""
+
+    def __init__(self, failures: Dict[str, List[str]]):
+        self.failures = failures
+        details = "; ".join(
+            f"{query_name}: {', '.join(problems)}"
+            for query_name, problems in failures.items()
+        )
+        super().__init__(f"Query plan verification failed for {details}")
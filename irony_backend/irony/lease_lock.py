@@ -0,0 +1,183 @@
+import asyncio
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from irony.config.logger import logger
+from irony.config.scheduler.scheduler_config import SchedulerConfig
+from irony.db import db
+
+# Identifies this worker process across hosts.
+OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseLockError(Exception):
+    pass
+
+
+class LeaseLostError(Exception):
+    pass
+
+
+class LeaseLock:
+    """Cluster wide lock stored in Mongo with an expiry and a fencing token.
+
+    Expiry is evaluated with the Mongo server clock ($$NOW), so hosts with
+    skewed clocks agree on when a lease is free. The token increases every
+    time the lease changes hands; renew and release only succeed for the
+    token that was granted, so a stale holder can never extend or free a
+    lease that moved on. Lease documents are never deleted, which keeps the
+    token monotonic.
+
+    Only these lease operations are fenced. The writes of a job run under the
+    lease do not carry the token, so a stalled holder's in flight writes can
+    still land after another worker took the lease over.
+    """
+
+    def __init__(self, name: str, ttl_seconds: int, owner: str = OWNER_ID):
+        self.name = name
+        self.ttl_ms = ttl_seconds * 1000
+        self.owner = owner
+        self.token: Optional[int] = None
+        # Set once the lease is known to be gone while we thought we held it.
+        self.lost = False
+        self._collection = db[SchedulerConfig.LEASE_COLLECTION]
+
+    @property
+    def is_held(self) -> bool:
+        return self.token is not None
+
+    async def acquire(self) -> bool:
+        """Take the lease if it is free, expired or already ours. Returns True on success."""
+        try:
+            lease = await self._collection.find_one_and_update(
+                {
+                    "_id": self.name,
+                    "$or": [
+                        {"owner": self.owner},
+                        {"$expr": {"$lt": ["$expires_at", "$$NOW"]}},
+                    ],
+                },
+                [
+                    {
+                        "$set": {
+                            "token": {
+                                "$cond": [
+                                    {"$eq": ["$owner", self.owner]},
+                                    "$token",
+                                    {"$add": [{"$ifNull": ["$token", 0]}, 1]},
+                                ]
+                            },
+                            "owner": self.owner,
+                            "expires_at": {"$add": ["$$NOW", self.ttl_ms]},
+                            "acquired_at": {
+                                "$cond": [
+                                    {"$eq": ["$owner", self.owner]},
+                                    "$acquired_at",
+                                    "$$NOW",
+                                ]
+                            },
+                        }
+                    }
+                ],
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Someone else holds a live lease, the upsert collided with it.
+            self.token = None
+            return False
+        self.token = lease["token"]
+        self.lost = False
+        return True
+
+    async def renew(self) -> bool:
+        """Extend the lease. Returns False if it expired and was taken over."""
+        if self.token is None:
+            return False
+        result = await self._collection.update_one(
+            {"_id": self.name, "owner": self.owner, "token": self.token},
+            [{"$set": {"expires_at": {"$add": ["$$NOW", self.ttl_ms]}}}],
+        )
+        if result.matched_count == 0:
+            self.token = None
+            self.lost = True
+            return False
+        return True
+
+    async def release(self):
+        if self.token is None:
+            return
+        try:
+            await self._collection.update_one(
+                {"_id": self.name, "owner": self.owner, "token": self.token},
+                {"$set": {"expires_at": datetime(1970, 1, 1)}},
+            )
+        except PyMongoError as e:
+            logger.error(f"Unable to release lease {self.name}, it will expire: {e}")
+        finally:
+            self.token = None
+
+
+@asynccontextmanager
+async def job_lease(
+    name: str, ttl_seconds: int = SchedulerConfig.JOB_LEASE_TTL_SECONDS
+) -> AsyncIterator[LeaseLock]:
+    """
+    Hold the lease `name` while the body runs, renewing it in the background.
+
+    If a renewal fails the body is cancelled, because another worker may take
+    the job over once the lease expires. Cancelling only stops the body at its
+    next await, writes it already sent are not fenced by the lease token.
+
+    Raises:
+        LeaseLockError: If another worker holds the lease
+        LeaseLostError: If the lease was lost while the body was running
+    """
+    lock = LeaseLock(name, ttl_seconds)
+    if not await lock.acquire():
+        raise LeaseLockError(f"Lease {name} is held by another worker")
+
+    body_task = asyncio.current_task()
+
+    async def heartbeat():
+        loop = asyncio.get_running_loop()
+        renewed_at = loop.time()
+        while True:
+            await asyncio.sleep(ttl_seconds / 3)
+            try:
+                renewed = await lock.renew()
+                if renewed:
+                    renewed_at = loop.time()
+            except PyMongoError as e:
+                logger.error(f"Error renewing lease {name}: {e}")
+                # Keep trying until the lease would have expired anyway.
+                renewed = loop.time() - renewed_at < ttl_seconds
+            if not renewed:
+                lock.lost = True
+                logger.error(f"Lease {name} lost, cancelling the job")
+                if body_task is not None:
+                    body_task.cancel()
+                return
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        yield lock
+    except asyncio.CancelledError:
+        if not lock.lost:
+            raise
+        # Python 3.10 has no cancel count, converting the error is enough there.
+        # From 3.11 the count is dropped too, so later awaits are not affected.
+        if body_task is not None and hasattr(body_task, "uncancel"):
+            body_task.uncancel()
+        raise LeaseLostError(f"Lease {name} lost while running")
+    finally:
+        heartbeat_task.cancel()
+        await asyncio.gather(heartbeat_task, return_exceptions=True)
+        await lock.release()
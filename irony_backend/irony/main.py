@@ -11,28 +11,62 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from irony import cache
 from irony.config import config
+from irony.config.db.index_config import IndexConfig
 from irony.config.logger import logger
 from irony.file_lock import FileLockError, file_lock
-from irony.routers import agent, ironman, users, whatsapp
-from irony.scheduler import create_scheduler
-from irony.util import background_process
+from irony.routers import agent, ironman, metrics, users, whatsapp
+from irony.scheduler import SchedulerLeader
+from irony.services.whatsapp import whatsapp_service
+from irony.util import (
+    agent_cache,
+    background_process,
+    http_client,
+    index_manager,
+    order_events,
+    outbound_queue,
+    password_hasher,
+    pipelines,  # registers the indexes and queries checked by index_manager
+    redis_cache,
+    webhook_queue,
+)
+from irony.util.message import Message
 
 app = FastAPI()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if IndexConfig.ENSURE_ON_STARTUP:
+        await index_manager.ensure_indexes()
+    if IndexConfig.VERIFY_ON_STARTUP:
+        await index_manager.verify_query_plans(IndexConfig.FAIL_ON_COLLSCAN)
+
+    await cache.start_sync()
     config.DB_CACHE = await cache.fetch_data_from_db(config.DB_CACHE)
     logger.info("Data loaded into cache")
 
-    scheduler = create_scheduler()
-    scheduler.start()
-    logger.info("All scheduler jobs started")
+    http_client.start_clients()
+    await outbound_queue.start(Message.deliver)
+    webhook_queue.start(whatsapp_service.handle_entry)
+    order_events.start()
+    agent_cache.start()
+    password_hasher.start()
+
+    scheduler_leader = SchedulerLeader()
+    await scheduler_leader.start()
 
     try:
         yield
     finally:
-        scheduler.shutdown()
+        await scheduler_leader.stop()
+        await order_events.stop()
+        await agent_cache.stop()
+        await password_hasher.stop()
+        await cache.stop_sync()
+        await webhook_queue.stop()
+        await outbound_queue.stop()
+        await redis_cache.close()
+        await http_client.close_clients()
     logger.info("Application shutdown, scheduler stopped")
 
 
@@ -96,3 +130,4 @@ app.include_router(whatsapp.router, prefix="/api/whatsapp")
 app.include_router(users.router, prefix="/api/users")
 app.include_router(ironman.router, prefix="/api/ironman")
 app.include_router(agent.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api/metrics")
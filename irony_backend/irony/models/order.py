@@ -50,6 +50,9 @@ class Order(BaseModel):
     notes: Optional[str] = None
     distance_from_previous_stop: Optional[float] = None
     child_order_ids: Optional[List[PyObjectId]] = None
+    # Bumped on every write, orders read before a newer write are not applied
+    # to the order views.
+    version: Optional[int] = None
 
     model_config = shared_config
     # class Config(ModelConfig):
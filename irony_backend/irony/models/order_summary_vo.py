@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from irony.models.common_model import shared_config
+from irony.models.location import UserLocation
+from irony.models.order_status import OrderStatus
+from irony.models.pickup_tIme import PickupDateTime
+from irony.models.pyobjectid import PyObjectId
+
+
+class OrderSummaryVo(BaseModel):
+    """
+    The fields of an order the agent order lists render, read with
+    pipelines.ORDER_SUMMARY_PROJECTION. Full details come from GET /orders/{order_id}.
+
+    Attributes:
+        order_status (List[OrderStatus]): Only the latest status
+        location (UserLocation): Only the nickname and coordinates
+    """
+
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
+    simple_id: Optional[str] = None
+    sub_id: Optional[str] = None
+    count_range: Optional[str] = None
+    count_range_description: Optional[str] = None
+    time_slot: Optional[str] = None
+    time_slot_description: Optional[str] = None
+    total_count: Optional[float] = None
+    total_price: Optional[float] = None
+    order_status: Optional[List[OrderStatus]] = None
+    location: Optional[UserLocation] = None
+    pickup_date_time: Optional[PickupDateTime] = None
+    updated_on: Optional[datetime] = None
+    delivery_type: Optional[str] = None
+    maps_link: Optional[str] = None
+    distance_from_previous_stop: Optional[float] = None
+
+    model_config = shared_config
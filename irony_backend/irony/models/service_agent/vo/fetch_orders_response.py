@@ -5,6 +5,7 @@ from pydantic import BaseModel
 
 from irony.models.common_model import shared_config
 from irony.models.common_response import CommonReponse
+from irony.models.order_summary_vo import OrderSummaryVo
 from irony.models.order_vo import OrderVo
 
 
@@ -14,11 +15,14 @@ class TimeSlotItem(BaseModel):
 
     Attributes:
         time_slot (str): The time slot identifier
-        orders (List[OrderVo]): List of orders in this time slot
+        orders (List[OrderVo | OrderSummaryVo]): List of orders in this time slot
+        route_deadline_missed (bool): True when routing did not finish in time
+            and the orders are in their unsorted order
     """
 
     time_slot: Optional[str] = None
-    orders: Optional[List[OrderVo]] = None
+    orders: Optional[List[OrderVo | OrderSummaryVo]] = None
+    route_deadline_missed: Optional[bool] = None
 
 
 class DateItem(BaseModel):
@@ -55,8 +59,29 @@ class FetchOrdersResponse(CommonReponse):
 
     Attributes:
         data (List[FetchOrdersResponseDataItem]): List of order groups
+        next_cursor (str): Pass as cursor to get the next page, None on the last page
     """
 
     data: Optional[List[FetchOrdersResponseDataItem]] = None
+    next_cursor: Optional[str] = None
+
+    model_config = shared_config
+
+
+class FetchOrdersStreamItem(CommonReponse):
+    """
+    One line of a streamed order list. Each group line holds a single date and
+    time slot, the UI merges it into the section of the same key. The last line
+    has done set and no data.
+
+    Attributes:
+        data (FetchOrdersResponseDataItem): Section with one date and time slot
+        next_cursor (str): Pass as cursor to get the next page, on the last line
+        done (bool): True on the last line of the stream
+    """
+
+    data: Optional[FetchOrdersResponseDataItem] = None
+    next_cursor: Optional[str] = None
+    done: Optional[bool] = None
 
     model_config = shared_config
@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from irony.models.common_model import shared_config
+from irony.models.pyobjectid import PyObjectId
+
+
+class OrderPage(BaseModel):
+    """
+    One page of an agent's order list, ordered by pickup start then id, latest first.
+
+    Attributes:
+        start_from (datetime): Only orders picked up at or after this time
+        start_before (datetime): Only orders picked up before this time
+        limit (int): Orders on the page
+        after_start (datetime): Pickup start of the last order of the previous page
+        after_id (PyObjectId): Id of the last order of the previous page, None on the first page
+    """
+
+    start_from: Optional[datetime] = None
+    start_before: Optional[datetime] = None
+    limit: int
+    after_start: Optional[datetime] = None
+    after_id: Optional[PyObjectId] = None
+
+    model_config = shared_config
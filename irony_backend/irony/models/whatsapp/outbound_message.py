@@ -0,0 +1,25 @@
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+from irony.models.common_model import shared_config
+
+
+class OutboundMessage(BaseModel):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    url: str
+    method: str = "POST"
+    to: str
+    body: Dict[str, Any]
+    last_message_update: Optional[Dict[str, Any]] = None
+    attempts: int = 0
+    enqueued_at: float = Field(default_factory=time.time)
+
+    model_config = shared_config
+
+    @property
+    def sender_id(self) -> str:
+        # Graph API message url: https://graph.facebook.com/<version>/<phone_number_id>/messages
+        return self.url.rstrip("/").split("/")[-2]
@@ -1,6 +1,8 @@
-from typing import List
+from datetime import date
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import StreamingResponse
 
 from irony.models.order_status_enum import OrderStatusEnum
 from irony.models.service_agent.vo.create_order_vo import CreateOrderRequest
@@ -17,11 +19,14 @@ from irony.services.agent.order import (
     create_update_order_service,
     fetch_order_deatils_service,
     fetch_orders_service,
+    order_events_service,
 )
-from irony.util import auth
+from irony.util import auth, etag, pagination, streaming
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
+RouteEngine = Literal["osrm", "local"]
+
 # Constants
 DEFAULT_ORDER_STATUSES = {
     "delivery": [OrderStatusEnum.PICKUP_PENDING, OrderStatusEnum.DELIVERY_PENDING],
@@ -44,7 +49,15 @@ def parse_order_statuses(
 
 @router.get("/by-status-date-timeslot", response_model=FetchOrdersResponse)
 async def get_by_status_and_date_and_time_slot(
-    current_user: str = Depends(auth.get_current_user), order_status: str = ""
+    request: Request,
+    response: Response,
+    current_user: str = Depends(auth.get_current_user),
+    order_status: str = "",
+    summary: bool = False,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
 ) -> FetchOrdersResponse:
     """
     Fetch and group orders by status, date and time slot for an agent.
@@ -52,20 +65,42 @@ async def get_by_status_and_date_and_time_slot(
     Args:
         current_user (str): Authenticated user ID
         order_status (str): Comma-separated list of order statuses to filter
+        summary (bool): Only the fields the order list renders, details come
+            from GET /orders/{order_id}
+        from_date (date): First pickup date to list
+        to_date (date): Last pickup date to list
+        limit (int): Orders per page
+        cursor (str): next_cursor of the previous page
 
     Returns:
         FetchOrdersResponse: Grouped orders matching the criteria
     """
     ordered_statuses = parse_order_statuses(order_status)
+    page = pagination.get_order_page(from_date, to_date, limit, cursor)
+    tag = await etag.get_orders_etag(request, current_user, ordered_statuses)
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    etag.set_etag(response, tag)
     return await fetch_orders_service.get_orders_group_by_status_and_date_and_time_slot(
         current_user,
         ordered_statuses=ordered_statuses,
+        summary=summary,
+        page=page,
     )
 
 
 @router.get("/delivery-schedule", response_model=FetchOrdersResponse)
 async def get_delivery_schedule(
-    current_user: str = Depends(auth.get_current_user), order_status: str = ""
+    request: Request,
+    response: Response,
+    current_user: str = Depends(auth.get_current_user),
+    order_status: str = "",
+    route_engine: Optional[RouteEngine] = None,
+    summary: bool = False,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
 ) -> FetchOrdersResponse:
     """
     Get delivery schedule grouped by date and time slot
@@ -73,38 +108,178 @@ async def get_delivery_schedule(
     Args:
         current_user (str): Authenticated user ID
         order_status (str): Comma-separated list of order statuses to filter
+        route_engine (str): "osrm" or "local", the configured engine when not given
+        summary (bool): Only the fields the order list renders
+        from_date (date): First pickup date to list
+        to_date (date): Last pickup date to list
+        limit (int): Orders per page
+        cursor (str): next_cursor of the previous page
 
     Returns:
         FetchOrdersResponse: Orders grouped by date and time slot
     """
     ordered_statuses = parse_order_statuses(order_status, default_type="delivery")
+    page = pagination.get_order_page(from_date, to_date, limit, cursor)
+    tag = await etag.get_orders_etag(
+        request, current_user, ordered_statuses, routed=True
+    )
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    etag.set_etag(response, tag)
     return await fetch_orders_service.get_orders_group_by_date_and_time_slot_routable(
         current_user,
         ordered_statuses=ordered_statuses,
         route_required=True,
+        route_engine=route_engine,
+        summary=summary,
+        page=page,
+    )
+
+
+@router.get("/by-status-date-timeslot/stream")
+async def stream_by_status_and_date_and_time_slot(
+    current_user: str = Depends(auth.get_current_user),
+    order_status: str = "",
+    summary: bool = False,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> StreamingResponse:
+    """
+    Stream orders grouped by status, date and time slot as NDJSON, a
+    FetchOrdersStreamItem line per group as soon as it is read and a closing
+    line with next_cursor.
+
+    Args:
+        current_user (str): Authenticated user ID
+        order_status (str): Comma-separated list of order statuses to filter
+        summary (bool): Only the fields the order list renders
+        from_date (date): First pickup date to list
+        to_date (date): Last pickup date to list
+        limit (int): Orders per page
+        cursor (str): next_cursor of the previous page
+
+    Returns:
+        StreamingResponse: application/x-ndjson lines of FetchOrdersStreamItem
+    """
+    ordered_statuses = parse_order_statuses(order_status)
+    page = pagination.get_order_page(from_date, to_date, limit, cursor)
+    items = await fetch_orders_service.stream_orders_group_by_status_and_date_and_time_slot(
+        current_user,
+        ordered_statuses=ordered_statuses,
+        summary=summary,
+        page=page,
+    )
+    return streaming.ndjson_response(items)
+
+
+@router.get("/delivery-schedule/stream")
+async def stream_delivery_schedule(
+    current_user: str = Depends(auth.get_current_user),
+    order_status: str = "",
+    route_engine: Optional[RouteEngine] = None,
+    summary: bool = False,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> StreamingResponse:
+    """
+    Stream the delivery schedule as NDJSON, each date and time slot group sent
+    once it is routed.
+
+    Args:
+        current_user (str): Authenticated user ID
+        order_status (str): Comma-separated list of order statuses to filter
+        route_engine (str): "osrm" or "local", the configured engine when not given
+        summary (bool): Only the fields the order list renders
+        from_date (date): First pickup date to list
+        to_date (date): Last pickup date to list
+        limit (int): Orders per page
+        cursor (str): next_cursor of the previous page
+
+    Returns:
+        StreamingResponse: application/x-ndjson lines of FetchOrdersStreamItem
+    """
+    ordered_statuses = parse_order_statuses(order_status, default_type="delivery")
+    page = pagination.get_order_page(from_date, to_date, limit, cursor)
+    items = await fetch_orders_service.stream_orders_group_by_date_and_time_slot_routable(
+        current_user,
+        ordered_statuses=ordered_statuses,
+        route_required=True,
+        route_engine=route_engine,
+        summary=summary,
+        page=page,
     )
+    return streaming.ndjson_response(items)
 
 
 @router.get("/delivery-route", response_model=FetchOrdersResponse)
 async def get_delivery_route(
+    request: Request,
+    response: Response,
     current_user: str = Depends(auth.get_current_user),
+    route_engine: Optional[RouteEngine] = None,
+    summary: bool = False,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
 ) -> FetchOrdersResponse:
     """
     Fetch delivery orders with optimized route information.
 
     Args:
         current_user (str): Authenticated user ID
+        route_engine (str): "osrm" or "local", the configured engine when not given
+        summary (bool): Only the fields the order list renders
+        from_date (date): First pickup date to list
+        to_date (date): Last pickup date to list
+        limit (int): Orders per page
+        cursor (str): next_cursor of the previous page
 
     Returns:
         dict: Orders with route optimization details
     """
     ordered_statuses = DEFAULT_ORDER_STATUSES["delivery"]
+    page = pagination.get_order_page(from_date, to_date, limit, cursor)
+    tag = await etag.get_orders_etag(
+        request, current_user, ordered_statuses, routed=True
+    )
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    etag.set_etag(response, tag)
     return await fetch_orders_service.get_orders_for_delivery_with_route(
         current_user,
         ordered_statuses=ordered_statuses,
+        route_engine=route_engine,
+        summary=summary,
+        page=page,
     )
 
 
+@router.get("/events")
+async def stream_order_events(
+    current_user: str = Depends(auth.get_current_user),
+) -> StreamingResponse:
+    """
+    Server-sent events pushing changes to the agent's orders instead of polling
+    the lists. Each "order" event carries a JSON delta: "added" or "updated"
+    with the order, "removed" with its id, or "resync" asking the UI to reload
+    its lists. A resync is sent first, then again whenever deltas were lost.
+    The order's pickup date and time slot name the group to re-route.
+
+    Args:
+        current_user (str): Authenticated user ID
+
+    Returns:
+        StreamingResponse: text/event-stream of order deltas
+    """
+    events = await order_events_service.stream_order_events(current_user)
+    return streaming.sse_response(events)
+
+
 @router.get("/{order_id}", response_model=FetchOrderDetailsResponse)
 async def get_order(order_id: str) -> FetchOrderDetailsResponse:
     """
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 
 from irony.services.agent import service_service
-from irony.util import auth
+from irony.util import auth, etag
 
 router = APIRouter(prefix="/services", tags=["Services"])
 
 
 @router.get("/prices")
 async def get_service_prices_for_service_locations(
+    request: Request,
     current_user: str = Depends(auth.get_current_user),
 ):
     """
@@ -17,6 +18,14 @@ async def get_service_prices_for_service_locations(
         current_user (str): Authenticated user ID
 
     Returns:
-        dict: Service prices by location
+        Response: Pre-serialized PricesResponseVo JSON
     """
-    return await service_service.get_service_prices_for_locations(current_user)
+    tag = await etag.get_prices_etag(request, current_user)
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    response = Response(
+        content=await service_service.get_service_prices_for_locations(current_user),
+        media_type="application/json",
+    )
+    etag.set_etag(response, tag)
+    return response
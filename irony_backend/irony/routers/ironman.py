@@ -1,6 +1,7 @@
-from typing import List
+from datetime import date
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, Depends, Request, Response
 
 from irony.models.order_status_enum import OrderStatusEnum
 from irony.models.service_agent.vo.auth.login_request import AgentLoginRequest
@@ -13,7 +14,7 @@ from irony.models.service_agent.vo.order_request_vo import CommonOrderResponse
 from irony.models.service_agent.vo.update_pickup_pending_vo import UpdateOrderRequest
 from irony.services.agent import auth_service, service_service
 from irony.services.agent.order import create_update_order_service, fetch_orders_service
-from irony.util import auth
+from irony.util import auth, etag, pagination
 
 router = APIRouter()
 
@@ -73,7 +74,14 @@ async def login(response: Response, request: AgentLoginRequest):
     response_model=FetchOrdersResponse,
 )
 async def get_agent_orders_by_status_group_by_status_and_date_and_time_slot(
-    current_user: str = Depends(auth.get_current_user), order_status: str = ""
+    request: Request,
+    response: Response,
+    current_user: str = Depends(auth.get_current_user),
+    order_status: str = "",
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
 ) -> FetchOrdersResponse:
     """
     Fetch and group orders by status, date and time slot for an agent.
@@ -81,14 +89,24 @@ async def get_agent_orders_by_status_group_by_status_and_date_and_time_slot(
     Args:
         current_user (str): Authenticated user ID
         order_status (str): Comma-separated list of order statuses to filter
+        from_date (date): First pickup date to list
+        to_date (date): Last pickup date to list
+        limit (int): Orders per page
+        cursor (str): next_cursor of the previous page
 
     Returns:
         FetchOrdersResponse: Grouped orders matching the criteria
     """
     ordered_statuses = parse_order_statuses(order_status)
+    page = pagination.get_order_page(from_date, to_date, limit, cursor)
+    tag = await etag.get_orders_etag(request, current_user, ordered_statuses)
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    etag.set_etag(response, tag)
     return await fetch_orders_service.get_orders_group_by_status_and_date_and_time_slot(
         current_user,
         ordered_statuses=ordered_statuses,
+        page=page,
     )
 
 
@@ -96,7 +114,14 @@ async def get_agent_orders_by_status_group_by_status_and_date_and_time_slot(
     "/agentOrdersByStatusGroupByDateAndTimeSlot", response_model=FetchOrdersResponse
 )
 async def get_agent_orders_by_status_group_by_date_and_time_slot(
-    current_user: str = Depends(auth.get_current_user), order_status: str = ""
+    request: Request,
+    response: Response,
+    current_user: str = Depends(auth.get_current_user),
+    order_status: str = "",
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
 ):
     """
     Fetch and group orders by date and time slot for an agent.
@@ -104,39 +129,68 @@ async def get_agent_orders_by_status_group_by_date_and_time_slot(
     Args:
         current_user (str): Authenticated user ID
         order_status (str): Comma-separated list of order statuses to filter
+        from_date (date): First pickup date to list
+        to_date (date): Last pickup date to list
+        limit (int): Orders per page
+        cursor (str): next_cursor of the previous page
 
     Returns:
         FetchOrdersResponse: Orders grouped by date and time slot
     """
     ordered_statuses = parse_order_statuses(order_status, default_type="delivery")
+    page = pagination.get_order_page(from_date, to_date, limit, cursor)
+    tag = await etag.get_orders_etag(request, current_user, ordered_statuses)
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    etag.set_etag(response, tag)
     return await fetch_orders_service.get_orders_group_by_date_and_time_slot_routable(
         current_user,
         ordered_statuses=ordered_statuses,
+        page=page,
     )
 
 
 @router.get("/agentOrdersForDeliveryWithRoute")
 async def get_agent_orders_for_delivery_with_route(
+    request: Request,
+    response: Response,
     current_user: str = Depends(auth.get_current_user),
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
 ):
     """
     Fetch delivery orders with optimized route information.
 
     Args:
         current_user (str): Authenticated user ID
+        from_date (date): First pickup date to list
+        to_date (date): Last pickup date to list
+        limit (int): Orders per page
+        cursor (str): next_cursor of the previous page
 
     Returns:
         dict: Orders with route optimization details
     """
     ordered_statuses = DEFAULT_ORDER_STATUSES["delivery"]
+    page = pagination.get_order_page(from_date, to_date, limit, cursor)
+    tag = await etag.get_orders_etag(
+        request, current_user, ordered_statuses, routed=True
+    )
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    etag.set_etag(response, tag)
     return await fetch_orders_service.get_orders_for_delivery_with_route(
         current_user,
         ordered_statuses=ordered_statuses,
+        page=page,
     )
 
 
 @router.get("/servicePricesForServiceLocations")
 async def get_service_prices_for_service_locations(
+    request: Request,
     current_user: str = Depends(auth.get_current_user),
 ):
     """
@@ -146,9 +200,17 @@ async def get_service_prices_for_service_locations(
         current_user (str): Authenticated user ID
 
     Returns:
-        dict: Service prices by location
+        Response: Pre-serialized PricesResponseVo JSON
     """
-    return await service_service.get_service_prices_for_locations(current_user)
+    tag = await etag.get_prices_etag(request, current_user)
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    response = Response(
+        content=await service_service.get_service_prices_for_locations(current_user),
+        media_type="application/json",
+    )
+    etag.set_etag(response, tag)
+    return response
 
 
 # @router.post("/fetchOrderDetails")
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+
+from irony.util import auth, metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("")
+async def get_metrics(current_user: str = Depends(auth.get_current_user)):
+    """
+    Get in-process latency, counter and gauge metrics of this worker.
+
+    Args:
+        current_user (str): Authenticated user ID
+
+    Returns:
+        dict: Metrics snapshot
+    """
+    return metrics.snapshot()
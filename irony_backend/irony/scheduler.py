@@ -1,48 +1,26 @@
-import os
+import asyncio
+from datetime import datetime
+from typing import Callable, Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from pymongo.errors import PyMongoError
 
 from irony.config.logger import logger
-from irony.file_lock import FileLockError, file_lock
-from irony.util import background_process
-
-# Define lock files for each process
-LOCK_FILES = {
-    "reset_daily_config": os.path.join(
-        os.path.dirname(__file__), "locks", "reset_daily_config.lock"
-    ),
-    "pending_orders": os.path.join(
-        os.path.dirname(__file__), "locks", "pending_orders.lock"
-    ),
-    "delivery_schedule": os.path.join(
-        os.path.dirname(__file__), "locks", "delivery_schedule.lock"
-    ),
-    "work_schedule": os.path.join(
-        os.path.dirname(__file__), "locks", "work_schedule.lock"
-    ),
-    "pending_work": os.path.join(
-        os.path.dirname(__file__), "locks", "pending_work.lock"
-    ),
-    "timeslot_volume": os.path.join(
-        os.path.dirname(__file__), "locks", "timeslot_volume.lock"
-    ),
-    "order_requests": os.path.join(
-        os.path.dirname(__file__), "locks", "order_requests.lock"
-    ),
-    "reassign_orders": os.path.join(
-        os.path.dirname(__file__), "locks", "reassign_orders.lock"
-    ),
-}
+from irony.config.order_view.order_view_config import OrderViewConfig
+from irony.config.route.route_config import RouteConfig
+from irony.config.scheduler.scheduler_config import SchedulerConfig
+from irony.lease_lock import LeaseLock, LeaseLockError, job_lease
+from irony.util import background_process, delay_queue, order_view
 
 
 # Create individual background task functions for each process
 async def execute_reset_daily_config():
     try:
-        with file_lock(LOCK_FILES["reset_daily_config"]):
+        async with job_lease("reset_daily_config"):
             await background_process.reset_daily_config()
             logger.info("Completed reset_daily_config")
-    except FileLockError:
+    except LeaseLockError:
         logger.warning("Skipping reset_daily_config - already running")
     except Exception as e:
         logger.error(f"Error in reset_daily_config: {e}")
@@ -50,10 +28,10 @@ async def execute_reset_daily_config():
 
 async def execute_pending_orders():
     try:
-        with file_lock(LOCK_FILES["pending_orders"]):
+        async with job_lease("pending_orders"):
             await background_process.send_pending_order_requests()
             logger.info("Completed send_pending_order_requests")
-    except FileLockError:
+    except LeaseLockError:
         logger.warning("Skipping send_pending_order_requests - already running")
     except Exception as e:
         logger.error(f"Error in send_pending_order_requests: {e}")
@@ -61,10 +39,10 @@ async def execute_pending_orders():
 
 async def execute_delivery_schedule():
     try:
-        with file_lock(LOCK_FILES["delivery_schedule"]):
+        async with job_lease("delivery_schedule"):
             await background_process.send_ironman_delivery_schedule()
             logger.info("Completed send_ironman_delivery_schedule")
-    except FileLockError:
+    except LeaseLockError:
         logger.warning("Skipping send_ironman_delivery_schedule - already running")
     except Exception as e:
         logger.error(f"Error in send_ironman_delivery_schedule: {e}")
@@ -72,10 +50,10 @@ async def execute_delivery_schedule():
 
 async def execute_work_schedule():
     try:
-        with file_lock(LOCK_FILES["work_schedule"]):
+        async with job_lease("work_schedule"):
             await background_process.send_ironman_work_schedule()
             logger.info("Completed send_ironman_work_schedule")
-    except FileLockError:
+    except LeaseLockError:
         logger.warning("Skipping send_ironman_work_schedule - already running")
     except Exception as e:
         logger.error(f"Error in send_ironman_work_schedule: {e}")
@@ -83,10 +61,10 @@ async def execute_work_schedule():
 
 async def execute_pending_work():
     try:
-        with file_lock(LOCK_FILES["pending_work"]):
+        async with job_lease("pending_work"):
             await background_process.send_ironman_pending_work_schedule()
             logger.info("Completed send_ironman_pending_work_schedule")
-    except FileLockError:
+    except LeaseLockError:
         logger.warning("Skipping send_ironman_pending_work_schedule - already running")
     except Exception as e:
         logger.error(f"Error in send_ironman_pending_work_schedule: {e}")
@@ -94,10 +72,10 @@ async def execute_pending_work():
 
 async def execute_timeslot_volume():
     try:
-        with file_lock(LOCK_FILES["timeslot_volume"]):
+        async with job_lease("timeslot_volume"):
             await background_process.create_timeslot_volume_record()
             logger.info("Completed create_timeslot_volume_record")
-    except FileLockError:
+    except LeaseLockError:
         logger.warning("Skipping create_timeslot_volume_record - already running")
     except Exception as e:
         logger.error(f"Error in create_timeslot_volume_record: {e}")
@@ -105,10 +83,10 @@ async def execute_timeslot_volume():
 
 async def execute_order_requests():
     try:
-        with file_lock(LOCK_FILES["order_requests"]):
+        async with job_lease("order_requests"):
             await background_process.create_order_requests()
             logger.info("Completed create_order_requests")
-    except FileLockError:
+    except LeaseLockError:
         logger.warning("Skipping create_order_requests - already running")
     except Exception as e:
         logger.error(f"Error in create_order_requests: {e}")
@@ -116,15 +94,47 @@ async def execute_order_requests():
 
 async def execute_reassign_orders():
     try:
-        with file_lock(LOCK_FILES["reassign_orders"]):
+        async with job_lease("reassign_orders"):
             await background_process.reassign_missed_orders()
             logger.info("Completed reassign_missed_orders")
-    except FileLockError:
+    except LeaseLockError:
         logger.warning("Skipping reassign_missed_orders - already running")
     except Exception as e:
         logger.error(f"Error in reassign_missed_orders: {e}")
 
 
+async def execute_precompute_routes():
+    try:
+        async with job_lease("precompute_routes"):
+            await background_process.precompute_delivery_routes()
+            logger.info("Completed precompute_delivery_routes")
+    except LeaseLockError:
+        logger.warning("Skipping precompute_delivery_routes - already running")
+    except Exception as e:
+        logger.error(f"Error in precompute_delivery_routes: {e}")
+
+
+async def execute_rebuild_order_views():
+    try:
+        async with job_lease("rebuild_order_views"):
+            await order_view.rebuild()
+            logger.info("Completed rebuild_order_views")
+    except LeaseLockError:
+        logger.warning("Skipping rebuild_order_views - already running")
+    except Exception as e:
+        logger.error(f"Error in rebuild_order_views: {e}")
+
+
+def create_delay_queue_dispatcher() -> delay_queue.DelayQueueDispatcher:
+    """Create the dispatcher firing order and order request triggers on time"""
+    return delay_queue.DelayQueueDispatcher(
+        {
+            delay_queue.ORDER: background_process.create_order_requests,
+            delay_queue.ORDER_REQUEST: background_process.send_pending_order_requests,
+        }
+    )
+
+
 def create_scheduler() -> AsyncIOScheduler:
     """Create and configure the scheduler with all jobs"""
     scheduler = AsyncIOScheduler()
@@ -138,5 +148,83 @@ def create_scheduler() -> AsyncIOScheduler:
     scheduler.add_job(execute_timeslot_volume, CronTrigger(minute="*/5"))
     scheduler.add_job(execute_order_requests, CronTrigger(minute="*/1"))
     scheduler.add_job(execute_reassign_orders, CronTrigger(minute="*/2"))
+    if RouteConfig.PRECOMPUTE_ROUTES:
+        scheduler.add_job(execute_precompute_routes, CronTrigger(minute="*/2"))
+    if OrderViewConfig.ENABLED:
+        # Built right away, dashboards use the pipelines until the first build.
+        scheduler.add_job(
+            execute_rebuild_order_views,
+            CronTrigger(minute=f"*/{OrderViewConfig.REBUILD_INTERVAL_MINUTES}"),
+            next_run_time=datetime.now(),
+        )
 
     return scheduler
+
+
+class SchedulerLeader:
+    """Runs the scheduler and the delay queue dispatcher in exactly one worker
+    across all hosts.
+
+    Every worker campaigns for the leader lease. The holder starts both and
+    renews the lease; if it dies the lease expires and another
+    worker takes over within LEADER_LEASE_TTL_SECONDS. A leader that fails to
+    renew stops its scheduler, and jobs still running are cancelled by their
+    own job lease if that cannot be renewed either.
+    """
+
+    def __init__(
+        self, scheduler_factory: Callable[[], AsyncIOScheduler] = create_scheduler
+    ):
+        self.scheduler_factory = scheduler_factory
+        self.scheduler: Optional[AsyncIOScheduler] = None
+        self.dispatcher: Optional[delay_queue.DelayQueueDispatcher] = None
+        self._lease = LeaseLock(
+            SchedulerConfig.LEADER_LEASE_NAME, SchedulerConfig.LEADER_LEASE_TTL_SECONDS
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.scheduler is not None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._campaign())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._step_down()
+        await self._lease.release()
+
+    async def _campaign(self):
+        while True:
+            try:
+                if self.is_leader:
+                    await self._lease.renew()
+                    if self._lease.lost:
+                        logger.error("Scheduler leader lease lost")
+                        await self._step_down()
+                elif await self._lease.acquire():
+                    self.scheduler = self.scheduler_factory()
+                    self.scheduler.start()
+                    self.dispatcher = create_delay_queue_dispatcher()
+                    await self.dispatcher.start()
+                    logger.info(
+                        f"Elected scheduler leader with token {self._lease.token}, all scheduler jobs started"
+                    )
+            except PyMongoError as e:
+                # Without Mongo the lease cannot be proven, so stop scheduling.
+                logger.error(f"Scheduler leader election failed: {e}")
+                await self._step_down()
+            await asyncio.sleep(SchedulerConfig.LEADER_RENEW_INTERVAL_SECONDS)
+
+    async def _step_down(self):
+        if self.dispatcher is not None:
+            await self.dispatcher.stop()
+            self.dispatcher = None
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+            logger.info("Stepped down as scheduler leader")
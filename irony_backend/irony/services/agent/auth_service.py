@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
 
 from fastapi import HTTPException, Response
@@ -18,7 +19,7 @@ from irony.models.service_agent.vo.auth.register_response import (
     AgentRegisterData,
     AgentRegisterResponse,
 )
-from irony.util import auth
+from irony.util import agent_cache, auth, metrics, password_hasher
 
 
 def validate_registration_input(request: AgentRegisterRequest) -> None:
@@ -44,6 +45,29 @@ async def check_existing_user(mobile: str) -> None:
         raise AuthenticationException("Mobile already registered")
 
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many sign-ins right now, please try again",
+        headers={"Retry-After": str(AuthConfig.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+
+async def _rehash_password(agent: ServiceAgent, new_hash: str) -> None:
+    """Store a password hashed at the current cost, unless it changed since
+    it was read."""
+    try:
+        await db.service_agent.update_one(
+            {"mobile": agent.mobile, "password": agent.password},
+            {"$set": {"password": new_hash}},
+        )
+        agent_cache.invalidate(agent.mobile)
+        metrics.increment("password_hash.rehashed")
+    except Exception as e:
+        # The old hash still works, the next login tries again.
+        logger.error("Unable to store rehashed password: %s", e, exc_info=True)
+
+
 async def register_service_agent(
     request: AgentRegisterRequest,
 ) -> AgentRegisterResponse:
@@ -52,9 +76,16 @@ async def register_service_agent(
         validate_registration_input(request)
         await check_existing_user(request.mobile)  # type: ignore
 
+        try:
+            password = await password_hasher.hash_password(
+                request.password  # type: ignore
+            )
+        except asyncio.QueueFull:
+            raise _hasher_busy()
+
         agent = ServiceAgent(
             **request.model_dump(exclude={"password", "confirm_password"}),
-            password=auth.hash_password(request.password)  # type: ignore
+            password=password,
         )
 
         db_insert_result = await db.service_agent.insert_one(
@@ -67,7 +98,7 @@ async def register_service_agent(
             message="Service Agent created successfully.",
             data=AgentRegisterData(user=agent),
         )
-    except AuthenticationException:
+    except HTTPException:
         raise
     except Exception as e:
         logger.error("Error in register_service_agent: %s", e, exc_info=True)
@@ -96,8 +127,16 @@ async def login_service_agent(
         agent = ServiceAgent(**service_agent_record)
 
         # Verify the password
-        if not auth.verify_password(request.password, agent.password):
+        try:
+            verified, new_hash = await password_hasher.verify_and_update_password(
+                request.password, agent.password
+            )
+        except asyncio.QueueFull:
+            raise _hasher_busy()
+        if not verified:
             raise HTTPException(status_code=401, detail="Invalid mobile or password")
+        if new_hash:
+            await _rehash_password(agent, new_hash)
 
         # Generate JWT token
         token = auth.create_access_token(
@@ -27,6 +27,7 @@ from irony.models.service_agent.vo.update_pickup_pending_vo import (
     UpdateOrderResponse,
 )
 from irony.models.user import User
+from irony.util import order_view, price_catalog
 
 
 async def update_order(request: UpdateOrderRequest) -> UpdateOrderResponse:
@@ -77,6 +78,12 @@ async def update_order(request: UpdateOrderRequest) -> UpdateOrderResponse:
                     status_code=400,
                     detail="Invalid status transition from DELIVERY_PENDING",
                 )
+
+        if response.data and response.data.sub_id_dict:
+            # Split into one order per service, the new order ids are not known here.
+            await order_view.sync_location(order.service_location_id)
+        else:
+            await order_view.order_changed(order.id)
         return response
 
     except HTTPException:
@@ -144,12 +151,14 @@ async def create_order(request: CreateOrderRequest) -> CommonOrderResponse:
             result = await db.parent_order.insert_one(
                 new_order.model_dump(exclude_unset=True, by_alias=True)
             )
+            await order_view.sync_location(new_order.service_location_id)
         else:
             result = await db.order.insert_one(
                 new_order.model_dump(exclude_unset=True, by_alias=True)
             )
             order_id_list.append(str(result.inserted_id))
             order_list.append(new_order)
+            await order_view.order_changed(result.inserted_id)
 
         response.data = CommonOrderResponseBody(
             sub_id_dict=sub_id_dict, order_ids=order_id_list
@@ -240,10 +249,11 @@ async def _process_pending_pickup_order_update(
             await db.parent_order.insert_one(order.model_dump(exclude_unset=True))
         else:
             _set_order_item_details(order, request.items)
-            await db.order.replace_one(
-                {"_id": PyObjectId(request.order_id)},
+            result = await db.order.replace_one(
+                order_view.bump_version(order),
                 order.model_dump(exclude_unset=True, by_alias=True),
             )
+            _check_order_replaced(result.matched_count)
             order_id_list.append(str(order.id))
             order_list.append(order)
 
@@ -267,11 +277,12 @@ async def _process_pending_pickup_order_update(
         order.updated_on = now
         bulk_operations.append(
             ReplaceOne(
-                {"_id": PyObjectId(request.order_id)},
+                order_view.bump_version(order),
                 order.model_dump(exclude_unset=True, by_alias=True),
             )
         )
-        await bulk_write_operations("order", bulk_operations)
+        result = await bulk_write_operations("order", bulk_operations)
+        _check_order_replaced(result["modified_count"])
 
 
 def _validate_fetched_order_for_update_order(
@@ -372,11 +383,28 @@ async def _update_order_status(
     order.updated_on = now
     bulk_operations.append(
         ReplaceOne(
-            {"_id": PyObjectId(request.order_id)},
+            order_view.bump_version(order),
             order.model_dump(exclude_unset=True, by_alias=True),
         )
     )
-    await bulk_write_operations("order", bulk_operations)
+    result = await bulk_write_operations("order", bulk_operations)
+    _check_order_replaced(result["modified_count"])
+
+
+def _check_order_replaced(replaced_count: int):
+    """Check the order was replaced, the replace matches nothing once another
+    write changed the order after it was read.
+
+    Args:
+        replaced_count (int): Orders the replace matched
+
+    Raises:
+        HTTPException: If the order changed since it was read
+    """
+    if replaced_count == 0:
+        raise HTTPException(
+            status_code=409, detail="Order was changed meanwhile, please retry"
+        )
 
 
 def _get_clone_order_if_required(
@@ -598,13 +626,20 @@ async def _get_price_map_for_request(request: CommonOrderRequest) -> Dict[str, P
     Returns:
         Dict[str, Prices]: Map of price IDs to price objects
     """
-    # Create a price_map for quick lookup
-    price_map: Dict[str, Prices] = {
-        str(price["_id"]): Prices(**price)
-        for price in await db.prices.find(
-            {"_id": {"$in": [PyObjectId(item.price_id) for item in request.items]}}
-        ).to_list(None)
-    }
+    price_ids = [str(item.price_id) for item in request.items]
+    price_map: Dict[str, Prices] = price_catalog.get_prices(price_ids)
+
+    # Prices added since the catalog was last loaded.
+    missing_ids = [price_id for price_id in price_ids if price_id not in price_map]
+    if missing_ids:
+        price_map.update(
+            {
+                str(price["_id"]): Prices(**price)
+                for price in await db.prices.find(
+                    {"_id": {"$in": [PyObjectId(price_id) for price_id in missing_ids]}}
+                ).to_list(None)
+            }
+        )
 
     return price_map
 
@@ -1,35 +1,64 @@
 import asyncio
+import time
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
 
 from fastapi import HTTPException
 
 from irony.config import config
+from irony.config.agent.order_list_config import OrderListConfig
 from irony.config.logger import logger
+from irony.config.route.route_config import RouteConfig
 from irony.db import db
 from irony.models.order import Order
 from irony.models.order_status_enum import OrderStatusEnum
+from irony.models.order_summary_vo import OrderSummaryVo
 from irony.models.order_vo import OrderVo
 from irony.models.service_agent.service_agent import ServiceAgent
 from irony.models.service_agent.vo.fetch_orders_response import (
     DateItem,
     FetchOrdersResponse,
     FetchOrdersResponseDataItem,
+    FetchOrdersStreamItem,
     TimeSlotItem,
 )
-from irony.util import pipelines, route, utils
+from irony.models.service_agent.vo.order_page_vo import OrderPage
+from irony.util import (
+    agent_cache,
+    metrics,
+    order_view,
+    pagination,
+    pipelines,
+    route,
+    utils,
+)
 
 
 # Route : 1
 async def get_orders_group_by_status_and_date_and_time_slot(
     agent_mobile: str,
     ordered_statuses: List[OrderStatusEnum],
+    summary: bool = False,
+    page: Optional[OrderPage] = None,
 ) -> FetchOrdersResponse:
     """Fetch and group orders by status, date, and time slot.
 
     Args:
         agent_mobile (str): Mobile number of the service agent
         ordered_statuses (List[OrderStatusEnum]): List of order statuses to filter by
+        summary (bool, optional): Return OrderSummaryVo instead of full orders. Defaults to False.
+        page (Optional[OrderPage], optional): Window and page of orders. Defaults to None, all orders.
 
     Returns:
         FetchOrdersResponse: Response containing grouped orders
@@ -44,18 +73,34 @@ async def get_orders_group_by_status_and_date_and_time_slot(
             agent_mobile
         )
 
-        pipeline: List[Dict[str, Any]] = (
-            pipelines.get_pipeline_orders_group_by_status_and_date_and_time_slot_for_service_location_ids(
-                agent.service_location_ids,  # type: ignore
-                ordered_statuses,
-            )
+        order_model = _get_order_model(summary)
+        grouped_orders = await order_view.get_grouped_orders(
+            agent.service_location_ids,  # type: ignore
+            ordered_statuses,
+            by_status=True,
+            order_model=order_model,
+            page=page,
         )
-        grouped_orders = await db.order.aggregate(pipeline).to_list(None)
+        if grouped_orders is None:
+            pipeline: List[Dict[str, Any]] = (
+                pipelines.get_pipeline_orders_group_by_status_and_date_and_time_slot_for_service_location_ids(
+                    agent.service_location_ids,  # type: ignore
+                    ordered_statuses,
+                    _get_projection(summary),
+                    page,
+                )
+            )
+            grouped_orders = _parse_grouped_orders(
+                await db.order.aggregate(pipeline).to_list(None), order_model
+            )
 
         if not grouped_orders:
             response.message = "No orders founrd"
             return response
 
+        response.next_cursor = pagination.get_next_cursor(
+            _orders_of_groups(grouped_orders), page
+        )
         grouped_dict = _group_by_status_and_date_and_time_slot(grouped_orders)
 
         response.data = _construct_fetch_order_response(grouped_dict, ordered_statuses)
@@ -77,7 +122,7 @@ def _group_by_status_and_date_and_time_slot(grouped_orders) -> Dict:
     """Group orders by their status, date, and time slot.
 
     Args:
-        grouped_orders (List[Dict]): Raw grouped orders from database
+        grouped_orders (List[Dict]): Grouped orders with orders read into models
 
     Returns:
         Dict: Nested dictionary with structure {status: {date: {time_slot: [orders]}}}
@@ -118,7 +163,6 @@ def _add_order_to_grouped_dict_by_status_and_date_and_time_slot(
         response_dict[status][date][time_slot] = []
 
     for order in order_group.get("orders"):
-        order = OrderVo(**order)
         order.time_slot_description = (
             config.DB_CACHE.get("call_to_action", {})
             .get(order.time_slot, {})
@@ -137,6 +181,9 @@ async def get_orders_group_by_date_and_time_slot_routable(
     agent_mobile: str,
     ordered_statuses: List[OrderStatusEnum],
     route_required: bool = False,
+    route_engine: Optional[str] = None,
+    summary: bool = False,
+    page: Optional[OrderPage] = None,
 ) -> FetchOrdersResponse:
     """Fetch and group orders with optional route optimization.
 
@@ -144,6 +191,9 @@ async def get_orders_group_by_date_and_time_slot_routable(
         agent_mobile (str): Mobile number of the service agent
         ordered_statuses (List[OrderStatusEnum]): List of order statuses to filter by
         route_required (bool, optional): Whether to calculate optimal route. Defaults to False.
+        route_engine (Optional[str], optional): "osrm" or "local". Defaults to RouteConfig.ENGINE.
+        summary (bool, optional): Return OrderSummaryVo instead of full orders. Defaults to False.
+        page (Optional[OrderPage], optional): Window and page of orders. Defaults to None, all orders.
 
     Returns:
         FetchOrdersResponse: Response containing grouped and optionally routed orders
@@ -157,23 +207,42 @@ async def get_orders_group_by_date_and_time_slot_routable(
             agent_mobile
         )
 
-        pipeline: List[Dict[str, Any]] = (
-            pipelines.get_pipeline_orders_group_by_date_and_time_slot_for_service_location_ids(
-                [str(location_id) for location_id in agent.service_location_ids],  # type: ignore
-                ordered_statuses,
-            )
+        order_model = _get_order_model(summary)
+        grouped_orders = await order_view.get_grouped_orders(
+            agent.service_location_ids,  # type: ignore
+            ordered_statuses,
+            order_model=order_model,
+            page=page,
         )
-        grouped_orders = await db.order.aggregate(pipeline).to_list(None)
+        if grouped_orders is None:
+            pipeline: List[Dict[str, Any]] = (
+                pipelines.get_pipeline_orders_group_by_date_and_time_slot_for_service_location_ids(
+                    [str(location_id) for location_id in agent.service_location_ids],  # type: ignore
+                    ordered_statuses,
+                    _get_projection(summary),
+                    page,
+                )
+            )
+            grouped_orders = _parse_grouped_orders(
+                await db.order.aggregate(pipeline).to_list(None), order_model
+            )
 
         if not grouped_orders:
             response.message = "No orders found"
             return response
 
-        grouped_dict = await _group_by_date_and_time_slot_routable(
-            grouped_orders, route_required
+        response.next_cursor = pagination.get_next_cursor(
+            _orders_of_groups(grouped_orders), page
+        )
+        grouped_dict, unsorted_groups = await _group_by_date_and_time_slot_routable(
+            grouped_orders, route_required, route_engine
         )
         response.data = _construct_fetch_order_response(
-            grouped_dict, ordered_statuses, ["Pickup / Delivery"], True
+            grouped_dict,
+            ordered_statuses,
+            ["Pickup / Delivery"],
+            True,
+            unsorted_groups,
         )
         return response
 
@@ -194,17 +263,25 @@ async def get_orders_group_by_date_and_time_slot_routable(
 async def _group_by_date_and_time_slot_routable(
     grouped_orders,
     route_required=False,
-) -> Dict:
+    route_engine: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> Tuple[Dict, Set[Tuple[datetime, str]]]:
     """Group orders by date and time slot with optional routing.
 
     Args:
-        grouped_orders (List[Dict]): Raw grouped orders from database
+        grouped_orders (List[Dict]): Grouped orders with orders read into models
         route_required (bool, optional): Whether to calculate optimal route. Defaults to False.
+        route_engine (Optional[str], optional): Engine to route with. Defaults to None.
+        deadline (Optional[float], optional): Event loop time routing must end by.
+            Defaults to None, GROUP_ROUTING_DEADLINE_SECONDS from now.
 
     Returns:
-        Dict: Nested dictionary with structure {date: {time_slot: [orders]}}
+        Tuple[Dict, Set[Tuple[datetime, str]]]: Nested dictionary with structure
+            {date: {time_slot: [orders]}} and the (date, time_slot) groups left
+            unsorted because routing missed the deadline
     """
     grouped_dict: Dict = {}
+    routable_groups: List[Tuple[datetime, str]] = []
 
     for order_group in grouped_orders:
         if (
@@ -222,12 +299,68 @@ async def _group_by_date_and_time_slot_routable(
         can_route = await _add_orders_to_grouped_dict_by_date_and_time_slot(
             grouped_dict, date, time_slot, orders_list_for_date_and_slot, route_required
         )
+        if can_route:
+            routable_groups.append((date, time_slot))
 
-        grouped_dict[date][time_slot] = await _sort_orders_if_routable(
-            grouped_dict[date][time_slot], can_route
-        )
+    unsorted_groups = await _sort_groups_concurrently(
+        grouped_dict, routable_groups, route_engine, deadline
+    )
+    return grouped_dict, unsorted_groups
 
-    return grouped_dict
+
+async def _sort_groups_concurrently(
+    grouped_dict: Dict,
+    routable_groups: List[Tuple[datetime, str]],
+    route_engine: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> Set[Tuple[datetime, str]]:
+    """Route all groups at once, bounded by a semaphore and one deadline.
+
+    Args:
+        grouped_dict (Dict): Dictionary with structure {date: {time_slot: [orders]}}
+        routable_groups (List[Tuple[datetime, str]]): (date, time_slot) groups to route
+        route_engine (Optional[str], optional): Engine to route with. Defaults to None.
+        deadline (Optional[float], optional): Event loop time routing must end by.
+            Defaults to None, GROUP_ROUTING_DEADLINE_SECONDS from now.
+
+    Returns:
+        Set[Tuple[datetime, str]]: Groups that missed the deadline and stay unsorted
+    """
+    if not routable_groups:
+        return set()
+
+    semaphore = asyncio.Semaphore(RouteConfig.GROUP_ROUTING_CONCURRENCY)
+
+    async def sort_group(date: datetime, time_slot: str):
+        async with semaphore:
+            grouped_dict[date][time_slot] = await _sort_orders_if_routable(
+                grouped_dict[date][time_slot], True, route_engine
+            )
+
+    tasks = {
+        asyncio.create_task(sort_group(date, time_slot)): (date, time_slot)
+        for date, time_slot in routable_groups
+    }
+    timeout = RouteConfig.GROUP_ROUTING_DEADLINE_SECONDS
+    if deadline is not None:
+        timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+    done, pending = await asyncio.wait(tasks.keys(), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    for task in done:
+        if task.exception():
+            logger.error(
+                "Error routing group %s: %s", tasks[task], str(task.exception())
+            )
+    if pending:
+        metrics.increment("route.group_deadline_missed", len(pending))
+        logger.warning(
+            "Routing missed the deadline for groups: %s",
+            [tasks[task] for task in pending],
+        )
+    return {tasks[task] for task in pending}
 
 
 async def _add_orders_to_grouped_dict_by_date_and_time_slot(
@@ -278,12 +411,18 @@ async def _add_orders_to_grouped_dict_by_date_and_time_slot(
 async def get_orders_for_delivery_with_route(
     agent_mobile: str,
     ordered_statuses: List[OrderStatusEnum],
+    route_engine: Optional[str] = None,
+    summary: bool = False,
+    page: Optional[OrderPage] = None,
 ) -> FetchOrdersResponse:
     """Fetch orders for delivery and optimize route.
 
     Args:
         agent_mobile (str): Mobile number of the service agent
         ordered_statuses (List[OrderStatusEnum]): List of order statuses to filter by
+        route_engine (Optional[str], optional): "osrm" or "local". Defaults to RouteConfig.ENGINE.
+        summary (bool, optional): Return OrderSummaryVo instead of full orders. Defaults to False.
+        page (Optional[OrderPage], optional): Window and page of orders. Defaults to None, all orders.
 
     Returns:
         FetchOrdersResponse: Response containing delivery orders with optimized route
@@ -301,17 +440,24 @@ async def get_orders_for_delivery_with_route(
             pipelines.get_pipeline_orders_by_status_for_service_location_ids(
                 [str(location_id) for location_id in agent.service_location_ids],  # type: ignore
                 ordered_statuses,
+                _get_projection(summary),
+                page,
             )
         )
 
-        delivery_orders = await db.order.aggregate(pipeline).to_list(None)
+        order_model = _get_order_model(summary)
+        delivery_orders = [
+            order_model(**order)
+            for order in await db.order.aggregate(pipeline).to_list(None)
+        ]
 
         if not delivery_orders:
             response.message = "No orders found"
             return response
 
+        response.next_cursor = pagination.get_next_cursor(delivery_orders, page)
         response_dict = await _get_response_dict_for_delivery_with_route(
-            delivery_orders
+            delivery_orders, route_engine
         )
 
         response.data = _construct_fetch_order_response(
@@ -333,11 +479,14 @@ async def get_orders_for_delivery_with_route(
         ) from e
 
 
-async def _get_response_dict_for_delivery_with_route(orders) -> Dict:
+async def _get_response_dict_for_delivery_with_route(
+    orders, route_engine: Optional[str] = None
+) -> Dict:
     """Construct response dictionary for delivery orders with route optimization.
 
     Args:
-        orders (List[Dict]): List of delivery orders
+        orders (List[OrderVo | OrderSummaryVo]): List of delivery orders
+        route_engine (Optional[str], optional): Engine to route with. Defaults to None.
 
     Returns:
         Dict: Response dictionary with optimized routes
@@ -360,19 +509,260 @@ async def _get_response_dict_for_delivery_with_route(orders) -> Dict:
         order_list_for_date_and_slot,
     )
 
-    await _sort_orders_if_routable(order_list_for_date_and_slot, can_route)
+    order_list_for_date_and_slot = await _sort_orders_if_routable(
+        order_list_for_date_and_slot, can_route, route_engine
+    )
 
     response_dict[now]["Routes"] = order_list_for_date_and_slot
 
     return response_dict
 
 
+# Route : 1 and 2, streamed
+async def stream_orders_group_by_status_and_date_and_time_slot(
+    agent_mobile: str,
+    ordered_statuses: List[OrderStatusEnum],
+    summary: bool = False,
+    page: Optional[OrderPage] = None,
+) -> AsyncIterator[FetchOrdersStreamItem]:
+    """Stream orders grouped by status, date, and time slot, a group at a time.
+
+    Args:
+        agent_mobile (str): Mobile number of the service agent
+        ordered_statuses (List[OrderStatusEnum]): List of order statuses to filter by
+        summary (bool, optional): Return OrderSummaryVo instead of full orders. Defaults to False.
+        page (Optional[OrderPage], optional): Window and page of orders. Defaults to None, all orders.
+
+    Returns:
+        AsyncIterator[FetchOrdersStreamItem]: An item per group, then a closing item
+
+    Raises:
+        HTTPException: If agent not found, before anything is streamed
+    """
+    agent: ServiceAgent = await _retrieve_agent_by_mobile_with_service_location(
+        agent_mobile
+    )
+    pipeline: List[Dict[str, Any]] = (
+        pipelines.get_pipeline_orders_group_by_status_and_date_and_time_slot_for_service_location_ids(
+            agent.service_location_ids,  # type: ignore
+            ordered_statuses,
+            _get_projection(summary),
+            page,
+        )
+    )
+    order_groups = _iterate_grouped_orders(
+        agent.service_location_ids,  # type: ignore
+        ordered_statuses,
+        True,
+        _get_order_model(summary),
+        page,
+        pipeline,
+    )
+
+    async def construct_items(order_group) -> List[FetchOrdersResponseDataItem]:
+        grouped_dict = _group_by_status_and_date_and_time_slot([order_group])
+        return _construct_fetch_order_response(grouped_dict, ordered_statuses)
+
+    return _stream_order_groups(order_groups, construct_items, page)
+
+
+async def stream_orders_group_by_date_and_time_slot_routable(
+    agent_mobile: str,
+    ordered_statuses: List[OrderStatusEnum],
+    route_required: bool = False,
+    route_engine: Optional[str] = None,
+    summary: bool = False,
+    page: Optional[OrderPage] = None,
+) -> AsyncIterator[FetchOrdersStreamItem]:
+    """Stream orders grouped by date and time slot, each group routed before it is
+    sent. Groups share one routing deadline, later groups get what is left of it.
+
+    Args:
+        agent_mobile (str): Mobile number of the service agent
+        ordered_statuses (List[OrderStatusEnum]): List of order statuses to filter by
+        route_required (bool, optional): Whether to calculate optimal route. Defaults to False.
+        route_engine (Optional[str], optional): "osrm" or "local". Defaults to RouteConfig.ENGINE.
+        summary (bool, optional): Return OrderSummaryVo instead of full orders. Defaults to False.
+        page (Optional[OrderPage], optional): Window and page of orders. Defaults to None, all orders.
+
+    Returns:
+        AsyncIterator[FetchOrdersStreamItem]: An item per group, then a closing item
+
+    Raises:
+        HTTPException: If agent not found, before anything is streamed
+    """
+    agent: ServiceAgent = await _retrieve_agent_by_mobile_with_service_location(
+        agent_mobile
+    )
+    pipeline: List[Dict[str, Any]] = (
+        pipelines.get_pipeline_orders_group_by_date_and_time_slot_for_service_location_ids(
+            [str(location_id) for location_id in agent.service_location_ids],  # type: ignore
+            ordered_statuses,
+            _get_projection(summary),
+            page,
+        )
+    )
+    order_groups = _iterate_grouped_orders(
+        agent.service_location_ids,  # type: ignore
+        ordered_statuses,
+        False,
+        _get_order_model(summary),
+        page,
+        pipeline,
+    )
+    deadline = (
+        asyncio.get_running_loop().time() + RouteConfig.GROUP_ROUTING_DEADLINE_SECONDS
+    )
+
+    async def construct_items(order_group) -> List[FetchOrdersResponseDataItem]:
+        grouped_dict, unsorted_groups = await _group_by_date_and_time_slot_routable(
+            [order_group], route_required, route_engine, deadline
+        )
+        if not grouped_dict:
+            return []
+        return _construct_fetch_order_response(
+            grouped_dict,
+            ordered_statuses,
+            ["Pickup / Delivery"],
+            True,
+            unsorted_groups,
+        )
+
+    return _stream_order_groups(order_groups, construct_items, page)
+
+
+async def _iterate_grouped_orders(
+    service_location_ids: List,
+    ordered_statuses: List[OrderStatusEnum],
+    by_status: bool,
+    order_model: Type[OrderVo | OrderSummaryVo],
+    page: Optional[OrderPage],
+    pipeline: List[Dict[str, Any]],
+) -> AsyncIterator[Dict]:
+    """Yield order groups one at a time from the order views, or from the
+    aggregation cursor when the views cannot answer.
+
+    Args:
+        service_location_ids (List): Service locations of the agent
+        ordered_statuses (List[OrderStatusEnum]): List of order statuses to filter by
+        by_status (bool): Whether groups are by status as well as date and time slot
+        order_model (Type[OrderVo | OrderSummaryVo]): Model to read orders into
+        page (Optional[OrderPage]): Window and page of orders
+        pipeline (List[Dict[str, Any]]): Aggregation grouping the orders
+
+    Returns:
+        AsyncIterator[Dict]: Groups of {"_id": {...}, "orders": [order_model]}
+    """
+    grouped_orders = await order_view.get_grouped_orders(
+        service_location_ids,
+        ordered_statuses,
+        by_status=by_status,
+        order_model=order_model,
+        page=page,
+    )
+    if grouped_orders is not None:
+        for order_group in grouped_orders:
+            yield order_group
+        return
+
+    async for order_group in db.order.aggregate(
+        pipeline, batchSize=OrderListConfig.STREAM_BATCH_SIZE
+    ):
+        yield _parse_grouped_orders([order_group], order_model)[0]
+
+
+async def _stream_order_groups(
+    order_groups: AsyncIterator[Dict],
+    construct_items: Callable[[Dict], Awaitable[List[FetchOrdersResponseDataItem]]],
+    page: Optional[OrderPage],
+) -> AsyncIterator[FetchOrdersStreamItem]:
+    """Turn order groups into stream items as they arrive.
+
+    Args:
+        order_groups (AsyncIterator[Dict]): Groups of orders read into models
+        construct_items (Callable): Builds the response items of one group
+        page (Optional[OrderPage]): Window and page of orders
+
+    Returns:
+        AsyncIterator[FetchOrdersStreamItem]: An item per group, then a closing
+            item with next_cursor, or with success False if streaming failed
+    """
+    start_time = time.perf_counter()
+    order_count = 0
+    last_orders: List = []
+    first_sent = False
+    try:
+        async for order_group in order_groups:
+            orders = order_group.get("orders") or []
+            if orders:
+                # Groups keep the page's order, so their last order is the one
+                # furthest down the page. Taken before routing reorders them.
+                order_count += len(orders)
+                last_orders.append(orders[-1])
+            for item in await construct_items(order_group):
+                if not first_sent:
+                    first_sent = True
+                    metrics.latency("orders.stream.first_group").record(
+                        time.perf_counter() - start_time
+                    )
+                yield FetchOrdersStreamItem(data=item)
+    except Exception as e:
+        logger.error("Error occurred while streaming orders: %s", str(e), exc_info=True)
+        yield FetchOrdersStreamItem(
+            success=False, message="Error occurred in fetch orders", done=True
+        )
+        return
+
+    yield FetchOrdersStreamItem(
+        message=None if order_count else "No orders found",
+        next_cursor=pagination.get_next_cursor(last_orders, page, order_count),
+        done=True,
+    )
+
+
 # Util functions
+def _get_order_model(summary: bool) -> Type[OrderVo | OrderSummaryVo]:
+    return OrderSummaryVo if summary else OrderVo
+
+
+def _get_projection(summary: bool) -> Optional[Dict[str, Any]]:
+    return pipelines.ORDER_SUMMARY_PROJECTION if summary else None
+
+
+def _parse_grouped_orders(
+    grouped_orders: List[Dict], order_model: Type[OrderVo | OrderSummaryVo]
+) -> List[Dict]:
+    """Read the orders of each aggregated group into order_model.
+
+    Args:
+        grouped_orders (List[Dict]): Groups of {"_id": {...}, "orders": [documents]}
+        order_model (Type[OrderVo | OrderSummaryVo]): Model to read orders into
+
+    Returns:
+        List[Dict]: The same groups with model instances as orders
+    """
+    for order_group in grouped_orders:
+        if order_group.get("orders"):
+            order_group["orders"] = [
+                order_model(**order) for order in order_group["orders"]
+            ]
+    return grouped_orders
+
+
+def _orders_of_groups(grouped_orders: List[Dict]) -> List:
+    return [
+        order
+        for order_group in grouped_orders
+        for order in order_group.get("orders") or []
+    ]
+
+
 def _construct_fetch_order_response(
     grouped_dict: Dict,
     ordered_statuses: List[OrderStatusEnum],
     labels: Optional[List[str]] = None,
     single_status_group: bool = False,
+    unsorted_groups: Optional[Set[Tuple[datetime, str]]] = None,
 ) -> List[FetchOrdersResponseDataItem]:
     """Construct the final response from grouped orders.
 
@@ -381,6 +771,8 @@ def _construct_fetch_order_response(
         ordered_statuses (List[OrderStatusEnum]): List of order statuses
         labels (Optional[List[str]], optional): Custom labels for status groups. Defaults to None.
         single_status_group (bool, optional): Whether to combine all statuses. Defaults to False.
+        unsorted_groups (Optional[Set[Tuple[datetime, str]]], optional): Groups whose routing
+            missed the deadline. Defaults to None.
 
     Returns:
         List[FetchOrdersResponseDataItem]: Formatted response items
@@ -404,7 +796,7 @@ def _construct_fetch_order_response(
         elif len(labels) != 1:
             raise ValueError("Labels should be provided for single status group")
 
-        date_item_list = _construct_date_item_list(grouped_dict)
+        date_item_list = _construct_date_item_list(grouped_dict, unsorted_groups)
         response_body.append(
             FetchOrdersResponseDataItem(key=key, label=labels[0], dates=date_item_list)
         )
@@ -431,25 +823,31 @@ def _construct_fetch_order_response(
     return response_body
 
 
-def _construct_date_item_list(status_dict) -> List[DateItem]:
+def _construct_date_item_list(status_dict, unsorted_groups=None) -> List[DateItem]:
     """Construct a list of DateItem objects from status dictionary.
 
     Args:
         status_dict (Dict): Dictionary of orders grouped by date and time slot
+        unsorted_groups (Set[Tuple[datetime, str]], optional): Groups whose routing
+            missed the deadline. Defaults to None.
 
     Returns:
         List[DateItem]: List of DateItem objects
     """
     date_item_list: List[DateItem] = []
-    return _populate_date_item_list(status_dict, date_item_list)
+    return _populate_date_item_list(status_dict, date_item_list, unsorted_groups)
 
 
-def _populate_date_item_list(status_dict, date_item_list) -> List[DateItem]:
+def _populate_date_item_list(
+    status_dict, date_item_list, unsorted_groups=None
+) -> List[DateItem]:
     """Populate a list of DateItem objects from status dictionary.
 
     Args:
         status_dict (Dict): Dictionary of orders grouped by date and time slot
         date_item_list (List[DateItem]): List to populate with DateItem objects
+        unsorted_groups (Set[Tuple[datetime, str]], optional): Groups whose routing
+            missed the deadline. Defaults to None.
 
     Returns:
         List[DateItem]: Populated list of DateItem objects
@@ -458,9 +856,10 @@ def _populate_date_item_list(status_dict, date_item_list) -> List[DateItem]:
         date_dict = status_dict[date]
         time_slot_item_list: List[TimeSlotItem] = []
         for time_slot in date_dict:
-            time_slot_item_list.append(
-                TimeSlotItem(time_slot=time_slot, orders=date_dict[time_slot])
-            )
+            time_slot_item = TimeSlotItem(time_slot=time_slot, orders=date_dict[time_slot])
+            if unsorted_groups and (date, time_slot) in unsorted_groups:
+                time_slot_item.route_deadline_missed = True
+            time_slot_item_list.append(time_slot_item)
         date_item_list.append(DateItem(date=date, time_slots=time_slot_item_list))
 
     return date_item_list
@@ -475,7 +874,7 @@ def _populate_order_list(
     """Populate the order list and determine if routing is needed.
 
     Args:
-        input_orders_list_for_date_and_slot (List[Dict]): List of orders to process
+        input_orders_list_for_date_and_slot (List[OrderVo | OrderSummaryVo]): List of orders to process
         route_required (bool): Whether routing is required
         cuttoff_time (datetime): Cutoff time for routing
         output_orders_list_for_date_and_slot (List[Order]): List to populate with orders
@@ -485,8 +884,6 @@ def _populate_order_list(
     """
     can_route = False
     for order in input_orders_list_for_date_and_slot:
-        order = OrderVo(**order)
-
         if (
             route_required
             and not can_route
@@ -523,13 +920,16 @@ def _populate_order_list(
 
 
 async def _sort_orders_if_routable(
-    order_list_for_date_and_slot: List[Order], can_route: bool
+    order_list_for_date_and_slot: List[Order],
+    can_route: bool,
+    route_engine: Optional[str] = None,
 ) -> List[Order]:
     """Sort orders using route optimization if possible.
 
     Args:
         order_list_for_date_and_slot (List[Order]): Orders to sort
         can_route (bool): Whether routing is possible
+        route_engine (Optional[str], optional): Engine to route with. Defaults to None.
 
     Returns:
         List[Order]: Sorted orders, either by route or original order
@@ -540,7 +940,7 @@ async def _sort_orders_if_routable(
     if can_route:
         try:
             order_list_for_date_and_slot = await route.route_sort_orders(
-                order_list_for_date_and_slot
+                order_list_for_date_and_slot, route_engine
             )
             logger.info("Route sorted orders: %s", order_list_for_date_and_slot)
         except HTTPException as e:
@@ -609,8 +1009,8 @@ async def _get_agent_by_mobile(agent_mobile) -> ServiceAgent:
     Raises:
         HTTPException: If agent not found
     """
-    agent_data = await db.service_agent.find_one({"mobile": agent_mobile})
-    if agent_data is None:
+    agent = await agent_cache.get_agent(agent_mobile)
+    if agent is None:
         raise HTTPException(status_code=404, detail="Service agent not found")
 
-    return ServiceAgent(**agent_data)
+    return agent
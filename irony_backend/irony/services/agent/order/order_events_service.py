@@ -0,0 +1,49 @@
+import asyncio
+from typing import AsyncIterator, List
+
+from fastapi import HTTPException
+
+from irony.config.order_view.order_view_config import OrderViewConfig
+from irony.util import agent_cache, order_events, streaming
+
+
+async def stream_order_events(agent_mobile: str) -> AsyncIterator[str]:
+    """Follow the deltas of the orders of an agent's service locations.
+
+    Args:
+        agent_mobile (str): Mobile number of the service agent
+
+    Returns:
+        AsyncIterator[str]: Server-sent events, a resync first and then an
+            "order" event per delta, with heartbeats while idle
+
+    Raises:
+        HTTPException: If live updates are disabled, or the agent is not found
+            or has no service locations
+    """
+    if not (OrderViewConfig.ENABLED and OrderViewConfig.EVENTS_ENABLED):
+        raise HTTPException(status_code=503, detail="Live order updates are disabled")
+
+    agent = await agent_cache.get_agent(agent_mobile)
+    if agent is None:
+        raise HTTPException(status_code=404, detail="Service agent not found")
+    if not agent.service_location_ids:
+        raise HTTPException(
+            status_code=400, detail="Service agent has no service locations"
+        )
+    return _stream(agent.service_location_ids)
+
+
+async def _stream(service_location_ids: List) -> AsyncIterator[str]:
+    async with order_events.subscribe(service_location_ids) as queue:
+        # Sent once subscribed, so lists loaded on it miss no later delta.
+        yield streaming.sse_message(order_events.RESYNC, event="order")
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    queue.get(), timeout=OrderViewConfig.EVENTS_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield streaming.SSE_HEARTBEAT
+                continue
+            yield streaming.sse_message(message, event="order")
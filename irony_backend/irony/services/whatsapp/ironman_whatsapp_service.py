@@ -10,7 +10,7 @@ from irony.models.order import Order
 from irony.models.order_request import OrderRequest
 from irony.models.order_status import OrderStatus
 from irony.config.logger import logger
-from irony.util import background_process, utils
+from irony.util import background_process, order_view, utils
 from irony.util import whatsapp_utils
 from irony.util.message import Message
 from irony.db import db
@@ -53,6 +53,7 @@ async def update_order_status(reply, status: OrderStatusEnum):
                     "$position": 0,
                 }
             },
+            "$inc": {"version": 1},
         },
         return_document=True,
     )
@@ -60,6 +61,8 @@ async def update_order_status(reply, status: OrderStatusEnum):
         logger.error(
             f"Unable to update status for order where {where} to status {status.value}"
         )
+        return
+    await order_view.apply([order_doc])
 
 
 async def process_ironman_response(contact_details: ContactDetails, context, reply):
@@ -144,52 +147,37 @@ async def handle_ironman_accept(contact_details: ContactDetails, reply_id):
                 order, order_request.service_location
             )
         ):
-            await db.order.replace_one(
-                {"_id": order.id},
-                order.model_dump(exclude_unset=True, by_alias=True),
-            )
-
             logger.info(
                 f"Order:{order.id} accepted by service_location: {order_request.service_location_id} ,ironman:{contact_details.wa_id}"
             )
 
             # Send message to user that ironman accepted the order.
+            time_slot_title = (
+                config.DB_CACHE["call_to_action"]
+                .get(order.time_slot, {})
+                .get("title", "N/A")
+            )
             user_ironman_alloted_msg = whatsapp_utils.get_reply_message(
                 message_key="new_order_ironman_alloted",
                 message_sub_type="reply",
-            )
-
-            utils.replace_message_keys_with_values(
-                user_ironman_alloted_msg,
-                {
-                    "{service_location_name}": str(
+                replacements={
+                    "service_location_name": str(
                         getattr(
                             order_request.service_location,
                             "name",
                             "Our Service Provider",
                         )
                     ),
-                    "{time}": config.DB_CACHE["call_to_action"]
-                    .get(order.time_slot, {})
-                    .get("title", "N/A"),
+                    "time": time_slot_title,
                 },
             )
             await Message(user_ironman_alloted_msg).send_message(order.user_wa_id)
 
             # Send message to ironman that order is assigened to him.
             ironman_order_alloted_message = whatsapp_utils.get_reply_message(
-                message_key="ironman_order_alloted", message_type="text"
-            )
-
-            ironman_order_alloted_message["text"]["body"] = (
-                utils.replace_keys_with_values(
-                    ironman_order_alloted_message["text"]["body"],
-                    {
-                        "{time}": config.DB_CACHE["call_to_action"]
-                        .get(order.time_slot, {})
-                        .get("title", "N/A"),
-                    },
-                )
+                message_key="ironman_order_alloted",
+                message_type="text",
+                replacements={"time": time_slot_title},
             )
 
             await Message(ironman_order_alloted_message).send_message(
@@ -13,7 +13,7 @@ from irony.models.order_status import OrderStatus
 from irony.models.service import Service
 from irony.models.user import User
 from irony.config.logger import logger
-from irony.util import background_process, utils
+from irony.util import background_process, delay_queue, order_view
 from irony.util import whatsapp_utils
 from irony.util.message import Message
 from irony.db import db
@@ -211,6 +211,7 @@ async def handle_no_location_order_update(
                     "$position": 0,
                 }
             },
+            "$inc": {"version": 1},
         },
         return_document=True,
     )
@@ -242,6 +243,7 @@ async def handle_existing_location_order_update(
                     "$position": 0,
                 }
             },
+            "$inc": {"version": 1},
         },
         return_document=True,
     )
@@ -275,7 +277,7 @@ async def set_new_order_location(message_details, contact_details: ContactDetail
     order.updated_on = datetime.now()
     # update order
     updated_order = await db.order.replace_one(
-        {"_id": order.id},
+        order_view.bump_version(order),
         order.model_dump(exclude_defaults=True, exclude={"id"}, by_alias=True),
     )
     if updated_order.modified_count == 0:
@@ -309,14 +311,10 @@ async def handle_order_location_update(contact_details, coords, order):
         message_body = whatsapp_utils.get_reply_message(
             message_key="new_order_pending",
             message_sub_type="reply",
-        )
-
-        utils.replace_message_keys_with_values(
-            message_body,
-            {
+            replacements={
                 # TODO change this to actual chosen date
-                "{date}": order.created_on.strftime("%d-%m-%Y"),
-                "{time}": config.DB_CACHE["call_to_action"]
+                "date": order.created_on.strftime("%d-%m-%Y"),
+                "time": config.DB_CACHE["call_to_action"]
                 .get(order.time_slot, {})
                 .get("title", "N/A"),
             },
@@ -358,14 +356,14 @@ async def set_new_order_time_slot(
             },
         )
         order = Order(**order)
+        await delay_queue.schedule(
+            delay_queue.ORDER, order.id, order.trigger_order_request_at
+        )
 
         # send message to user that last location will be used with location reply. and if he wants to change location he can do so.
         message_body = whatsapp_utils.get_reply_message(
             message_key="existing_location",
-        )
-
-        utils.replace_message_keys_with_values(
-            message_body, {"{nickname}": order.location.nickname}
+            replacements={"nickname": order.location.nickname},
         )
 
     # Else update timeslot and send message new_order_pending message to user.
@@ -378,14 +376,10 @@ async def set_new_order_time_slot(
         message_body = whatsapp_utils.get_reply_message(
             message_key="new_order_pending",
             message_sub_type="reply",
-        )
-
-        utils.replace_message_keys_with_values(
-            message_body,
-            {
+            replacements={
                 # TODO change this to actual chosen date
-                "{date}": order.pickup_date_time.start.strftime("%d-%m-%Y"),
-                "{time}": config.DB_CACHE["call_to_action"]
+                "date": order.pickup_date_time.start.strftime("%d-%m-%Y"),
+                "time": config.DB_CACHE["call_to_action"]
                 .get(order.time_slot, {})
                 .get("title", "N/A"),
             },
@@ -451,6 +445,7 @@ async def update_order_timeslot_details(
                     "$position": 0,
                 }
             },
+            "$inc": {"version": 1},
         },
         return_document=True,
     )
@@ -0,0 +1,102 @@
+import asyncio
+from typing import Optional
+
+from pymongo.errors import OperationFailure
+
+from irony.cache import CHANGE_STREAM_NOT_SUPPORTED
+from irony.config.agent.agent_cache_config import AgentCacheConfig
+from irony.config.logger import logger
+from irony.db import db
+from irony.models.service_agent.service_agent import ServiceAgent
+from irony.util import metrics
+from irony.util.ttl_cache import TTLCache
+
+_agents: TTLCache[ServiceAgent] = TTLCache(
+    AgentCacheConfig.MAX_SIZE, AgentCacheConfig.TTL_SECONDS
+)
+# Bumped on every invalidation, so an agent read before it is not cached after.
+_generation = 0
+_watcher: Optional[asyncio.Task] = None
+
+
+async def get_agent(mobile: str) -> Optional[ServiceAgent]:
+    """
+    The service agent with the given mobile number, read from mongo only when
+    not cached.
+
+    Args:
+        mobile (str): Mobile number of the agent, the token's subject
+
+    Returns:
+        Optional[ServiceAgent]: The agent, None if there is none
+    """
+    agent = _agents.get(mobile)
+    if agent is not None:
+        return agent
+    metrics.increment("agent_cache.miss")
+    generation = _generation
+    agent_doc = await db.service_agent.find_one({"mobile": mobile})
+    if agent_doc is None:
+        return None
+    agent = ServiceAgent(**agent_doc)
+    if generation == _generation:
+        _agents.set(mobile, agent)
+    return agent
+
+
+def invalidate(mobile: Optional[str] = None):
+    """Drop one cached agent, or every agent when no mobile is given."""
+    global _generation
+    _generation += 1
+    if mobile is None:
+        _agents.clear()
+    else:
+        _agents.pop(mobile)
+
+
+def _agent_changed(change):
+    operation = change.get("operationType")
+    if operation == "insert":
+        # Missing agents are not cached, a new one is read on first use.
+        return
+    updated_fields = change.get("updateDescription", {}).get("updatedFields", {})
+    mobile = (change.get("fullDocument") or {}).get("mobile")
+    if operation == "update" and mobile and "mobile" not in updated_fields:
+        invalidate(mobile)
+    else:
+        # Deletes, replaces and number changes do not say which mobile to drop.
+        invalidate()
+
+
+async def _watch_agents():
+    while True:
+        try:
+            async with db.service_agent.watch(full_document="updateLookup") as stream:
+                # Changes made while no stream was open are unknown.
+                invalidate()
+                async for change in stream:
+                    _agent_changed(change)
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAM_NOT_SUPPORTED:
+                logger.info(f"Change streams unavailable, agents expire by TTL: {e}")
+                return
+            logger.error(f"Agent change stream failed, rewatching: {e}")
+        except Exception as e:
+            logger.error(f"Agent change stream failed, rewatching: {e}")
+        await asyncio.sleep(AgentCacheConfig.CHANGE_STREAM_RETRY_SECONDS)
+
+
+def start():
+    global _watcher
+    if AgentCacheConfig.WATCH_CHANGE_STREAM and _watcher is None:
+        _watcher = asyncio.create_task(_watch_agents())
+
+
+async def stop():
+    global _watcher
+    if _watcher is not None:
+        _watcher.cancel()
+        await asyncio.gather(_watcher, return_exceptions=True)
+        _watcher = None
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Optional, Tuple
 from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.security.utils import get_authorization_scheme_param
@@ -6,9 +6,14 @@ from passlib.context import CryptContext
 import jwt
 from datetime import datetime, timedelta, timezone
 
+from irony.config.agent.auth_config import AuthConfig
+
 # Bcrypt
-# Password hashing setup
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing setup, these block for the whole hash. Async code goes
+# through util.password_hasher instead.
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=AuthConfig.BCRYPT_ROUNDS
+)
 
 
 def hash_password(password: str) -> str:
@@ -19,6 +24,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password, also hashing it again when its hash is below the
+    current cost. Returns whether it matched and the new hash, if any."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 # JWT
 SECRET_KEY = "your_secret_key"
 ALGORITHM = "HS256"
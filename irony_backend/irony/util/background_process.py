@@ -1,13 +1,16 @@
 import asyncio
 import copy
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
 
 import irony.util.whatsapp_utils as whatsapp_utils
 from irony import cache
 from irony.config import config
 from irony.config.logger import logger
-from irony.db import db, replace_documents_in_transaction
+from irony.config.matching.matching_config import MatchingConfig
+from irony.db import bulk_write_operations, db, replace_documents_in_transaction
 from irony.exception.WhatsappException import WhatsappException
 from irony.models.order import Order
 from irony.models.order_request import OrderRequest
@@ -16,10 +19,40 @@ from irony.models.pickup_tIme import PickupDateTime
 from irony.models.pyobjectid import PyObjectId  # Add this import
 from irony.models.service_location import DeliveryTypeEnum, ServiceLocation
 from irony.models.timeslot_volume import TimeslotVolume
+from irony.services.agent.order import fetch_orders_service
 from irony.services.whatsapp import user_whatsapp_service
-from irony.util import utils
+from irony.util import (
+    capacity_reservation,
+    delay_queue,
+    order_view,
+    pipelines,
+    service_location_index,
+    utils,
+)
 from irony.util.message import Message
 
+# The polling jobs and the delay queue dispatcher both run in the scheduler
+# leader, these keep them from picking up the same documents at once.
+_order_requests_lock = asyncio.Lock()
+_pending_order_requests_lock = asyncio.Lock()
+
+
+def _is_matchable(order: Order) -> bool:
+    if not order.location or not order.location.location or not order.services:
+        logger.error(
+            "Developer concern, Order has required empty value %s but trying to create ironman order requests. order_id : %s",
+            {"order.location": order.location, "order.services": order.services},
+            order.id,
+        )
+        return False
+    return True
+
+
+def _get_geo_near_radius() -> float:
+    return (
+        config.DB_CACHE.get("config", {}).get("geo_near_radius", {}).get("value", 2000)
+    )
+
 
 async def create_ironman_order_requests(order: Order, wa_id: str):
     try:
@@ -27,192 +60,153 @@ async def create_ironman_order_requests(order: Order, wa_id: str):
         # create a 2d sphere index for a service location table
         # find all records within 2km.
 
-        # services_match_list = [
-        #     {"$elemMatch": {"service_id": service.id} for service in order.services}
-        # ]
-
-        if not order.location or not order.location.location or not order.services:
-            logger.error(
-                "Developer concern, Order has required empty value %s but trying to create ironman order requests. order_id : %s",
-                {"order.location": order.location, "order.services": order.services},
-                order.id,
-            )
+        if not _is_matchable(order):
             raise WhatsappException(config.DEFAULT_ERROR_REPLY_MESSAGE)
 
-        geo_near_radius = (
-            config.DB_CACHE.get("config", {})
-            .get("geo_near_radius", {})
-            .get("value", 2000)
+        nearby_service_locations = await service_location_index.find_nearby(
+            order.location.location.coordinates,
+            [service.id for service in order.services],
+            order.time_slot,
+            _get_geo_near_radius(),
+        )
+        order_requests = await _build_order_requests(
+            order, wa_id, nearby_service_locations
         )
+        await _insert_order_requests(order_requests)
+    except Exception as e:
+        logger.error("Exception in find_ironman", exc_info=True)
 
-        pipeline: List[Dict[str, Any]] = [
-            {
-                "$geoNear": {
-                    "key": "coords",
-                    "near": {
-                        "type": "Point",
-                        "coordinates": order.location.location.coordinates,
-                    },
-                    "distanceField": "distance",
-                    "maxDistance": geo_near_radius,
-                    "spherical": True,
-                }
-            },
-            {
-                "$match": {
-                    "$expr": {
-                        "$gte": [
-                            "$range",
-                            "$distance",
-                        ]  # Filter where range is greater or equal to distance
-                    },
-                    "service_ids": {"$all": [service.id for service in order.services]},
-                    "time_slots": {"$in": [order.time_slot]},
-                }
-            },
-            {
-                "$lookup": {
-                    "from": "timeslot_volume",  # the collection to join
-                    "localField": "_id",  # field in orders referencing service_locations._id
-                    "foreignField": "service_location_id",  # field in service_locations to match
-                    "as": "timeslot_volumes",  # output array field for matched documents
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$delivery_type",  # Group by the "category" field
-                    "documents": {
-                        "$push": "$$ROOT"
-                    },  # Push the entire document into the "documents" array
-                }
-            },
-            # {
-            #     "$unwind": "$time_slot_volume"  # flatten if each order has only one service location
-            # },
-            # {
-            #     "$project": {
-            #         "distance": 1,
-            #         "_id": 1,
-            #         # "services_dict": {
-            #         #     "$arrayToObject": {
-            #         #         "$map": {
-            #         #             "input": "$services",
-            #         #             "as": "service",
-            #         #             "in": {
-            #         #                 "k": {
-            #         #                     "$toString": "$$service.service_id"
-            #         #                 },  # Key is the activity's `id`
-            #         #                 "v": "$$service",  # Value is the activity object itself
-            #         #             },
-            #         #         }
-            #         #     }
-            #         # },
-            #     }
-            # },
-            {"$sort": {"distance": 1}},
-            {"$limit": 25},
-        ]
 
-        delivery_type_service_locations_list: List[Dict[str, Any]] = (
-            await db.service_locations.aggregate(pipeline=pipeline).to_list(length=None)
-        )
+async def create_ironman_order_requests_batch(orders: List[Order]):
+    """
+    create_ironman_order_requests for many orders: candidates are matched in
+    one vectorized pass and every order request is written with one insert.
+
+    Args:
+        orders (List[Order]): Orders to create ironman order requests for
+    """
+    orders = [order for order in orders if _is_matchable(order)]
+    if not orders:
+        return
 
-        # List[Dict[DeliveryTypeEnum, List[ServiceLocation]]]
-        atleast_one_service_location_present = any(
-            location_type["documents"]
-            for location_type in delivery_type_service_locations_list
+    try:
+        nearby_per_order = await service_location_index.find_nearby_batch(
+            [order.location.location.coordinates for order in orders],
+            [[service.id for service in order.services] for order in orders],
+            [order.time_slot for order in orders],
+            _get_geo_near_radius(),
         )
-        # return nearby_service_locations
-        if not atleast_one_service_location_present:
-            # send message to user that no ironman found.
-            no_ironman_message_body = whatsapp_utils.get_reply_message(
-                "new_order_no_ironman", message_type="text"
+    except Exception:
+        logger.error("Exception matching order batch", exc_info=True)
+        return
+
+    async def build(order: Order, nearby_service_locations):
+        try:
+            return await _build_order_requests(
+                order, order.user_wa_id, nearby_service_locations
             )
-            await Message(no_ironman_message_body).send_message(wa_id)
-            raise Exception("No nearby ironman found.")
-
-        # Split nearby_service_locations into a dictionary based on delivery_type
-        # nearby_service_locations_dict = {
-        #     DeliveryTypeEnum.DELIVERY: [],
-        #     DeliveryTypeEnum.SELF_PICKUP: [],
-        # }
-
-        # for service_location in location_type_with_service_locations:
-        #     # first check if service completed_count is less than daily_count for that service.
-        #     delivery_type = get_delivery_enum_from_string(
-        #         service_location.get("delivery_type")
-        #     )
-        #     nearby_service_locations_dict[delivery_type].append(service_location)
-
-        # Sort each list by distance
-        # for delivery_type in nearby_service_locations_dict:
-        #     nearby_service_locations_dict[delivery_type].sort(key=lambda x: x["distance"])
-
-        order_requests: List[OrderRequest] = []
-        trigger_time = datetime.now()
-        # temp_name = ""
-
-        for delivery_type_service_locations in delivery_type_service_locations_list:
-            if delivery_type_service_locations["_id"] == DeliveryTypeEnum.SELF_PICKUP:
-                self_pickup_service_locations = delivery_type_service_locations[
-                    "documents"
-                ]
-                for index, service_location in enumerate(self_pickup_service_locations):
-                    service_location = ServiceLocation(**service_location)
-                    if service_location.auto_accept:
-                        if await check_limit_and_allot_order(
-                            order, service_location, True
-                        ):
-                            break
-                    else:
-                        trigger_time = trigger_time + timedelta(minutes=index * 1)
-                        order_request = OrderRequest(
-                            order_id=order.id,
-                            delivery_type=DeliveryTypeEnum.SELF_PICKUP,
-                            service_location_id=service_location.id,
-                            distance=service_location.distance,
-                            trigger_time=trigger_time,
-                            is_pending=True,
-                            try_count=0,
-                        )
-                        order_requests.append(order_request)
-
-            # delivery type service location's order request will be created here
-            elif delivery_type_service_locations["_id"] == DeliveryTypeEnum.DELIVERY:
-                delivery_service_locations = delivery_type_service_locations[
-                    "documents"
-                ]
-
-                delivery_service_locations_ids = [
-                    ServiceLocation(**service_location).id
-                    for service_location in delivery_service_locations
-                ]
-
-                trigger_time = trigger_time + timedelta(minutes=15)
-                order_request = OrderRequest(
-                    order_id=order.id,
-                    delivery_type=DeliveryTypeEnum.DELIVERY,
-                    delivery_service_locations_ids=delivery_service_locations_ids,
-                    trigger_time=trigger_time,
-                    is_pending=True,
-                    try_count=0,
-                )
-                order_requests.append(order_request)
-
-        if order_requests:
-            result = await db.order_request.insert_many(
-                [
-                    order_request.model_dump(exclude_defaults=True)
-                    for order_request in order_requests
-                ]
+        except Exception:
+            logger.error(
+                f"Exception in find_ironman for order {order.id}", exc_info=True
             )
+            return []
 
-            logger.info(
-                f"Inserted {len(result.inserted_ids)} rows. Into order_request collection. ids : {result.inserted_ids}"
+    # Auto accept allotments and no ironman messages still happen per order.
+    order_requests_per_order = await asyncio.gather(
+        *(
+            build(order, nearby_service_locations)
+            for order, nearby_service_locations in zip(orders, nearby_per_order)
+        )
+    )
+    try:
+        await _insert_order_requests(
+            [
+                order_request
+                for order_requests in order_requests_per_order
+                for order_request in order_requests
+            ]
+        )
+    except Exception:
+        logger.error("Exception inserting order request batch", exc_info=True)
+
+
+async def _build_order_requests(
+    order: Order,
+    wa_id: str,
+    nearby_service_locations: Dict[DeliveryTypeEnum, List[ServiceLocation]],
+) -> List[OrderRequest]:
+    if not any(nearby_service_locations.values()):
+        # send message to user that no ironman found.
+        no_ironman_message_body = whatsapp_utils.get_reply_message(
+            "new_order_no_ironman", message_type="text"
+        )
+        await Message(no_ironman_message_body).send_message(wa_id)
+        raise Exception("No nearby ironman found.")
+
+    order_requests: List[OrderRequest] = []
+    trigger_time = datetime.now()
+
+    self_pickup_service_locations = nearby_service_locations.get(
+        DeliveryTypeEnum.SELF_PICKUP, []
+    )
+    for index, service_location in enumerate(self_pickup_service_locations):
+        if service_location.auto_accept:
+            if await check_limit_and_allot_order(order, service_location, True):
+                break
+        else:
+            trigger_time = trigger_time + timedelta(minutes=index * 1)
+            order_request = OrderRequest(
+                order_id=order.id,
+                delivery_type=DeliveryTypeEnum.SELF_PICKUP,
+                service_location_id=service_location.id,
+                distance=service_location.distance,
+                trigger_time=trigger_time,
+                is_pending=True,
+                try_count=0,
             )
-        # logger.info(f"Order assigned to ServiceLocation {temp_name}.")
-    except Exception as e:
-        logger.error("Exception in find_ironman", exc_info=True)
+            order_requests.append(order_request)
+
+    # delivery type service location's order request will be created here
+    delivery_service_locations = nearby_service_locations.get(
+        DeliveryTypeEnum.DELIVERY, []
+    )
+    if delivery_service_locations:
+        trigger_time = trigger_time + timedelta(minutes=15)
+        order_request = OrderRequest(
+            order_id=order.id,
+            delivery_type=DeliveryTypeEnum.DELIVERY,
+            delivery_service_locations_ids=[
+                service_location.id for service_location in delivery_service_locations
+            ],
+            trigger_time=trigger_time,
+            is_pending=True,
+            try_count=0,
+        )
+        order_requests.append(order_request)
+
+    return order_requests
+
+
+async def _insert_order_requests(order_requests: List[OrderRequest]):
+    if not order_requests:
+        return
+    result = await db.order_request.insert_many(
+        [
+            order_request.model_dump(exclude_defaults=True)
+            for order_request in order_requests
+        ]
+    )
+
+    logger.info(
+        f"Inserted {len(result.inserted_ids)} rows. Into order_request collection. ids : {result.inserted_ids}"
+    )
+    await delay_queue.schedule_many(
+        delay_queue.ORDER_REQUEST,
+        zip(
+            result.inserted_ids,
+            [order_request.trigger_time for order_request in order_requests],
+        ),
+    )
 
 
 async def check_limit_and_allot_order(
@@ -242,51 +236,47 @@ async def check_limit_and_allot_order(
         None,
     )
 
-    if (
-        not timeslot_volume
-        or not timeslot_volume.timeslot_distributions
-        or not timeslot_volume.services_distribution
-    ):
+    if not timeslot_volume or not timeslot_volume.id:
         return False
 
-    timeslot = timeslot_volume.timeslot_distributions[order.time_slot]
-    service = timeslot_volume.services_distribution[
-        order.services[0].call_to_action_key
-    ]
-
+    # The quotas are checked and incremented in mongo, the copy loaded with the
+    # service location may already be stale.
+    time_slot = order.time_slot
+    service_key = order.services[0].call_to_action_key
     clothes_count = cache.get_clothes_cta_count(order.count_range)
-    if (
-        timeslot.limit is not None
-        and timeslot.current is not None
-        and service.limit is not None
-        and service.current is not None
-        and timeslot.limit - timeslot.current >= clothes_count
-        and service.limit - service.current >= clothes_count
+    if await capacity_reservation.reserve_capacity(
+        timeslot_volume.id, time_slot, service_key, clothes_count
     ):
-        timeslot.current += clothes_count
-        service.current += clothes_count
-        timeslot_volume.current_clothes += clothes_count
-
-        await db.timeslot_volume.replace_one(
-            {"_id": timeslot_volume.id},  # Match the document by its _id
-            timeslot_volume.model_dump(exclude_defaults=True, exclude={"id"}),
-        )
-
-        order_status = await whatsapp_utils.get_new_order_status(
-            order.id, OrderStatusEnum.PICKUP_PENDING
-        )
-        order.service_location_id = service_location.id
-        if order.order_status:
-            order.order_status.insert(0, order_status)
-        order.updated_on = datetime.now()
-        if auto_allot:
-            order.auto_alloted = True
-
-        await db.order.replace_one(
-            {"_id": order.id},
-            order.model_dump(exclude_defaults=True, exclude={"id"}, by_alias=True),
-        )
-        temp_name = service_location.name
+        try:
+            order_status = await whatsapp_utils.get_new_order_status(
+                order.id, OrderStatusEnum.PICKUP_PENDING
+            )
+            order.service_location_id = service_location.id
+            if order.order_status:
+                order.order_status.insert(0, order_status)
+            order.updated_on = datetime.now()
+            if auto_allot:
+                order.auto_alloted = True
+
+            # Only allot an order nobody else has allotted or changed meanwhile.
+            result = await db.order.replace_one(
+                {**order_view.bump_version(order), "service_location_id": None},
+                order.model_dump(exclude_defaults=True, exclude={"id"}, by_alias=True),
+            )
+        except Exception:
+            await capacity_reservation.release_capacity(
+                timeslot_volume.id, time_slot, service_key, clothes_count
+            )
+            raise
+        if result.matched_count == 0:
+            logger.info(
+                f"Order {order.id} was allotted or changed meanwhile, releasing capacity"
+            )
+            await capacity_reservation.release_capacity(
+                timeslot_volume.id, time_slot, service_key, clothes_count
+            )
+            return False
+        await order_view.apply([order])
 
         message_body = whatsapp_utils.get_reply_message(
             message_key="new_order_ironman_alloted",
@@ -305,48 +295,28 @@ async def check_limit_and_allot_order(
     return False
 
 
-async def send_pending_order_requests():
+async def send_pending_order_requests(
+    order_request_ids: Optional[List[PyObjectId]] = None,
+):
+    """
+    Send due order requests to ironmen. Called by the polling job for every due
+    request and by the delay queue with the ids that just became due.
+
+    Args:
+        order_request_ids (Optional[List[PyObjectId]]): Only consider these order requests
+    """
+    async with _pending_order_requests_lock:
+        await _send_pending_order_requests(order_request_ids)
+
+
+async def _send_pending_order_requests(order_request_ids: Optional[List[PyObjectId]]):
     logger.info("started send_ironman_request")
     logger.info("Finding pending orders")
     current_time = datetime.now()
 
-    pipeline = [
-        {
-            "$match": {
-                "trigger_time": {"$lt": current_time},
-                "is_pending": True,
-                "try_count": {"$lt": 3},
-            }
-        },
-        {
-            "$lookup": {
-                "from": "service_locations",  # the collection to join
-                "localField": "service_location_id",  # field in orders referencing service_locations._id
-                "foreignField": "_id",  # field in service_locations to match
-                "as": "service_location",  # output array field for matched documents
-            }
-        },
-        {
-            "$unwind": "$service_location"  # flatten if each order has only one service location
-        },
-        {
-            "$lookup": {
-                "from": "service_locations",  # the collection to join
-                "localField": "delivery_service_locations_ids",  # field in orders referencing service_locations._id
-                "foreignField": "_id",  # field in service_locations to match
-                "as": "delivery_service_locations",  # output array field for matched documents
-            }
-        },
-        {
-            "$lookup": {
-                "from": "order",  # the collection to join
-                "localField": "order_id",
-                "foreignField": "_id",
-                "as": "order",
-            }
-        },
-        {"$unwind": "$order"},  # flatten if each order has only one order
-    ]
+    pipeline = pipelines.get_pipeline_pending_order_requests(
+        current_time, order_request_ids
+    )
     pending_orders: List[OrderRequest] = await db.order_request.aggregate(
         pipeline=pipeline
     ).to_list(None)
@@ -360,14 +330,14 @@ async def send_pending_order_requests():
     logger.info(f"Number of pending orders {len(pending_orders)}")
     tasks = []
 
-    ironman_request_msg = whatsapp_utils.get_reply_message(
-        "new_order_send_ironman_request",
-        message_type="interactive",
-        message_sub_type="reply",
+    ironman_request_template = whatsapp_utils.get_message_template(
+        "new_order_send_ironman_request"
     )
+    call_to_action = config.DB_CACHE["call_to_action"]
 
     order_request_updates = []
-    orders_updates = []
+    orders_updates: List[UpdateOne] = []
+    allotted_order_ids = []
     service_locations_updates = []
     for order_request in pending_orders:
         # order = orders_dict[str(order_request.order_id)]
@@ -382,9 +352,7 @@ async def send_pending_order_requests():
                 )
                 # send message to user
                 tasks.append(
-                    Message(no_ironman_message).send_message(
-                        db.user.find_one({"wa_id": order.user_wa_id})
-                    )
+                    Message(no_ironman_message).send_message(order.user_wa_id)
                 )
                 continue
 
@@ -420,56 +388,54 @@ async def send_pending_order_requests():
                         order_status = await whatsapp_utils.get_new_order_status(
                             order.id, OrderStatusEnum.PICKUP_PENDING
                         )
-                        order.service_location_id = service_location.id
-                        order.order_status.insert(0, order_status)
-                        order.updated_on = datetime.now()
-
+                        # Updated in place, so no write made since the order was
+                        # read is overwritten.
                         orders_updates.append(
-                            order.model_dump(exclude_defaults=True, by_alias=True)
+                            UpdateOne(
+                                {"_id": order.id},
+                                {
+                                    "$set": {
+                                        "service_location_id": service_location.id,
+                                        "updated_on": datetime.now(),
+                                    },
+                                    "$push": {
+                                        "order_status": {
+                                            "$each": [
+                                                order_status.model_dump(
+                                                    exclude_defaults=True,
+                                                    by_alias=True,
+                                                )
+                                            ],
+                                            "$position": 0,
+                                        }
+                                    },
+                                    "$inc": {"version": 1},
+                                },
+                            )
                         )
+                        allotted_order_ids.append(order.id)
                         # update the order request in the database
                         order_request_updates.append(PyObjectId(str(order_request.id)))
                         break
         else:
-            # Create a copy of message_doc for each iteration
             service_location = order_request.service_location
-            message_doc = copy.deepcopy(ironman_request_msg)
-
-            message_doc["interactive"]["action"]["buttons"] = [
-                {
-                    **button,
-                    "reply": {
-                        **button["reply"],
-                        "id": str(button["reply"]["id"]) + "#" + str(order_request.id),
-                    },
-                }
-                for button in message_doc["interactive"]["action"]["buttons"]
-            ]
-
-            message_doc["interactive"]["body"]["text"] = (
-                str(message_doc["interactive"]["body"]["text"])
-                .replace(
-                    "{service_location_name}",
-                    getattr(service_location, "name", "Service Provider"),
-                )
-                .replace(
-                    "{dist}",
-                    str(getattr(order_request, "distance", "NA")).split(".")[0]
+            message_doc = ironman_request_template.render(
+                message_sub_type="reply",
+                replacements={
+                    "service_location_name": getattr(
+                        service_location, "name", "Service Provider"
+                    ),
+                    "dist": str(getattr(order_request, "distance", "NA")).split(".")[0]
                     + " Meters",
-                )
-                .replace(
-                    "{count}",
-                    config.DB_CACHE["call_to_action"]
-                    .get(getattr(order, "count_range", "NA"), {})
-                    .get("title", "NA"),
-                )
-                .replace(
-                    "{time}",
-                    config.DB_CACHE["call_to_action"]
-                    .get(order_request.order.time_slot, {})
-                    .get("title", "N/A"),
-                )
-                .replace("{amount}", str(getattr(order, "total_price", "NA")))
+                    "count": call_to_action.get(
+                        getattr(order, "count_range", "NA"), {}
+                    ).get("title", "NA"),
+                    "time": call_to_action.get(
+                        order_request.order.time_slot, {}
+                    ).get("title", "N/A"),
+                    "amount": str(getattr(order, "total_price", "NA")),
+                },
+                button_id_suffix=str(order_request.id),
             )
 
             tasks.append(Message(message_doc).send_message(service_location.wa_id))
@@ -479,7 +445,8 @@ async def send_pending_order_requests():
     await asyncio.gather(*tasks)
 
     if len(orders_updates) > 0:
-        await replace_documents_in_transaction("order", orders_updates)
+        await bulk_write_operations("order", orders_updates)
+        await order_view.order_changed(*allotted_order_ids)
 
     if len(service_locations_updates) > 0:
         await replace_documents_in_transaction(
@@ -521,15 +488,11 @@ async def send_ironman_delivery_schedule():
 
     logger.info(f"Number of pending schedules {len(pending_schedules)}")
 
-    collect_message_root = whatsapp_utils.get_reply_message(
-        "ironman_collect_order",
-        message_type="interactive",
-        message_sub_type="reply",
-    )
-
-    drop_message_root = whatsapp_utils.get_reply_message(
-        "ironman_drop_order", message_type="interactive", message_sub_type="reply"
+    collect_message_template = whatsapp_utils.get_message_template(
+        "ironman_collect_order"
     )
+    drop_message_template = whatsapp_utils.get_message_template("ironman_drop_order")
+    call_to_action = config.DB_CACHE["call_to_action"]
 
     for pending_schedule in pending_schedules:
         pipeline = [
@@ -589,38 +552,25 @@ async def send_ironman_delivery_schedule():
                 link = utils.get_maps_link(order.location)
 
                 if order.order_status[0].status == OrderStatusEnum.PICKUP_PENDING:
-                    message = copy.deepcopy(collect_message_root)
-                    count = (
-                        config.DB_CACHE["call_to_action"]
-                        .get(getattr(order, "count_range", "NA"), {})
-                        .get("title", "NA")
-                    )
+                    template = collect_message_template
+                    count = call_to_action.get(
+                        getattr(order, "count_range", "NA"), {}
+                    ).get("title", "NA")
                 else:
-                    message = copy.deepcopy(drop_message_root)
+                    template = drop_message_template
                     count = order.total_count
 
-                message["interactive"]["action"]["buttons"] = [
-                    {
-                        **button,
-                        "reply": {
-                            **button["reply"],
-                            "id": str(button["reply"]["id"]) + "#" + str(order.id),
-                        },
-                    }
-                    for button in message["interactive"]["action"]["buttons"]
-                ]
-
-                message["interactive"]["body"]["text"] = (
-                    str(message["interactive"]["body"]["text"])
-                    .replace("{sno}", str(i + 1))
-                    .replace("{name}", order.user.name)
-                    .replace("{count}", str(count))
-                    .replace(
-                        "{link}",
-                        link,
-                    )
-                    .replace("{phone}", str(order.user.wa_id)[2:])
-                    .replace("{amount}", str(getattr(order, "total_price", "NA")))
+                message = template.render(
+                    message_sub_type="reply",
+                    replacements={
+                        "sno": i + 1,
+                        "name": order.user.name,
+                        "count": count,
+                        "link": link,
+                        "phone": str(order.user.wa_id)[2:],
+                        "amount": str(getattr(order, "total_price", "NA")),
+                    },
+                    button_id_suffix=str(order.id),
                 )
 
                 # send message to ironman
@@ -718,11 +668,10 @@ async def send_ironman_work_schedule():
             None
         )
 
-        message_root = whatsapp_utils.get_reply_message(
-            "ironman_to_work_order",
-            message_type="interactive",
-            message_sub_type="reply",
+        message_template = whatsapp_utils.get_message_template(
+            "ironman_to_work_order"
         )
+        call_to_action = config.DB_CACHE["call_to_action"]
 
         for service_location_order in service_location_orders:
             tasks = []
@@ -731,36 +680,20 @@ async def send_ironman_work_schedule():
             for i, order in enumerate(orders):
                 order = Order(**order)
 
-                message = None
-                count = None
-
-                message = copy.deepcopy(message_root)
-                count = (
-                    config.DB_CACHE["call_to_action"]
-                    .get(getattr(order, "count_range", "NA"), {})
-                    .get("title", "NA")
-                )
-
-                message["interactive"]["action"]["buttons"] = [
-                    {
-                        **button,
-                        "reply": {
-                            **button["reply"],
-                            "id": str(button["reply"]["id"]) + "#" + str(order.id),
-                        },
-                    }
-                    for button in message["interactive"]["action"]["buttons"]
-                ]
-
-                message["interactive"]["body"]["text"] = (
-                    str(message["interactive"]["body"]["text"])
-                    .replace("{sno}", str(i + 1))
-                    .replace("{bag}", "LOL")
-                    .replace("{count}", str(count))
-                    .replace("{phone}", str(order.user.wa_id)[2:])
-                    .replace(
-                        "{delivery_date}", str(getattr(order, "delivery_date", "NA"))
-                    )
+                count = call_to_action.get(
+                    getattr(order, "count_range", "NA"), {}
+                ).get("title", "NA")
+
+                message = message_template.render(
+                    message_sub_type="reply",
+                    replacements={
+                        "sno": i + 1,
+                        "bag": "LOL",
+                        "count": count,
+                        "phone": str(order.user.wa_id)[2:],
+                        "delivery_date": str(getattr(order, "delivery_date", "NA")),
+                    },
+                    button_id_suffix=str(order.id),
                 )
 
                 # send message to ironman
@@ -865,11 +798,10 @@ async def send_ironman_pending_work_schedule():
             None
         )
 
-        message_root = whatsapp_utils.get_reply_message(
-            "ironman_pending_to_work_order",
-            message_type="interactive",
-            message_sub_type="reply",
+        message_template = whatsapp_utils.get_message_template(
+            "ironman_pending_to_work_order"
         )
+        call_to_action = config.DB_CACHE["call_to_action"]
 
         for service_location_order in service_location_orders:
             tasks = []
@@ -878,36 +810,20 @@ async def send_ironman_pending_work_schedule():
             for i, order in enumerate(orders):
                 order = Order(**order)
 
-                message = None
-                count = None
-
-                message = copy.deepcopy(message_root)
-                count = (
-                    config.DB_CACHE["call_to_action"]
-                    .get(getattr(order, "count_range", "NA"), {})
-                    .get("title", "NA")
-                )
-
-                message["interactive"]["action"]["buttons"] = [
-                    {
-                        **button,
-                        "reply": {
-                            **button["reply"],
-                            "id": str(button["reply"]["id"]) + "#" + str(order.id),
-                        },
-                    }
-                    for button in message["interactive"]["action"]["buttons"]
-                ]
-
-                message["interactive"]["body"]["text"] = (
-                    str(message["interactive"]["body"]["text"])
-                    .replace("{sno}", str(i + 1))
-                    .replace("{bag}", "LOL")
-                    .replace("{count}", str(count))
-                    .replace("{phone}", str(order.user.wa_id)[2:])
-                    .replace(
-                        "{delivery_date}", str(getattr(order, "delivery_date", "NA"))
-                    )
+                count = call_to_action.get(
+                    getattr(order, "count_range", "NA"), {}
+                ).get("title", "NA")
+
+                message = message_template.render(
+                    message_sub_type="reply",
+                    replacements={
+                        "sno": i + 1,
+                        "bag": "LOL",
+                        "count": count,
+                        "phone": str(order.user.wa_id)[2:],
+                        "delivery_date": str(getattr(order, "delivery_date", "NA")),
+                    },
+                    button_id_suffix=str(order.id),
                 )
 
                 # send message to ironman
@@ -1060,18 +976,26 @@ async def create_timeslot_volume_record():
     logger.info("Completed create_timeslot_volume_record and archived the records.")
 
 
-async def create_order_requests():
+async def create_order_requests(order_ids: Optional[List[PyObjectId]] = None):
+    """
+    Create ironman order requests for orders whose trigger time passed. Called by
+    the polling job for every due order and by the delay queue with the ids that
+    just became due.
+
+    Args:
+        order_ids (Optional[List[PyObjectId]]): Only consider these orders
+    """
+    async with _order_requests_lock:
+        await _create_order_requests(order_ids)
+
+
+async def _create_order_requests(order_ids: Optional[List[PyObjectId]]):
 
     # create_ironman_order_requests(order, contact_details)
     current_time = datetime.now()
-    pipeline = [
-        {
-            "$match": {
-                "trigger_order_request_at": {"$lte": current_time},
-                "trigger_order_request_pending": True,
-            }
-        },
-    ]
+    pipeline = pipelines.get_pipeline_orders_pending_order_request(
+        current_time, order_ids
+    )
 
     pending_orders = await db.order.aggregate(pipeline=pipeline).to_list(None)
     if not pending_orders:
@@ -1079,19 +1003,28 @@ async def create_order_requests():
         return
 
     logger.info(f"Number of pending orders {len(pending_orders)}")
-    tasks = []
-    order_ids = []
-    for i in pending_orders:
-        order = Order(**i)
-        order_ids.append(order.id)
-        tasks.append(create_ironman_order_requests(order, order.user_wa_id))
+    orders = [Order(**pending_order) for pending_order in pending_orders]
 
     await db.order.update_many(
-        {"_id": {"$in": order_ids}},
-        {"$set": {"trigger_order_request_pending": False}},
+        {"_id": {"$in": [order.id for order in orders]}},
+        {
+            "$set": {"trigger_order_request_pending": False},
+            "$inc": {"version": 1},
+        },
     )
+    # Kept in step with the $inc, the orders are allotted from these copies.
+    for order in orders:
+        order_view.bump_version(order)
 
-    await asyncio.gather(*tasks)
+    if MatchingConfig.BATCH_MATCHING:
+        await create_ironman_order_requests_batch(orders)
+    else:
+        await asyncio.gather(
+            *(
+                create_ironman_order_requests(order, order.user_wa_id)
+                for order in orders
+            )
+        )
 
     logger.info("Completed create_order_requests")
 
@@ -1176,13 +1109,18 @@ async def reassign_missed_orders():
                 {
                     "$set": {
                         **order.model_dump(
-                            exclude_defaults=True, exclude={"id"}, by_alias=True
+                            exclude_defaults=True,
+                            exclude={"id", "version"},
+                            by_alias=True,
                         ),
                         "service_location_id": None,
                         "auto_alloted": None,
-                    }
+                    },
+                    "$inc": {"version": 1},
                 },
             )
+            order_view.bump_version(order)
+            await order_view.order_changed(order.id)
             await create_ironman_order_requests(order, order.user_wa_id)
     else:
         logger.info("No missed orders found")
@@ -1190,6 +1128,26 @@ async def reassign_missed_orders():
     return
 
 
+async def precompute_delivery_routes():
+    """
+    Route every agent's delivery groups ahead of time, so their next
+    /delivery-schedule or /delivery-route is answered from the trip cache.
+    """
+    statuses = [OrderStatusEnum.PICKUP_PENDING, OrderStatusEnum.DELIVERY_PENDING]
+    async for agent in db.service_agent.find(
+        {"mobile": {"$exists": True}}, {"mobile": 1}
+    ):
+        try:
+            await fetch_orders_service.get_orders_group_by_date_and_time_slot_routable(
+                agent["mobile"], statuses, route_required=True, summary=True
+            )
+            await fetch_orders_service.get_orders_for_delivery_with_route(
+                agent["mobile"], statuses, summary=True
+            )
+        except Exception as e:
+            logger.error(f"Unable to precompute routes for agent {agent['_id']}: {e}")
+
+
 async def reset_daily_config():
     logger.info("Started reset_daily_config")
     today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
@@ -1239,5 +1197,6 @@ async def reset_daily_config():
         )
 
         logger.info(f"Reset {result.modified_count} timeslot configs")
+        await cache.bump(cache.CONFIG)
     else:
         logger.info("Daily config already reset for today")
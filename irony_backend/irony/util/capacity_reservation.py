@@ -0,0 +1,115 @@
+from typing import Optional
+
+from motor.core import AgnosticCollection
+
+from irony.config.logger import logger
+from irony.db import db
+from irony.models.pyobjectid import PyObjectId
+
+
+def _quota_path(distribution: str, key: str) -> str:
+    # Keys come from call_to_action ids, refuse anything that would change the path.
+    if not key or "." in key or key.startswith("$"):
+        raise ValueError(f"Invalid quota key {key} for {distribution}")
+    return f"{distribution}.{key}"
+
+
+async def reserve_capacity(
+    timeslot_volume_id: PyObjectId,
+    time_slot: str,
+    service_key: str,
+    count: int,
+    collection: Optional[AgnosticCollection] = None,
+) -> bool:
+    """
+    Reserve `count` clothes of both the time slot quota and the service quota in
+    one atomic conditional update, so concurrent allotments can never oversell.
+
+    Args:
+        timeslot_volume_id (PyObjectId): timeslot_volume document of the location and day
+        time_slot (str): Key in timeslot_distributions, e.g. TIME_SLOT_ID_1
+        service_key (str): Key in services_distribution, e.g. SERVICE_ID_1
+        count (int): Number of clothes to reserve
+        collection (AgnosticCollection): Override of the timeslot_volume collection
+
+    Returns:
+        bool: True if both quotas had room and were incremented
+    """
+    collection = collection if collection is not None else db.timeslot_volume
+    timeslot = _quota_path("timeslot_distributions", time_slot)
+    service = _quota_path("services_distribution", service_key)
+    result = await collection.update_one(
+        {
+            "_id": timeslot_volume_id,
+            # A missing limit or current makes $subtract null, which fails $gte.
+            "$expr": {
+                "$and": [
+                    {
+                        "$gte": [
+                            {"$subtract": [f"${timeslot}.limit", f"${timeslot}.current"]},
+                            count,
+                        ]
+                    },
+                    {
+                        "$gte": [
+                            {"$subtract": [f"${service}.limit", f"${service}.current"]},
+                            count,
+                        ]
+                    },
+                ]
+            },
+        },
+        {
+            "$inc": {
+                f"{timeslot}.current": count,
+                f"{service}.current": count,
+                "current_clothes": count,
+            }
+        },
+    )
+    return result.modified_count == 1
+
+
+async def release_capacity(
+    timeslot_volume_id: PyObjectId,
+    time_slot: str,
+    service_key: str,
+    count: int,
+    collection: Optional[AgnosticCollection] = None,
+) -> bool:
+    """
+    Give back a reservation made by reserve_capacity, e.g. when the order write fails.
+
+    Args:
+        timeslot_volume_id (PyObjectId): timeslot_volume document of the location and day
+        time_slot (str): Key in timeslot_distributions
+        service_key (str): Key in services_distribution
+        count (int): Number of clothes reserved
+        collection (AgnosticCollection): Override of the timeslot_volume collection
+
+    Returns:
+        bool: True if the reservation was released
+    """
+    collection = collection if collection is not None else db.timeslot_volume
+    timeslot = _quota_path("timeslot_distributions", time_slot)
+    service = _quota_path("services_distribution", service_key)
+    result = await collection.update_one(
+        {
+            "_id": timeslot_volume_id,
+            f"{timeslot}.current": {"$gte": count},
+            f"{service}.current": {"$gte": count},
+        },
+        {
+            "$inc": {
+                f"{timeslot}.current": -count,
+                f"{service}.current": -count,
+                "current_clothes": -count,
+            }
+        },
+    )
+    if result.modified_count != 1:
+        logger.error(
+            f"Unable to release {count} clothes of {time_slot}/{service_key} on timeslot_volume {timeslot_volume_id}"
+        )
+        return False
+    return True
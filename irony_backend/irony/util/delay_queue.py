@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from irony.config.logger import logger
+from irony.config.scheduler.scheduler_config import SchedulerConfig
+from irony.db import db
+from irony.util import metrics, redis_cache
+
+ORDER = "order"
+ORDER_REQUEST = "order_request"
+
+Handler = Callable[[List[ObjectId]], Awaitable[None]]
+
+# Atomically takes up to ARGV[2] members due at ARGV[1], returned with their scores.
+POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, tonumber(ARGV[2]))
+for i = 1, #due, 2 do
+    redis.call('ZREM', KEYS[1], due[i])
+end
+return due
+"""
+
+
+async def schedule(kind: str, id: ObjectId, at: datetime):
+    await schedule_many(kind, [(id, at)])
+
+
+async def schedule_many(kind: str, items: Iterable[Tuple[ObjectId, datetime]]):
+    """
+    Add items to the delay queue to fire at their trigger time. Failures are only
+    logged, the polling jobs pick the items up instead.
+
+    Args:
+        kind (str): ORDER or ORDER_REQUEST
+        items (Iterable[Tuple[ObjectId, datetime]]): Ids with their trigger time
+    """
+    mapping = {f"{kind}:{id}": at.timestamp() for id, at in items if at is not None}
+    if not mapping:
+        return
+    try:
+        await redis_cache.get_redis().zadd(SchedulerConfig.DELAY_QUEUE_KEY, mapping)
+    except Exception as e:
+        logger.error(f"Unable to schedule {kind} {list(mapping)}, polling will catch up: {e}")
+
+
+class DelayQueueDispatcher:
+    """Fires delay queue items at their trigger time. Runs only in the scheduler leader."""
+
+    def __init__(self, handlers: Dict[str, Handler]):
+        self.handlers = handlers
+        self._task: Optional[asyncio.Task] = None
+        self._handler_tasks: Set[asyncio.Task] = set()
+        self._pop_due = None
+
+    async def start(self):
+        redis = redis_cache.get_redis()
+        self._pop_due = redis.register_script(POP_DUE_SCRIPT)
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"Unable to rebuild delay queue from mongo: {e}")
+        self._task = asyncio.create_task(self._run())
+        logger.info("Delay queue dispatcher started")
+
+    async def stop(self):
+        tasks = list(self._handler_tasks)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("Delay queue dispatcher stopped")
+
+    async def rebuild(self):
+        """Re-add everything still pending in mongo, so nothing is lost if redis was flushed."""
+        orders = await db.order.find(
+            {"trigger_order_request_pending": True},
+            {"trigger_order_request_at": 1},
+            sort=[("trigger_order_request_at", 1)],
+        ).to_list(None)
+        await schedule_many(
+            ORDER, [(order["_id"], order.get("trigger_order_request_at")) for order in orders]
+        )
+        order_requests = await db.order_request.find(
+            {"is_pending": True, "try_count": {"$lt": 3}},
+            {"trigger_time": 1},
+            sort=[("trigger_time", 1), ("try_count", 1)],
+        ).to_list(None)
+        await schedule_many(
+            ORDER_REQUEST,
+            [
+                (order_request["_id"], order_request.get("trigger_time"))
+                for order_request in order_requests
+            ],
+        )
+        logger.info(
+            f"Delay queue rebuilt with {len(orders)} orders and {len(order_requests)} order requests"
+        )
+
+    async def _run(self):
+        redis = redis_cache.get_redis()
+        while True:
+            try:
+                now = time.time()
+                due = await self._pop_due(
+                    keys=[SchedulerConfig.DELAY_QUEUE_KEY],
+                    args=[now, SchedulerConfig.DELAY_QUEUE_BATCH_SIZE],
+                )
+                if due:
+                    self._fire(due, now)
+                    continue
+
+                sleep_for = SchedulerConfig.DELAY_QUEUE_MAX_IDLE_SECONDS
+                upcoming = await redis.zrange(
+                    SchedulerConfig.DELAY_QUEUE_KEY, 0, 0, withscores=True
+                )
+                if upcoming:
+                    sleep_for = min(sleep_for, max(0.0, upcoming[0][1] - time.time()))
+                metrics.set_gauge(
+                    "delay_queue.size",
+                    await redis.zcard(SchedulerConfig.DELAY_QUEUE_KEY),
+                )
+                await asyncio.sleep(sleep_for)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Delay queue dispatcher error: {e}")
+                await asyncio.sleep(1)
+
+    def _fire(self, due: List, now: float):
+        ids_by_kind: Dict[str, List[ObjectId]] = defaultdict(list)
+        for member, score in zip(due[::2], due[1::2]):
+            kind, _, id = member.partition(":")
+            if kind not in self.handlers or not ObjectId.is_valid(id):
+                logger.error(f"Dropping unknown delay queue item {member}")
+                continue
+            ids_by_kind[kind].append(ObjectId(id))
+            metrics.latency("delay_queue.fire_lag").record(max(0.0, now - float(score)))
+
+        for kind, ids in ids_by_kind.items():
+            task = asyncio.create_task(self._handle(kind, ids))
+            self._handler_tasks.add(task)
+            task.add_done_callback(self._handler_tasks.discard)
+
+    async def _handle(self, kind: str, ids: List[ObjectId]):
+        try:
+            await self.handlers[kind](ids)
+            metrics.increment(f"delay_queue.fired.{kind}", len(ids))
+        except Exception as e:
+            # The polling safety net retries whatever was not processed.
+            metrics.increment(f"delay_queue.failed.{kind}", len(ids))
+            logger.error(f"Error handling delay queue {kind} {ids}: {e}")
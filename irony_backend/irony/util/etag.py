@@ -0,0 +1,143 @@
+import hashlib
+import time
+from typing import List, Optional
+
+from fastapi import Request, Response
+
+from irony import cache
+from irony.config.cache.cache_config import CacheConfig
+from irony.config.logger import logger
+from irony.config.order_view.order_view_config import OrderViewConfig
+from irony.config.revision.revision_config import RevisionConfig
+from irony.models.order_status_enum import OrderStatusEnum
+from irony.util import (
+    agent_cache,
+    metrics,
+    order_view,
+    price_catalog,
+    redis_cache,
+    revisions,
+)
+
+
+async def _get_service_location_ids(agent_mobile: str) -> Optional[List[str]]:
+    agent = await agent_cache.get_agent(agent_mobile)
+    if agent is None or not agent.service_location_ids:
+        return None
+    return sorted(str(location) for location in agent.service_location_ids)
+
+
+async def _read_state(
+    kind: str,
+    service_location_ids: List[str],
+    cache_collections: List[str],
+    ready_key: Optional[str] = None,
+) -> Optional[List]:
+    # Revisions, and versions of the cached collections the response reads.
+    # None while the revisions cannot be trusted.
+    fields = [revisions.field(kind, location) for location in service_location_ids]
+    try:
+        async with redis_cache.get_redis().pipeline(transaction=False) as pipe:
+            pipe.hmget(RevisionConfig.REVISIONS_KEY, [kind, *fields])
+            pipe.hmget(CacheConfig.VERSIONS_KEY, cache_collections)
+            if ready_key:
+                pipe.exists(ready_key)
+            state = await pipe.execute()
+    except Exception as e:
+        logger.error(f"Unable to read revisions, sending no ETag: {e}")
+        return None
+    if state[0][0] is None or (ready_key and not state[2]):
+        return None
+    return state[:2]
+
+
+def _etag(request: Request, *parts) -> str:
+    key = (request.url.path, sorted(request.query_params.multi_items()), parts)
+    return f'"{hashlib.sha1(repr(key).encode()).hexdigest()}"'
+
+
+async def get_orders_etag(
+    request: Request,
+    agent_mobile: str,
+    statuses: List[OrderStatusEnum],
+    routed: bool = False,
+) -> Optional[str]:
+    """
+    ETag of an order list of an agent, from the order revisions of its service
+    locations. Revisions are bumped by the order view updates, so lists are
+    only tagged while the views are complete.
+
+    Args:
+        request (Request): The list request, its path and query are part of the tag
+        agent_mobile (str): Mobile number of the service agent
+        statuses (List[OrderStatusEnum]): Latest statuses the list shows
+        routed (bool, optional): Whether the list is routed, which changes with
+            the time of day. Defaults to False.
+
+    Returns:
+        Optional[str]: Strong ETag, None when the list cannot be tagged
+    """
+    if not order_view.covers(statuses):
+        return None
+    service_location_ids = await _get_service_location_ids(agent_mobile)
+    if not service_location_ids:
+        return None
+    state = await _read_state(
+        revisions.ORDERS,
+        service_location_ids,
+        [cache.CALL_TO_ACTION, cache.CONFIG],
+        OrderViewConfig.READY_KEY,
+    )
+    if state is None:
+        return None
+    if routed:
+        state.append(int(time.time() // RevisionConfig.ROUTED_ETAG_INTERVAL_SECONDS))
+    return _etag(request, service_location_ids, state)
+
+
+async def get_prices_etag(request: Request, agent_mobile: str) -> Optional[str]:
+    """
+    ETag of the prices of an agent's service locations, from the hashes of
+    their pre-serialized prices in the price catalog.
+
+    Args:
+        request (Request): The prices request
+        agent_mobile (str): Mobile number of the service agent
+
+    Returns:
+        Optional[str]: Strong ETag, None when the agent has no service locations
+    """
+    service_location_ids = await _get_service_location_ids(agent_mobile)
+    if not service_location_ids:
+        return None
+    return _etag(
+        request, service_location_ids, price_catalog.get_digests(service_location_ids)
+    )
+
+
+def is_fresh(request: Request, etag: Optional[str]) -> bool:
+    """Whether the client's If-None-Match already holds `etag`."""
+    if etag is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return any(
+        candidate.strip().removeprefix("W/") in (etag, "*")
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _headers(etag: str):
+    # Clients keep the response but revalidate it on every use.
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    metrics.increment("etag.not_modified")
+    return Response(status_code=304, headers=_headers(etag))
+
+
+def set_etag(response: Response, etag: Optional[str]):
+    if etag is not None:
+        response.headers.update(_headers(etag))
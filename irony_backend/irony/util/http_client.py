@@ -0,0 +1,91 @@
+import asyncio
+from typing import Dict, Optional, Type
+from urllib.parse import urlsplit
+
+import httpx
+
+from irony.config.http.http_client_config import (
+    HttpClientConfig,
+    OsrmClientConfig,
+    WhatsappClientConfig,
+)
+from irony.config.logger import logger
+
+WHATSAPP = "whatsapp"
+OSRM = "osrm"
+
+CLIENT_CONFIGS: Dict[str, Type[HttpClientConfig]] = {
+    WHATSAPP: WhatsappClientConfig,
+    OSRM: OsrmClientConfig,
+}
+
+
+class PooledClient:
+    """Shared keep-alive httpx client with a per-host in-flight request limit."""
+
+    def __init__(self, name: str, client_config: Type[HttpClientConfig]):
+        self.name = name
+        self.max_concurrency_per_host = client_config.MAX_CONCURRENCY_PER_HOST
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._client = httpx.AsyncClient(
+            http2=client_config.HTTP2,
+            limits=httpx.Limits(
+                max_connections=client_config.MAX_CONNECTIONS,
+                max_keepalive_connections=client_config.MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=client_config.KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(
+                client_config.TIMEOUT_SECONDS,
+                connect=client_config.CONNECT_TIMEOUT_SECONDS,
+            ),
+        )
+
+    def _semaphore_for(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(
+                self.max_concurrency_per_host
+            )
+        return self._host_semaphores[host]
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        async with self._semaphore_for(url):
+            return await self._client.request(method, url, **kwargs)
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client.is_closed
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_clients: Dict[str, PooledClient] = {}
+
+
+def get_client(name: str) -> PooledClient:
+    """Return the shared client for `name`, creating it if lifespan has not yet."""
+    client: Optional[PooledClient] = _clients.get(name)
+    if client is None or client.is_closed:
+        if name not in CLIENT_CONFIGS:
+            raise Exception(
+                f"Unknown http client {name}. Please choose from {CLIENT_CONFIGS.keys()}"
+            )
+        client = PooledClient(name, CLIENT_CONFIGS[name])
+        _clients[name] = client
+    return client
+
+
+def start_clients():
+    for name in CLIENT_CONFIGS:
+        get_client(name)
+    logger.info(f"Http clients started : {list(_clients.keys())}")
+
+
+async def close_clients():
+    for name, client in list(_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.error(f"Error closing http client {name}: {e}")
+    _clients.clear()
@@ -0,0 +1,118 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+from pymongo import IndexModel
+from pymongo.errors import PyMongoError
+
+from irony.config.logger import logger
+from irony.db import db
+from irony.exception.index_verification_exception import IndexVerificationException
+
+PipelineFactory = Callable[[], List[Dict[str, Any]]]
+
+_indexes: Dict[str, List[IndexModel]] = {}
+_queries: Dict[str, Tuple[str, PipelineFactory]] = {}
+
+
+def register_indexes(collection: str, *indexes: IndexModel):
+    """
+    Declare indexes a query on `collection` depends on. Call next to the query.
+
+    Args:
+        collection (str): Collection name
+        *indexes (IndexModel): Indexes, each with an explicit name
+    """
+    _indexes.setdefault(collection, []).extend(indexes)
+
+
+def register_query(name: str, collection: str, pipeline_factory: PipelineFactory):
+    """
+    Register a representative pipeline whose plan must not contain a COLLSCAN.
+
+    Args:
+        name (str): Unique name shown in verification failures
+        collection (str): Collection the pipeline runs on
+        pipeline_factory (PipelineFactory): Builds the pipeline with sample arguments
+    """
+    _queries[name] = (collection, pipeline_factory)
+
+
+def registered_indexes() -> Dict[str, List[IndexModel]]:
+    return _indexes
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """
+    Create every registered index. Existing indexes with the same definition are
+    left untouched, so this is safe to run on every start.
+
+    Returns:
+        Dict[str, List[str]]: Index names per collection that failed to be created
+    """
+    failures: Dict[str, List[str]] = {}
+    for collection, indexes in _indexes.items():
+        for index in indexes:
+            name = index.document["name"]
+            try:
+                await db[collection].create_indexes([index])
+            except PyMongoError as e:
+                logger.error(f"Unable to create index {collection}.{name}: {e}")
+                failures.setdefault(collection, []).append(name)
+    created = sum(len(indexes) for indexes in _indexes.values())
+    logger.info(f"Ensured {created} indexes on {len(_indexes)} collections")
+    return failures
+
+
+def _find_collscans(plan: Any, path: str = "") -> List[str]:
+    found: List[str] = []
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            found.append(path or "plan")
+        for key, value in plan.items():
+            if key == "rejectedPlans":
+                continue
+            found.extend(_find_collscans(value, f"{path}.{key}" if path else key))
+    elif isinstance(plan, list):
+        for index, value in enumerate(plan):
+            found.extend(_find_collscans(value, f"{path}[{index}]"))
+    return found
+
+
+async def explain(collection: str, pipeline: List[Dict[str, Any]]) -> Dict:
+    return await db.command(
+        {
+            "explain": {"aggregate": collection, "pipeline": pipeline, "cursor": {}},
+            "verbosity": "queryPlanner",
+        }
+    )
+
+
+async def verify_query_plans(raise_on_collscan: bool = True) -> Dict[str, List[str]]:
+    """
+    explain() every registered query and collect plans that scan a whole collection.
+
+    Args:
+        raise_on_collscan (bool): Raise instead of only logging failures
+
+    Returns:
+        Dict[str, List[str]]: Problems per query name, empty when every plan uses an index
+
+    Raises:
+        IndexVerificationException: If a plan has a COLLSCAN or cannot be explained
+    """
+    failures: Dict[str, List[str]] = {}
+    for name, (collection, pipeline_factory) in _queries.items():
+        try:
+            plan = await explain(collection, pipeline_factory())
+        except PyMongoError as e:
+            failures[name] = [f"explain failed: {e}"]
+            continue
+        collscans = _find_collscans(plan)
+        if collscans:
+            failures[name] = [f"COLLSCAN on {collection} at {path}" for path in collscans]
+
+    for name, problems in failures.items():
+        logger.error(f"Query plan check failed for {name}: {problems}")
+    if failures and raise_on_collscan:
+        raise IndexVerificationException(failures)
+    logger.info(f"Verified query plans of {len(_queries)} registered queries")
+    return failures
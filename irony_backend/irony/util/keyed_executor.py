@@ -0,0 +1,139 @@
+import asyncio
+import time
+import traceback
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Set, Tuple
+
+from irony.config.logger import logger
+from irony.util import metrics
+
+Job = Callable[[], Awaitable[Any]]
+LaneItem = Tuple[Job, asyncio.Future, float]
+
+
+class KeyedExecutor:
+    """Runs jobs in one FIFO lane per key under a global concurrency limit.
+
+    Jobs with the same key never overlap and run in submission order, jobs with
+    different keys run in parallel up to `max_concurrency`. A lane only exists
+    while it has pending jobs.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_pending: int):
+        self.name = name
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lanes: Dict[str, Deque[LaneItem]] = {}
+        self._lane_tasks: Set[asyncio.Task] = set()
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(self, key: str, job: Job, bounded: bool = True) -> asyncio.Future:
+        """
+        Queue `job` on the lane of `key`.
+
+        Args:
+            key (str): Lane key, jobs with the same key run one after another
+            job (Job): Zero argument coroutine function
+            bounded (bool): Reject the job when `max_pending` jobs are waiting
+
+        Returns:
+            asyncio.Future: Resolves with the job's result or exception
+
+        Raises:
+            asyncio.QueueFull: If bounded and the executor is full
+        """
+        if bounded and self._pending >= self.max_pending:
+            raise asyncio.QueueFull(f"{self.name} executor is full")
+
+        future = asyncio.get_running_loop().create_future()
+        # Failures are logged by the lane; callers that fire and forget must not
+        # trigger "exception was never retrieved" warnings.
+        future.add_done_callback(_consume_exception)
+
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = deque()
+            self._lanes[key] = lane
+            task = asyncio.create_task(self._run_lane(key, lane))
+            self._lane_tasks.add(task)
+            task.add_done_callback(self._lane_tasks.discard)
+        lane.append((job, future, time.perf_counter()))
+
+        self._pending += 1
+        self._idle.clear()
+        self._update_gauges()
+        return future
+
+    async def run(self, key: str, job: Job) -> Any:
+        """Run `job` in the lane of `key` and wait for its result, ignoring `max_pending`."""
+        return await self.submit(key, job, bounded=False)
+
+    async def _run_lane(self, key: str, lane: Deque[LaneItem]):
+        while lane:
+            job, future, submitted_at = lane[0]
+            try:
+                async with self._semaphore:
+                    started_at = time.perf_counter()
+                    metrics.latency(f"{self.name}.lane_wait").record(
+                        started_at - submitted_at
+                    )
+                    try:
+                        result = await job()
+                        if not future.done():
+                            future.set_result(result)
+                    except Exception as e:
+                        metrics.increment(f"{self.name}.failed")
+                        logger.error(f"Error in {self.name} job for {key}: {e}")
+                        traceback.print_exc()
+                        if not future.done():
+                            future.set_exception(e)
+                    metrics.latency(f"{self.name}.run").record(
+                        time.perf_counter() - started_at
+                    )
+            finally:
+                if not future.done():
+                    future.cancel()
+                lane.popleft()
+                self._pending -= 1
+                if not lane:
+                    del self._lanes[key]
+                if self._pending == 0:
+                    self._idle.set()
+                self._update_gauges()
+
+    def _update_gauges(self):
+        metrics.set_gauge(f"{self.name}.pending", self._pending)
+        metrics.set_gauge(f"{self.name}.lanes", len(self._lanes))
+        metrics.set_gauge(
+            f"{self.name}.max_lane_depth",
+            max((len(lane) for lane in self._lanes.values()), default=0),
+        )
+
+    async def join(self):
+        await self._idle.wait()
+
+    async def stop(self, drain_timeout: float):
+        try:
+            await asyncio.wait_for(self.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                f"{self.name} executor not drained in {drain_timeout}s, {self._pending} jobs dropped"
+            )
+        for task in list(self._lane_tasks):
+            task.cancel()
+        await asyncio.gather(*self._lane_tasks, return_exceptions=True)
+        for lane in self._lanes.values():
+            for _, future, _ in lane:
+                future.cancel()
+        self._lanes.clear()
+
+
+def _consume_exception(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
@@ -1,19 +1,22 @@
 import json
-import requests
+
+import httpx
 
 from irony.config import config
 from irony.config.logger import logger
 from irony.db import db
+from irony.models.whatsapp.outbound_message import OutboundMessage
+from irony.util import http_client, outbound_queue
 
 
 class Message:
-    _methods = {
-        "GET": requests.get,
-        "POST": requests.post,
-        "PUT": requests.put,
-        "DELETE": requests.delete,
+    _methods = (
+        "GET",
+        "POST",
+        "PUT",
+        "DELETE",
         # Add more methods as needed
-    }
+    )
     bearer_token = config.WHATSAPP_CONFIG["bearer_token"]
     default_headers = {
         "Content-type": "application/json",
@@ -30,7 +33,7 @@ class Message:
     ):
         if method not in self._methods:
             raise Exception(
-                f"Invalid method while creating method object. Please choose from {self._methods.keys()}"
+                f"Invalid method while creating method object. Please choose from {self._methods}"
             )
         if not bool(body):
             raise Exception(f"Please provide message body")
@@ -47,25 +50,33 @@ class Message:
         if self.body["to"] == None:
             raise Exception(f"Please specify receipient(to) of message.")
 
-        # 2. Send message to user.
-        response = self._methods[self.method](
-            self.url, headers=self.headers, data=json.dumps(self.body)
-        )
+        # 2. Hand over to the outbound queue, it sends and updates last message.
+        if outbound_queue.is_running() and self.headers is self.default_headers:
+            return await outbound_queue.enqueue(
+                OutboundMessage(
+                    url=self.url,
+                    method=self.method,
+                    to=self.body["to"],
+                    body=self.body,
+                    last_message_update=last_message_update,
+                )
+            )
+
+        # 3. Queue not running (scripts), send message to user inline.
+        response = await self.post()
         if response.status_code != 200:
             logger.error(f"Error while sending message : {response.text}")
 
         response_data = response.json()
         logger.info(f"Sent message response : {response_data}")
 
-        # 3. Update last message for user.
+        # 4. Update last message for user.
         if response.status_code == 200 and last_message_update != None:
-            last_message_update["user"] = to
-            if "messages" in response_data and "id" in response_data["messages"][0]:
-                last_message_update["last_sent_msg_id"] = response_data["messages"][0][
-                    "id"
-                ]
+            last_message_update = outbound_queue.build_last_message_doc(
+                self.body["to"], response_data, last_message_update
+            )
             result = await db.last_message.replace_one(
-                {"user": to},
+                {"user": self.body["to"]},
                 last_message_update,
                 # {"$set": last_message_update},
                 upsert=True,
@@ -76,3 +87,14 @@ class Message:
             )
 
         return response
+
+    async def post(self) -> httpx.Response:
+        # Send message over the shared pooled client.
+        return await http_client.get_client(http_client.WHATSAPP).request(
+            self.method, self.url, headers=self.headers, content=json.dumps(self.body)
+        )
+
+    @classmethod
+    async def deliver(cls, job: OutboundMessage) -> httpx.Response:
+        """Sender used by the outbound queue workers."""
+        return await cls(body=job.body, url=job.url, method=job.method).post()
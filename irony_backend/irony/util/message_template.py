@@ -0,0 +1,144 @@
+import random
+import re
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from irony.config import config
+from irony.config.logger import logger
+from irony.exception.WhatsappException import WhatsappException
+from irony.models.message import MessageConfig
+
+PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)\}")
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+class TextTemplate:
+    """Message text split once into literal parts and `{placeholder}` slots."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, text: str):
+        parts = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            parts.append(text[position : match.start()])
+            parts.append(match.group(1))
+            position = match.end()
+        parts.append(text[position:])
+        # Literals at even indexes, placeholder names at odd indexes.
+        self.parts: Tuple[str, ...] = tuple(parts)
+
+    def render(self, replacements: Optional[Mapping[str, Any]] = None) -> str:
+        if len(self.parts) == 1:
+            return self.parts[0]
+        rendered = list(self.parts)
+        for index in range(1, len(rendered), 2):
+            name = rendered[index]
+            value = replacements.get(name) if replacements else None
+            # Unknown placeholders are left in the text as they were.
+            rendered[index] = "{" + name + "}" if value is None else str(value)
+        return "".join(rendered)
+
+
+class MessageTemplate:
+    """Immutable, precompiled form of a MessageConfig.
+
+    Built once per cache load with its call_to_action buttons/rows already
+    resolved. `render` returns a new dict on every call, so callers may
+    modify the result freely.
+    """
+
+    __slots__ = ("message_key", "_skeleton", "_options", "_call_to_actions")
+
+    def __init__(self, message_config: MessageConfig, call_to_action: Dict[str, Any]):
+        self.message_key = message_config.message_key
+        self._skeleton = _freeze(message_config.message or {})
+        self._options = tuple(
+            TextTemplate(option) for option in message_config.message_options or []
+        )
+        call_to_actions = []
+        for key in message_config.call_to_action or []:
+            if key not in call_to_action:
+                logger.error(
+                    f"Developer concern, call_to_action {key} of message {self.message_key} not found"
+                )
+                continue
+            call_to_actions.append(_freeze(call_to_action[key]))
+        self._call_to_actions = tuple(call_to_actions)
+
+    def _get_text(self, replacements: Optional[Mapping[str, Any]]) -> str:
+        if not self._options:
+            logger.error(
+                f"Developer concern, No message options for message_key : {self.message_key}"
+            )
+            raise WhatsappException(config.DEFAULT_ERROR_REPLY_MESSAGE)
+        return random.choice(self._options).render(replacements)
+
+    def render(
+        self,
+        message_type: str = "interactive",
+        message_sub_type: str = "",
+        replacements: Optional[Mapping[str, Any]] = None,
+        button_id_suffix: Optional[str] = None,
+        text: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Build a fresh message body from the template.
+
+        Args:
+            message_type (str): "text" or "interactive"
+            message_sub_type (str): "reply" for buttons, "radio" for list rows
+            replacements (Mapping[str, Any]): Placeholder name to value, e.g. {"time": "9AM"}
+            button_id_suffix (str): Appended to each button id as "<id>#<suffix>"
+            text (str): Use this text instead of one of the message options
+
+        Returns:
+            Dict[str, Any]: Message body ready to be sent
+        """
+        message_body = _thaw(self._skeleton)
+        message_text = text if text is not None else self._get_text(replacements)
+        if message_type == "text":
+            message_body["text"]["body"] = message_text
+        elif message_type == "interactive":
+            message_body["interactive"]["body"]["text"] = message_text
+            if message_sub_type == "reply":
+                message_body["interactive"]["action"]["buttons"] = [
+                    {"type": "reply", "reply": self._reply(cta, button_id_suffix)}
+                    for cta in self._call_to_actions
+                ]
+            elif message_sub_type == "radio":
+                message_body["interactive"]["action"]["sections"][0]["rows"] = [
+                    _thaw(cta) for cta in self._call_to_actions
+                ]
+        return message_body
+
+    @staticmethod
+    def _reply(cta: Mapping[str, Any], button_id_suffix: Optional[str]) -> Dict:
+        reply = _thaw(cta)
+        if button_id_suffix is not None:
+            reply["id"] = f"{reply['id']}#{button_id_suffix}"
+        return reply
+
+
+def compile_templates(
+    message_configs: Dict[str, MessageConfig], call_to_action: Dict[str, Any]
+) -> Dict[str, MessageTemplate]:
+    return {
+        message_key: MessageTemplate(message_config, call_to_action)
+        for message_key, message_config in message_configs.items()
+    }
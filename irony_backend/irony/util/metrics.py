@@ -0,0 +1,59 @@
+from collections import deque
+from typing import Deque, Dict
+
+
+class LatencyStats:
+    """Rolling window of latency samples with percentile snapshots."""
+
+    def __init__(self, max_samples: int = 1000):
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+_latencies: Dict[str, LatencyStats] = {}
+_counters: Dict[str, int] = {}
+_gauges: Dict[str, float] = {}
+
+
+def latency(name: str) -> LatencyStats:
+    if name not in _latencies:
+        _latencies[name] = LatencyStats()
+    return _latencies[name]
+
+
+def increment(name: str, value: int = 1):
+    _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float):
+    _gauges[name] = value
+
+
+def snapshot() -> Dict:
+    return {
+        "latencies": {name: stats.snapshot() for name, stats in _latencies.items()},
+        "counters": dict(_counters),
+        "gauges": dict(_gauges),
+    }
@@ -0,0 +1,177 @@
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from irony.config.logger import logger
+from irony.config.order_view.order_view_config import OrderViewConfig
+from irony.util import metrics, redis_cache
+
+# Tells a client to reload its order lists, sent when it subscribes and
+# whenever deltas may have been lost.
+RESYNC = '{"type": "resync"}'
+
+# (order id, service location id before or "", service location id after or "",
+# order JSON)
+Change = Tuple[str, str, str, str]
+
+# Channel suffix of messages for every service location.
+_ALL = "all"
+
+_queues: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+_listener: Optional[asyncio.Task] = None
+
+
+def _channel(service_location_id: str) -> str:
+    return f"{OrderViewConfig.EVENTS_CHANNEL_PREFIX}{service_location_id}"
+
+
+def _event(
+    event_type: str, order_id: str, service_location_id: str, order: str = "null"
+) -> str:
+    # The order is already JSON, spliced in rather than parsed and dumped again.
+    return (
+        f'{{"type": {json.dumps(event_type)}, "order_id": {json.dumps(order_id)}, '
+        f'"service_location_id": {json.dumps(service_location_id)}, "order": {order}}}'
+    )
+
+
+async def publish(changes: Iterable[Change]):
+    """
+    Publish the deltas of orders just moved in the views: "added" to the
+    location an order entered, "updated" when it stayed and "removed" from
+    the location it left.
+
+    Args:
+        changes (Iterable[Change]): Orders with their location before and after
+    """
+    if not OrderViewConfig.EVENTS_ENABLED:
+        return
+    messages: List[Tuple[str, str]] = []
+    for order_id, previous, location, order in changes:
+        if previous and previous != location:
+            messages.append((previous, _event("removed", order_id, previous)))
+        if location:
+            event_type = "updated" if previous == location else "added"
+            messages.append((location, _event(event_type, order_id, location, order)))
+    if not messages:
+        return
+    try:
+        async with redis_cache.get_redis().pipeline(transaction=False) as pipe:
+            for location, message in messages:
+                pipe.publish(_channel(location), message)
+            await pipe.execute()
+    except Exception as e:
+        metrics.increment("order_events.publish_failed")
+        logger.error(f"Unable to publish order events: {e}")
+
+
+async def resync(service_location_ids: Optional[Iterable] = None):
+    """
+    Tell the clients of the given service locations, or of every location,
+    to reload their order lists, for view changes made without deltas.
+
+    Args:
+        service_location_ids (Optional[Iterable]): Service locations whose
+            clients resync. Defaults to None, every client.
+    """
+    if not OrderViewConfig.EVENTS_ENABLED:
+        return
+    locations = (
+        [_ALL]
+        if service_location_ids is None
+        else {str(location) for location in service_location_ids}
+    )
+    if not locations:
+        return
+    try:
+        async with redis_cache.get_redis().pipeline(transaction=False) as pipe:
+            for location in locations:
+                pipe.publish(_channel(location), RESYNC)
+            await pipe.execute()
+    except Exception as e:
+        metrics.increment("order_events.publish_failed")
+        logger.error(f"Unable to publish order resync, resyncing local clients: {e}")
+        for location, queues in _queues.items():
+            if location in locations or _ALL in locations:
+                for queue in queues:
+                    _put(queue, RESYNC)
+
+
+def _put(queue: asyncio.Queue, message: str):
+    if queue.full():
+        # A client this far behind reloads its lists instead of catching up.
+        while not queue.empty():
+            queue.get_nowait()
+        metrics.increment("order_events.overflow")
+        message = RESYNC
+    queue.put_nowait(message)
+
+
+async def _listen():
+    prefix = OrderViewConfig.EVENTS_CHANNEL_PREFIX
+    while True:
+        pubsub = redis_cache.get_redis().pubsub()
+        try:
+            await pubsub.psubscribe(f"{prefix}*")
+            async for message in pubsub.listen():
+                if message.get("type") != "pmessage":
+                    continue
+                location = message["channel"][len(prefix) :]
+                if location == _ALL:
+                    queues = {queue for queues in _queues.values() for queue in queues}
+                else:
+                    queues = _queues.get(location, set())
+                for queue in queues:
+                    _put(queue, message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Order event listener failed, resubscribing: {e}")
+            # Deltas published until the listener is back are lost.
+            for queues in _queues.values():
+                for queue in queues:
+                    _put(queue, RESYNC)
+            await asyncio.sleep(OrderViewConfig.EVENTS_RETRY_SECONDS)
+        finally:
+            await pubsub.aclose()
+
+
+@asynccontextmanager
+async def subscribe(service_location_ids: List) -> AsyncIterator[asyncio.Queue]:
+    """
+    Receive the deltas of the given service locations while in the context.
+
+    Args:
+        service_location_ids (List): Service locations to follow
+
+    Yields:
+        asyncio.Queue: Event JSON strings, RESYNC when deltas were dropped
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=OrderViewConfig.EVENTS_QUEUE_SIZE)
+    locations = {str(location) for location in service_location_ids}
+    for location in locations:
+        _queues[location].add(queue)
+    try:
+        yield queue
+    finally:
+        for location in locations:
+            _queues[location].discard(queue)
+            if not _queues[location]:
+                del _queues[location]
+
+
+def start():
+    """Start this worker's listener, one redis connection for all its clients."""
+    global _listener
+    if OrderViewConfig.EVENTS_ENABLED and _listener is None:
+        _listener = asyncio.create_task(_listen())
+
+
+async def stop():
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        await asyncio.gather(_listener, return_exceptions=True)
+        _listener = None
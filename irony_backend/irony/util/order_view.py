@@ -0,0 +1,554 @@
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Type
+
+from bson import ObjectId
+
+from irony.config.logger import logger
+from irony.config.order_view.order_view_config import OrderViewConfig
+from irony.config.revision.revision_config import RevisionConfig
+from irony.db import db
+from irony.models.location import UserLocation
+from irony.models.order import Order
+from irony.models.order_status_enum import OrderStatusEnum
+from irony.models.order_summary_vo import OrderSummaryVo
+from irony.models.order_vo import OrderVo
+from irony.models.service_agent.vo.order_page_vo import OrderPage
+from irony.util import metrics, order_events, redis_cache, revisions
+
+# Moves each order to the view of its service location, dropping it from the
+# view and index it was in before, and bumps the order revisions of both
+# locations. An order older than the version already applied is skipped, so a
+# stale read never overwrites a newer one; version -1 drops an order that no
+# longer exists whatever its version was.
+# KEYS[1] LOCATIONS_KEY, KEYS[2] TOUCHED_KEY, KEYS[3] the revisions hash,
+# KEYS[4] VERSIONS_KEY, KEYS[5] INDEX_MEMBERS_KEY,
+# ARGV[1] the view key prefix, ARGV[2] the summary key prefix, ARGV[3] the
+# touched TTL, ARGV[4] the revision field prefix, then for each order its id,
+# version, service location id ('' to drop the order), index key, index
+# member, order JSON and summary JSON. Returns the service location each order
+# was in before, '' if none, or '!' if the order was skipped.
+APPLY_SCRIPT = """
+local previous_locations = {}
+for i = 5, #ARGV, 7 do
+    local order_id, version, location = ARGV[i], tonumber(ARGV[i + 1]), ARGV[i + 2]
+    local applied = tonumber(redis.call('HGET', KEYS[4], order_id))
+    if version >= 0 and applied and version < applied then
+        table.insert(previous_locations, '!')
+    else
+        local previous = redis.call('HGET', KEYS[1], order_id)
+        table.insert(previous_locations, previous or '')
+        local indexed = redis.call('HGET', KEYS[5], order_id)
+        if indexed then
+            local space = string.find(indexed, ' ', 1, true)
+            local index_key = string.sub(indexed, 1, space - 1)
+            redis.call('ZREM', index_key, string.sub(indexed, space + 1))
+        end
+        if previous and previous ~= location then
+            redis.call('HDEL', ARGV[1] .. previous, order_id)
+            redis.call('HDEL', ARGV[2] .. previous, order_id)
+            redis.call('HINCRBY', KEYS[3], ARGV[4] .. previous, 1)
+        end
+        if location == '' then
+            redis.call('HDEL', KEYS[1], order_id)
+            redis.call('HDEL', KEYS[5], order_id)
+        else
+            local index_key, member = ARGV[i + 3], ARGV[i + 4]
+            redis.call('HSET', ARGV[1] .. location, order_id, ARGV[i + 5])
+            redis.call('HSET', ARGV[2] .. location, order_id, ARGV[i + 6])
+            redis.call('ZADD', index_key, 0, member)
+            redis.call('HSET', KEYS[5], order_id, index_key .. ' ' .. member)
+            redis.call('HSET', KEYS[1], order_id, location)
+            redis.call('HINCRBY', KEYS[3], ARGV[4] .. location, 1)
+        end
+        if version < 0 then
+            redis.call('HDEL', KEYS[4], order_id)
+        else
+            redis.call('HSET', KEYS[4], order_id, version)
+        end
+    end
+    redis.call('SADD', KEYS[2], order_id)
+end
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return previous_locations
+"""
+
+_SKIPPED = "!"
+# Version of an order that no longer exists, dropped unconditionally.
+_DELETED = -1
+_EPOCH = datetime(1970, 1, 1)
+
+
+class Entry(NamedTuple):
+    order_id: str
+    version: int
+    # Service location id, "" to drop the order from the views.
+    location: str = ""
+    index_key: str = ""
+    index_member: str = ""
+    order_json: str = ""
+    summary_json: str = ""
+
+
+def bump_version(order: Order) -> Dict[str, Any]:
+    """
+    Bump the version of an order about to be replaced in mongo, or already
+    written with update operators that $inc it.
+
+    Args:
+        order (Order): The order as read from mongo
+
+    Returns:
+        Dict[str, Any]: Filter matching the order only while mongo still holds
+            the version it was read with, so the replace overwrites no other write
+    """
+    order_filter = {"_id": order.id, "version": order.version}
+    order.version = (order.version or 0) + 1
+    return order_filter
+
+
+def _view_key(service_location_id) -> str:
+    return f"{OrderViewConfig.VIEW_KEY_PREFIX}{service_location_id}"
+
+
+def _summary_key(service_location_id) -> str:
+    return f"{OrderViewConfig.SUMMARY_KEY_PREFIX}{service_location_id}"
+
+
+def _index_key(service_location_id, status: OrderStatusEnum) -> str:
+    return f"{OrderViewConfig.INDEX_KEY_PREFIX}{service_location_id}:{status.value}"
+
+
+def _start_key(start: Optional[datetime]) -> str:
+    # Sorts like the lists: by pickup start, orders without one last.
+    if start is None:
+        return "0"
+    if start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    return f"1{(start - _EPOCH) // timedelta(milliseconds=1):015d}"
+
+
+def _index_member(start: Optional[datetime], order_id) -> str:
+    # Every member has score 0, so an index is ordered by this string alone.
+    return f"{_start_key(start)}:{order_id}"
+
+
+def _index_range(page: Optional[OrderPage]) -> Tuple[str, str]:
+    # Lex bounds of the page, to read an index from the latest order back.
+    if page is None:
+        return "+", "-"
+    maximum = "+"
+    if page.start_before:
+        maximum = f"({_start_key(page.start_before)}"
+    if page.after_id is not None:
+        after = f"({_index_member(page.after_start, page.after_id)}"
+        if maximum == "+" or after < maximum:
+            maximum = after
+    minimum = "-"
+    if page.start_from:
+        minimum = f"[{_start_key(page.start_from)}"
+    elif page.start_before:
+        # A window leaves out orders without a pickup start.
+        minimum = "[1"
+    return maximum, minimum
+
+
+def _view_filter() -> Dict[str, Any]:
+    return {
+        "service_location_id": {"$ne": None},
+        "order_status.0.status": {"$in": OrderViewConfig.STATUSES},
+    }
+
+
+def _latest_status(order: Order | OrderSummaryVo) -> Optional[OrderStatusEnum]:
+    if not order.order_status:
+        return None
+    return order.order_status[0].status
+
+
+def _summary(order: Order) -> OrderSummaryVo:
+    # The fields pipelines.ORDER_SUMMARY_PROJECTION reads.
+    return OrderSummaryVo(
+        _id=order.id,
+        simple_id=order.simple_id,
+        sub_id=order.sub_id,
+        count_range=order.count_range,
+        time_slot=order.time_slot,
+        total_count=order.total_count,
+        total_price=order.total_price,
+        order_status=order.order_status[:1] if order.order_status else None,
+        location=(
+            UserLocation(
+                nickname=order.location.nickname, location=order.location.location
+            )
+            if order.location
+            else None
+        ),
+        pickup_date_time=order.pickup_date_time,
+        updated_on=order.updated_on,
+    )
+
+
+def _entry(order: Order) -> Entry:
+    status = _latest_status(order)
+    if (
+        order.service_location_id is None
+        or status is None
+        or status not in OrderViewConfig.STATUSES
+    ):
+        return Entry(str(order.id), order.version or 0)
+    start = order.pickup_date_time.start if order.pickup_date_time else None
+    return Entry(
+        str(order.id),
+        order.version or 0,
+        str(order.service_location_id),
+        _index_key(order.service_location_id, status),
+        _index_member(start, order.id),
+        order.model_dump_json(by_alias=True, exclude_none=True),
+        _summary(order).model_dump_json(by_alias=True, exclude_none=True),
+    )
+
+
+async def _write(entries: List[Entry]):
+    if not entries:
+        return
+    script = redis_cache.get_redis().register_script(APPLY_SCRIPT)
+    previous_locations = await script(
+        keys=[
+            OrderViewConfig.LOCATIONS_KEY,
+            OrderViewConfig.TOUCHED_KEY,
+            RevisionConfig.REVISIONS_KEY,
+            OrderViewConfig.VERSIONS_KEY,
+            OrderViewConfig.INDEX_MEMBERS_KEY,
+        ],
+        args=[
+            OrderViewConfig.VIEW_KEY_PREFIX,
+            OrderViewConfig.SUMMARY_KEY_PREFIX,
+            OrderViewConfig.READY_TTL_SECONDS,
+            revisions.field(revisions.ORDERS, ""),
+            *(value for entry in entries for value in entry),
+        ],
+    )
+    skipped = previous_locations.count(_SKIPPED)
+    if skipped:
+        metrics.increment("order_view.stale_skipped", skipped)
+    await order_events.publish(
+        (entry.order_id, previous, entry.location, entry.order_json)
+        for entry, previous in zip(entries, previous_locations)
+        if previous != _SKIPPED
+    )
+
+
+async def _invalidate(error: Exception):
+    # A missed update would leave the views wrong until the next rebuild, stop
+    # serving them instead.
+    metrics.increment("order_view.update_failed")
+    logger.error(f"Unable to update order views, disabling them until rebuilt: {error}")
+    try:
+        await redis_cache.get_redis().delete(OrderViewConfig.READY_KEY)
+    except Exception as e:
+        logger.error(f"Unable to disable order views: {e}")
+    # The deltas of the failed update were never published.
+    await order_events.resync()
+
+
+async def apply(orders: Iterable[Dict | Order]):
+    """
+    Put orders just written to mongo into the view of their service location,
+    or drop them from the views when no longer allotted or shown.
+
+    Args:
+        orders (Iterable[Dict | Order]): Order documents or models as stored,
+            with the version they were written with
+    """
+    if not OrderViewConfig.ENABLED:
+        return
+    try:
+        await _write(
+            [
+                _entry(order if isinstance(order, Order) else Order(**order))
+                for order in orders
+            ]
+        )
+    except Exception as e:
+        await _invalidate(e)
+
+
+async def _read_entries(order_ids: List[str]) -> List[Entry]:
+    ids = [ObjectId(order_id) for order_id in order_ids]
+    order_docs = await db.order.find({"_id": {"$in": ids}}).to_list(None)
+    entries = [_entry(Order(**order_doc)) for order_doc in order_docs]
+    found = {entry.order_id for entry in entries}
+    entries.extend(Entry(str(id), _DELETED) for id in ids if str(id) not in found)
+    return entries
+
+
+async def order_changed(*order_ids):
+    """
+    Re-read orders from mongo and update the views with them, orders that no
+    longer exist are dropped.
+
+    Args:
+        *order_ids: Ids of the changed orders
+    """
+    if not OrderViewConfig.ENABLED or not order_ids:
+        return
+    try:
+        await _write(await _read_entries(list(order_ids)))
+    except Exception as e:
+        await _invalidate(e)
+
+
+async def sync_location(service_location_id):
+    """
+    Rebuild the view of one service location from mongo, for writes that
+    create or delete orders whose ids are not known to the caller.
+
+    Args:
+        service_location_id: Id of the service location
+    """
+    if not OrderViewConfig.ENABLED or service_location_id is None:
+        return
+    try:
+        order_docs = await db.order.find(
+            {**_view_filter(), "service_location_id": ObjectId(service_location_id)}
+        ).to_list(None)
+        entries = [_entry(Order(**order_doc)) for order_doc in order_docs]
+        found = {entry.order_id for entry in entries}
+        in_view = await redis_cache.get_redis().hkeys(_view_key(service_location_id))
+        # Orders that left the location are read again for their version.
+        entries.extend(
+            await _read_entries(
+                [order_id for order_id in in_view if order_id not in found]
+            )
+        )
+        await _write(entries)
+    except Exception as e:
+        await _invalidate(e)
+
+
+async def rebuild():
+    """Rebuild every view from mongo and mark the views ready to be served."""
+    redis = redis_cache.get_redis()
+    start_time = time.perf_counter()
+    # Updates made while mongo is read are re-applied once the views are swapped.
+    await redis.delete(OrderViewConfig.TOUCHED_KEY)
+    order_docs = await db.order.find(_view_filter()).to_list(None)
+
+    views: Dict[str, Dict[str, str]] = defaultdict(dict)
+    summaries: Dict[str, Dict[str, str]] = defaultdict(dict)
+    indexes: Dict[str, Dict[str, int]] = defaultdict(dict)
+    locations: Dict[str, str] = {}
+    versions: Dict[str, int] = {}
+    index_members: Dict[str, str] = {}
+    for order_doc in order_docs:
+        entry = _entry(Order(**order_doc))
+        if not entry.location:
+            continue
+        views[entry.location][entry.order_id] = entry.order_json
+        summaries[entry.location][entry.order_id] = entry.summary_json
+        indexes[entry.index_key][entry.index_member] = 0
+        locations[entry.order_id] = entry.location
+        versions[entry.order_id] = entry.version
+        index_members[entry.order_id] = f"{entry.index_key} {entry.index_member}"
+
+    previous_locations = set(await redis.hvals(OrderViewConfig.LOCATIONS_KEY))
+    async with redis.pipeline(transaction=True) as pipe:
+        # Read in the swap, to find the views the rebuild corrected.
+        for location in previous_locations:
+            pipe.hgetall(_view_key(location))
+        pipe.delete(
+            OrderViewConfig.LOCATIONS_KEY,
+            OrderViewConfig.VERSIONS_KEY,
+            OrderViewConfig.INDEX_MEMBERS_KEY,
+            *(
+                key
+                for location in previous_locations
+                for key in (
+                    _view_key(location),
+                    _summary_key(location),
+                    *(
+                        _index_key(location, status)
+                        for status in OrderViewConfig.STATUSES
+                    ),
+                )
+            ),
+        )
+        for location, view in views.items():
+            pipe.hset(_view_key(location), mapping=view)
+            pipe.hset(_summary_key(location), mapping=summaries[location])
+        for index_key, members in indexes.items():
+            pipe.zadd(index_key, members)
+        if locations:
+            pipe.hset(OrderViewConfig.LOCATIONS_KEY, mapping=locations)
+            pipe.hset(OrderViewConfig.VERSIONS_KEY, mapping=versions)
+            pipe.hset(OrderViewConfig.INDEX_MEMBERS_KEY, mapping=index_members)
+        # Anything the views missed is corrected now, so no ETag handed out
+        # before the rebuild may still match.
+        pipe.hset(
+            RevisionConfig.REVISIONS_KEY, revisions.ORDERS, revisions.new_generation()
+        )
+        pipe.set(
+            OrderViewConfig.READY_KEY, 1, ex=OrderViewConfig.READY_TTL_SECONDS
+        )
+        previous_views = await pipe.execute()
+
+    # Clients of a corrected view missed the deltas that would have led there.
+    corrected = {
+        location
+        for location, previous_view in zip(previous_locations, previous_views)
+        if previous_view != views.get(location, {})
+    }
+    corrected.update(
+        location for location in views if location not in previous_locations
+    )
+    await order_events.resync(corrected)
+
+    touched = await redis.smembers(OrderViewConfig.TOUCHED_KEY)
+    await order_changed(*touched)
+    metrics.latency("order_view.rebuild").record(time.perf_counter() - start_time)
+    logger.info(
+        f"Order views rebuilt with {len(locations)} orders over {len(views)} "
+        f"service locations, {len(corrected)} corrected and {len(touched)} "
+        "updated meanwhile"
+    )
+
+
+def _descending(value) -> Tuple[bool, Any]:
+    # Mongo sorts missing values first ascending, so last when descending.
+    return value is not None, value if value is not None else datetime.min
+
+
+def _ascending(value) -> Tuple[bool, Any]:
+    return value is not None, value if value is not None else ""
+
+
+def _group(orders: List, by_status: bool) -> List[Dict]:
+    groups: Dict[Tuple, List] = defaultdict(list)
+    for order in orders:
+        date = order.pickup_date_time.date if order.pickup_date_time else None
+        key = (date, order.time_slot)
+        if by_status:
+            key = (_latest_status(order),) + key
+        groups[key].append(order)
+
+    # Same order as the pipelines: status ascending, date descending, time slot
+    # ascending, and the orders of a group by pickup start, latest first.
+    keys = sorted(groups, key=lambda key: _ascending(key[-1]))
+    keys.sort(key=lambda key: _descending(key[-2]), reverse=True)
+    if by_status:
+        keys.sort(key=lambda key: _ascending(key[0]))
+
+    grouped_orders = []
+    for key in keys:
+        group_orders = groups[key]
+        group_orders.sort(
+            key=lambda order: _descending(
+                order.pickup_date_time.start if order.pickup_date_time else None
+            ),
+            reverse=True,
+        )
+        group_id = {"pick_up_date": key[-2], "time_slot": key[-1]}
+        if by_status:
+            group_id["latest_status"] = key[0]
+        grouped_orders.append({"_id": group_id, "orders": group_orders})
+    return grouped_orders
+
+
+def covers(statuses: List[OrderStatusEnum]) -> bool:
+    """Whether the views hold every order in the given latest statuses."""
+    return OrderViewConfig.ENABLED and set(statuses) <= set(OrderViewConfig.STATUSES)
+
+
+async def get_grouped_orders(
+    service_location_ids: List,
+    statuses: List[OrderStatusEnum],
+    by_status: bool = False,
+    order_model: Type[OrderVo | OrderSummaryVo] = OrderVo,
+    page: Optional[OrderPage] = None,
+) -> Optional[List[Dict]]:
+    """
+    Orders of the service locations grouped like the dashboard pipelines group
+    them, read from the views without running an aggregation.
+
+    Args:
+        service_location_ids (List): Service locations of the agent
+        statuses (List[OrderStatusEnum]): Latest statuses to include
+        by_status (bool, optional): Group by status as well as date and time
+            slot. Defaults to False.
+        order_model (Type[OrderVo | OrderSummaryVo], optional): Model the orders
+            are read into. Defaults to OrderVo.
+        page (Optional[OrderPage], optional): Page of the orders to group.
+            Defaults to None, all orders.
+
+    Returns:
+        Optional[List[Dict]]: Groups of {"_id": {...}, "orders": [order_model]}, or
+            None when the views cannot answer and the pipeline must be used
+    """
+    if not covers(statuses):
+        return None
+    start_time = time.perf_counter()
+    maximum, minimum = _index_range(page)
+    limit = {"start": 0, "num": page.limit} if page else {}
+    index_keys = [
+        (location, _index_key(location, status))
+        for location in {str(location) for location in service_location_ids}
+        for status in set(statuses)
+    ]
+    try:
+        redis = redis_cache.get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.exists(OrderViewConfig.READY_KEY)
+            for _, index_key in index_keys:
+                pipe.zrevrangebylex(index_key, maximum, minimum, **limit)
+            ready, *indexed = await pipe.execute()
+    except Exception as e:
+        logger.error(f"Unable to read order views: {e}")
+        ready = False
+    if not ready:
+        metrics.increment("order_view.fallback")
+        return None
+
+    # The page out of every index, only its orders are read and parsed.
+    members = sorted(
+        (
+            (member, location)
+            for (location, _), index_members in zip(index_keys, indexed)
+            for member in index_members
+        ),
+        reverse=True,
+    )
+    if page:
+        members = members[: page.limit]
+    ids_by_location: Dict[str, List[str]] = defaultdict(list)
+    for member, location in members:
+        ids_by_location[location].append(member.rsplit(":", 1)[1])
+
+    payload_key = _summary_key if order_model is OrderSummaryVo else _view_key
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for location, order_ids in ids_by_location.items():
+                pipe.hmget(payload_key(location), order_ids)
+            payloads = await pipe.execute()
+    except Exception as e:
+        logger.error(f"Unable to read order views: {e}")
+        metrics.increment("order_view.fallback")
+        return None
+
+    seen = set()
+    orders: List = []
+    for payload in (payload for view in payloads for payload in view):
+        # Gone since the index was read.
+        if payload is None:
+            continue
+        order = order_model.model_validate_json(payload)
+        # An order caught mid move between two locations is listed once.
+        if order.id in seen:
+            continue
+        seen.add(order.id)
+        orders.append(order)
+
+    grouped_orders = _group(orders, by_status)
+    metrics.latency("order_view.read").record(time.perf_counter() - start_time)
+    return grouped_orders
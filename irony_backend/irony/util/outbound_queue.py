@@ -0,0 +1,578 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+from bson import json_util
+from pymongo import ReplaceOne
+from redis import asyncio as aioredis
+
+from irony.config.logger import logger
+from irony.config.whatsapp.outbound_queue_config import OutboundQueueConfig
+from irony.db import db
+from irony.models.whatsapp.outbound_message import OutboundMessage
+from irony.util import metrics, redis_cache
+
+Sender = Callable[[OutboundMessage], Awaitable[httpx.Response]]
+
+RETRYABLE_STATUS_CODES = (429,)
+
+# Jobs wait in one list per recipient ("lane"), only the head of a lane is ever
+# sent. A lane with jobs is in exactly one of: the ready list, leased while its
+# head is being sent, or delayed while its head waits for a retry. So messages
+# to one recipient go out one at a time and in order, across all workers.
+# Every script uses the redis server clock so leases behave the same from
+# every host.
+
+# Stores the job and appends it to its lane, readying the lane if it was idle.
+PUSH_SCRIPT = """
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+if redis.call('RPUSH', KEYS[2], ARGV[1]) == 1 then
+    redis.call('LPUSH', KEYS[1], ARGV[3])
+end
+return 1
+"""
+
+# Readies lanes with due retries and expired leases, then leases the next lane
+# and returns its recipient, head job id and payload.
+POP_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local due = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now, 'LIMIT', 0, 100)
+for _, to in ipairs(due) do
+    redis.call('ZREM', KEYS[2], to)
+    redis.call('LPUSH', KEYS[1], to)
+end
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now, 'LIMIT', 0, 100)
+for _, to in ipairs(expired) do
+    redis.call('ZREM', KEYS[3], to)
+    redis.call('RPUSH', KEYS[1], to)
+end
+while true do
+    local to = redis.call('RPOP', KEYS[1])
+    if not to then
+        return nil
+    end
+    local id = redis.call('LINDEX', ARGV[2] .. to, 0)
+    if id then
+        redis.call('ZADD', KEYS[3], now + tonumber(ARGV[1]), to)
+        return {to, id, redis.call('HGET', KEYS[4], id)}
+    end
+end
+"""
+
+# Removes the lane's head job and readies the lane if more jobs wait in it.
+ACK_SCRIPT = """
+local leased = redis.call('ZREM', KEYS[1], ARGV[2])
+redis.call('HDEL', KEYS[3], ARGV[1])
+if redis.call('LINDEX', KEYS[4], 0) == ARGV[1] then
+    redis.call('LPOP', KEYS[4])
+end
+if leased == 1 and redis.call('LLEN', KEYS[4]) > 0 then
+    redis.call('LPUSH', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+# Keeps the job at the head of its lane, the whole lane waits for the retry.
+RETRY_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[2], ARGV[3])
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[4]), ARGV[1])
+return 1
+"""
+
+# Returns 0 when a token was taken, otherwise milliseconds to wait for the next one.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 60000)
+return wait
+"""
+
+
+def _dumps(job: OutboundMessage) -> str:
+    return json_util.dumps(job.model_dump())
+
+
+def _loads(raw: str) -> OutboundMessage:
+    return OutboundMessage(**json_util.loads(raw))
+
+
+class InMemoryQueueBackend:
+    """Process-local queue. Not durable; used in tests and when redis is
+    unavailable. Keeps the same per-recipient order as RedisQueueBackend."""
+
+    def __init__(self):
+        self._lanes: Dict[str, Deque[OutboundMessage]] = {}
+        self._ready: Deque[str] = deque()
+        self.dead_letters: Deque[OutboundMessage] = deque(maxlen=1000)
+
+    async def push(self, job: OutboundMessage):
+        lane = self._lanes.get(job.to)
+        if lane is None:
+            lane = self._lanes[job.to] = deque()
+            self._ready.append(job.to)
+        lane.append(job)
+
+    async def pop(self) -> Optional[OutboundMessage]:
+        return self._lanes[self._ready.popleft()][0] if self._ready else None
+
+    def _remove_head(self, job: OutboundMessage):
+        lane = self._lanes[job.to]
+        lane.popleft()
+        if lane:
+            self._ready.append(job.to)
+        else:
+            del self._lanes[job.to]
+
+    async def ack(self, job: OutboundMessage):
+        self._remove_head(job)
+
+    async def retry(self, job: OutboundMessage, delay: float):
+        self._lanes[job.to][0] = job
+        asyncio.get_running_loop().call_later(delay, self._ready.append, job.to)
+
+    async def dead_letter(self, job: OutboundMessage):
+        self._remove_head(job)
+        self.dead_letters.append(job)
+
+    async def size(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+
+class RedisQueueBackend:
+    """Durable queue shared by all workers, FIFO per recipient. A popped job's
+    lane is leased for VISIBILITY_TIMEOUT_SECONDS and handed to another worker
+    if the job is not acked in time."""
+
+    def __init__(self, redis: aioredis.Redis, prefix: str, visibility_timeout: int):
+        self._redis = redis
+        self._ready_key = f"{prefix}:ready"
+        self._delayed_key = f"{prefix}:delayed_lanes"
+        self._leases_key = f"{prefix}:lane_leases"
+        self._lane_prefix = f"{prefix}:lane:"
+        self._jobs_key = f"{prefix}:jobs"
+        self._dead_key = f"{prefix}:dead"
+        self._visibility_timeout_ms = visibility_timeout * 1000
+        self._push_script = redis.register_script(PUSH_SCRIPT)
+        self._pop_script = redis.register_script(POP_SCRIPT)
+        self._ack_script = redis.register_script(ACK_SCRIPT)
+        self._retry_script = redis.register_script(RETRY_SCRIPT)
+
+    def _lane_key(self, to: str) -> str:
+        return f"{self._lane_prefix}{to}"
+
+    async def _push(self, job_id: str, to: str, raw: str):
+        await self._push_script(
+            keys=[self._ready_key, self._lane_key(to), self._jobs_key],
+            args=[job_id, raw, to],
+        )
+
+    async def push(self, job: OutboundMessage):
+        await self._push(job.id, job.to, _dumps(job))
+
+    async def pop(self) -> Optional[OutboundMessage]:
+        result = await self._pop_script(
+            keys=[self._ready_key, self._delayed_key, self._leases_key, self._jobs_key],
+            args=[self._visibility_timeout_ms, self._lane_prefix],
+        )
+        if not result:
+            return None
+        to, job_id, raw = result
+        if raw is None:
+            logger.error(f"Outbound job {job_id} has no payload, dropping it")
+            await self._ack(job_id, to)
+            return None
+        return _loads(raw)
+
+    async def _ack(self, job_id: str, to: str, client=None):
+        await self._ack_script(
+            keys=[
+                self._leases_key,
+                self._ready_key,
+                self._jobs_key,
+                self._lane_key(to),
+            ],
+            args=[job_id, to],
+            client=client,
+        )
+
+    async def ack(self, job: OutboundMessage):
+        await self._ack(job.id, job.to)
+
+    async def retry(self, job: OutboundMessage, delay: float):
+        await self._retry_script(
+            keys=[self._leases_key, self._delayed_key, self._jobs_key],
+            args=[job.to, job.id, _dumps(job), int(delay * 1000)],
+        )
+
+    async def dead_letter(self, job: OutboundMessage):
+        async with self._redis.pipeline(transaction=True) as pipe:
+            await self._ack(job.id, job.to, client=pipe)
+            pipe.lpush(self._dead_key, _dumps(job))
+            pipe.ltrim(self._dead_key, 0, 999)
+            await pipe.execute()
+
+    async def size(self) -> int:
+        # Jobs being sent count too, so a draining worker waits for them.
+        return await self._redis.hlen(self._jobs_key)
+
+
+class TokenBucket:
+    """Process-local token bucket per key."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def _take(self, key: str) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            return 0
+        self._buckets[key] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+    async def acquire(self, key: str):
+        while True:
+            wait = self._take(key)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class RedisTokenBucket:
+    """Token bucket per key shared by every worker process and host."""
+
+    def __init__(self, redis: aioredis.Redis, prefix: str, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._prefix = prefix
+        self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self, key: str):
+        while True:
+            wait_ms = await self._script(
+                keys=[f"{self._prefix}:bucket:{key}"], args=[self.rate, self.capacity]
+            )
+            if int(wait_ms) <= 0:
+                return
+            await asyncio.sleep(int(wait_ms) / 1000)
+
+
+def build_last_message_doc(
+    to: str, response_data: Dict, last_message_update: Dict
+) -> Dict:
+    last_message_update["user"] = to
+    if "messages" in response_data and "id" in response_data["messages"][0]:
+        last_message_update["last_sent_msg_id"] = response_data["messages"][0]["id"]
+    return last_message_update
+
+
+class LastMessageBatcher:
+    """Coalesces last_message upserts and writes them with one bulk_write."""
+
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Latest doc per user wins, replace semantics match Message.send_message.
+        self._pending: Dict[str, Dict] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, last_message_doc: Dict):
+        self._pending[last_message_doc["user"]] = last_message_doc
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        if self._pending:
+            logger.error(
+                f"{len(self._pending)} last_message docs not written at shutdown"
+            )
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            result = await db.last_message.bulk_write(
+                [
+                    ReplaceOne({"user": user}, doc, upsert=True)
+                    for user, doc in batch.items()
+                ],
+                ordered=False,
+            )
+            metrics.increment("outbound.last_message_upserts", len(batch))
+            logger.info(
+                f"last_message batch written. docs: {len(batch)}, modified: {result.modified_count}, upserted: {result.upserted_count}"
+            )
+        except Exception as e:
+            logger.error(
+                f"Error writing last_message batch, writing docs one by one: {e}"
+            )
+            await self._write_each(batch)
+
+    async def _write_each(self, batch: Dict[str, Dict]):
+        # Replies are matched against last_message, so a doc that still fails is
+        # kept for the next flush unless a newer one for the user arrived since.
+        failed = 0
+        for user, doc in batch.items():
+            try:
+                await db.last_message.replace_one({"user": user}, doc, upsert=True)
+                metrics.increment("outbound.last_message_upserts")
+            except Exception as e:
+                failed += 1
+                logger.error(f"Error writing last_message of {user}: {e}")
+                self._pending.setdefault(user, doc)
+        if failed:
+            metrics.increment("outbound.last_message_retried", failed)
+
+
+class OutboundQueue:
+    """Worker pool that delivers queued WhatsApp messages.
+
+    Jobs are rate limited per sender phone number id and retried with backoff on
+    429/5xx and transport errors. Messages to the same recipient are delivered
+    one at a time in the order they were enqueued, a message being retried
+    holds back the ones queued after it.
+    """
+
+    def __init__(self, backend, bucket, sender: Sender):
+        self.backend = backend
+        self.bucket = bucket
+        self.sender = sender
+        self.batcher = LastMessageBatcher(
+            OutboundQueueConfig.LAST_MESSAGE_BATCH_SIZE,
+            OutboundQueueConfig.LAST_MESSAGE_FLUSH_INTERVAL_SECONDS,
+        )
+        self._wakeup = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self.batcher.start()
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(OutboundQueueConfig.WORKER_COUNT)
+        ]
+
+    async def stop(self):
+        deadline = time.monotonic() + OutboundQueueConfig.DRAIN_TIMEOUT_SECONDS
+        while await self.backend.size() > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(OutboundQueueConfig.POLL_INTERVAL_SECONDS)
+        self._running = False
+        self._wakeup.set()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await self.batcher.stop()
+
+    async def enqueue(self, job: OutboundMessage) -> str:
+        deadline = time.monotonic() + OutboundQueueConfig.ENQUEUE_TIMEOUT_SECONDS
+        while await self.backend.size() >= OutboundQueueConfig.MAX_QUEUE_SIZE:
+            if time.monotonic() > deadline:
+                metrics.increment("outbound.rejected")
+                raise Exception("Outbound message queue is full.")
+            await asyncio.sleep(OutboundQueueConfig.POLL_INTERVAL_SECONDS)
+
+        await self.backend.push(job)
+        metrics.increment("outbound.enqueued")
+        self._wakeup.set()
+        return job.id
+
+    async def _worker(self):
+        while self._running:
+            try:
+                job = await self.backend.pop()
+            except Exception as e:
+                logger.error(f"Error reading outbound queue: {e}", exc_info=True)
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), OutboundQueueConfig.POLL_INTERVAL_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._process(job)
+            except Exception as e:
+                logger.error(f"Error processing outbound job {job.id}: {e}", exc_info=True)
+
+    async def _process(self, job: OutboundMessage):
+        await self.bucket.acquire(job.sender_id)
+        job.attempts += 1
+
+        retry_after: Optional[float] = None
+        try:
+            response = await self.sender(job)
+        except httpx.RequestError as e:
+            logger.error(f"Error sending outbound job {job.id}: {e}")
+            response = None
+
+        if response is not None and response.status_code == 200:
+            response_data: Dict[str, Any] = response.json()
+            logger.info(f"Sent message response : {response_data}")
+            if job.last_message_update is not None:
+                self.batcher.add(
+                    build_last_message_doc(
+                        job.to, response_data, job.last_message_update
+                    )
+                )
+            await self.backend.ack(job)
+            metrics.increment("outbound.delivered")
+            metrics.latency("outbound.enqueue_to_delivered").record(
+                time.time() - job.enqueued_at
+            )
+            return
+
+        if response is not None:
+            logger.error(f"Error while sending message : {response.text}")
+            if not (
+                response.status_code in RETRYABLE_STATUS_CODES
+                or response.status_code >= 500
+            ):
+                # Other 4xx errors will fail the same way on every attempt.
+                await self.backend.ack(job)
+                metrics.increment("outbound.failed")
+                return
+            retry_after = _parse_retry_after(response)
+
+        if job.attempts >= OutboundQueueConfig.MAX_ATTEMPTS:
+            logger.error(
+                f"Outbound job {job.id} to {job.to} failed after {job.attempts} attempts"
+            )
+            await self.backend.dead_letter(job)
+            metrics.increment("outbound.dead_lettered")
+            return
+
+        delay = retry_after or _backoff_delay(job.attempts)
+        await self.backend.retry(job, delay)
+        metrics.increment("outbound.retried")
+
+
+def _backoff_delay(attempts: int) -> float:
+    delay = min(
+        OutboundQueueConfig.RETRY_MAX_DELAY_SECONDS,
+        OutboundQueueConfig.RETRY_BASE_DELAY_SECONDS * (2 ** (attempts - 1)),
+    )
+    # Full jitter keeps retries from many workers from lining up.
+    return delay * (0.5 + random.random() / 2)
+
+
+def _parse_retry_after(response: httpx.Response) -> Optional[float]:
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is None:
+        return None
+    try:
+        return min(float(retry_after), OutboundQueueConfig.RETRY_MAX_DELAY_SECONDS)
+    except ValueError:
+        return None
+
+
+_queue: Optional[OutboundQueue] = None
+
+
+async def start(sender: Sender):
+    global _queue
+    if not OutboundQueueConfig.ENABLED:
+        logger.info("Outbound queue disabled, messages will be sent inline")
+        return
+
+    backend: Any = None
+    bucket: Any = None
+    if OutboundQueueConfig.BACKEND == "redis":
+        try:
+            _redis = redis_cache.get_redis()
+            await _redis.ping()
+            backend = RedisQueueBackend(
+                _redis,
+                OutboundQueueConfig.KEY_PREFIX,
+                OutboundQueueConfig.VISIBILITY_TIMEOUT_SECONDS,
+            )
+            bucket = RedisTokenBucket(
+                _redis,
+                OutboundQueueConfig.KEY_PREFIX,
+                OutboundQueueConfig.MESSAGES_PER_SECOND_PER_SENDER,
+                OutboundQueueConfig.BURST_PER_SENDER,
+            )
+        except Exception as e:
+            logger.error(
+                f"Redis unavailable for outbound queue, using in-memory queue: {e}"
+            )
+            backend = None
+
+    if backend is None:
+        backend = InMemoryQueueBackend()
+        bucket = TokenBucket(
+            OutboundQueueConfig.MESSAGES_PER_SECOND_PER_SENDER,
+            OutboundQueueConfig.BURST_PER_SENDER,
+        )
+
+    _queue = OutboundQueue(backend, bucket, sender)
+    _queue.start()
+    logger.info(
+        f"Outbound queue started with {type(backend).__name__} and {OutboundQueueConfig.WORKER_COUNT} workers"
+    )
+
+
+async def stop():
+    global _queue
+    if _queue is not None:
+        await _queue.stop()
+        _queue = None
+    logger.info("Outbound queue stopped")
+
+
+def is_running() -> bool:
+    return _queue is not None
+
+
+async def enqueue(job: OutboundMessage) -> str:
+    if _queue is None:
+        raise Exception("Outbound queue is not running.")
+    return await _queue.enqueue(job)
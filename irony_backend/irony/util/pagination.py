@@ -0,0 +1,122 @@
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from irony.config.agent.order_list_config import OrderListConfig
+from irony.models.service_agent.vo.order_page_vo import OrderPage
+
+
+def get_order_page(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> OrderPage:
+    """
+    Build the page requested by an order list endpoint.
+
+    Args:
+        from_date (Optional[date]): First pickup date to include
+        to_date (Optional[date]): Last pickup date to include
+        limit (Optional[int]): Orders per page, OrderListConfig.DEFAULT_PAGE_SIZE if not given
+        cursor (Optional[str]): next_cursor of the previous page
+
+    Returns:
+        OrderPage: The page to fetch
+
+    Raises:
+        HTTPException: If the window, limit or cursor is invalid
+    """
+    if limit is None:
+        limit = OrderListConfig.DEFAULT_PAGE_SIZE
+    if not 0 < limit <= OrderListConfig.MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Limit must be between 1 and {OrderListConfig.MAX_PAGE_SIZE}",
+        )
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="from_date is after to_date")
+
+    page = OrderPage(limit=limit)
+    if from_date:
+        page.start_from = datetime.combine(from_date, time.min)
+    if to_date:
+        page.start_before = datetime.combine(to_date + timedelta(days=1), time.min)
+    if cursor:
+        page.after_start, page.after_id = _decode_cursor(cursor)
+    return page
+
+
+def _sort_key(order) -> Tuple[bool, datetime, ObjectId]:
+    # Orders without a pickup start sort last, as they do in mongo.
+    start = order.pickup_date_time.start if order.pickup_date_time else None
+    return start is not None, start or datetime.min, order.id
+
+
+def _encode_cursor(order) -> str:
+    start = order.pickup_date_time.start if order.pickup_date_time else None
+    payload = {"start": start.isoformat() if start else None, "id": str(order.id)}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[Optional[datetime], ObjectId]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        start = payload["start"]
+        return (
+            datetime.fromisoformat(start) if start else None,
+            ObjectId(payload["id"]),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+def get_next_cursor(
+    orders: List, page: Optional[OrderPage], count: Optional[int] = None
+) -> Optional[str]:
+    """
+    Cursor of the page after `orders`, None when this was the last page.
+
+    Args:
+        orders (List): Orders of the current page, in any order
+        page (Optional[OrderPage]): The current page
+        count (Optional[int]): Orders on the page when `orders` only holds the
+            last order of each streamed group. Defaults to len(orders).
+
+    Returns:
+        Optional[str]: Cursor to pass to get the next page
+    """
+    if count is None:
+        count = len(orders)
+    if page is None or not orders or count < page.limit:
+        return None
+    return _encode_cursor(min(orders, key=_sort_key))
+
+
+def get_page_match(page: OrderPage) -> Dict[str, Any]:
+    """Conditions selecting the orders of `page`, added to a pipeline's $match."""
+    match: Dict[str, Any] = {}
+    window: Dict[str, datetime] = {}
+    if page.start_from:
+        window["$gte"] = page.start_from
+    if page.start_before:
+        window["$lt"] = page.start_before
+    if window:
+        match["pickup_date_time.start"] = window
+
+    if page.after_id is None:
+        return match
+    if page.after_start is None:
+        match["$or"] = [{"pickup_date_time.start": None, "_id": {"$lt": page.after_id}}]
+    else:
+        match["$or"] = [
+            {"pickup_date_time.start": {"$lt": page.after_start}},
+            {"pickup_date_time.start": page.after_start, "_id": {"$lt": page.after_id}},
+            {"pickup_date_time.start": None},
+        ]
+    return match
+
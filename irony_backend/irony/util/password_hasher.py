@@ -0,0 +1,92 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+
+from irony.config.agent.auth_config import AuthConfig
+from irony.util import auth, metrics
+
+T = TypeVar("T")
+
+_executor: Optional[Executor] = None
+# Held while a hash runs, time spent waiting on it is the queue time.
+_workers = asyncio.Semaphore(AuthConfig.PASSWORD_HASH_WORKERS)
+_pending = 0
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if AuthConfig.PASSWORD_HASH_USE_PROCESSES:
+            # Spawned rather than forked, a fork would copy the running loop.
+            _executor = ProcessPoolExecutor(
+                max_workers=AuthConfig.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=AuthConfig.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password_hasher",
+            )
+    return _executor
+
+
+async def _run(name: str, fn: Callable[..., T], *args) -> T:
+    global _pending
+    if _pending >= AuthConfig.PASSWORD_HASH_MAX_PENDING:
+        metrics.increment("password_hash.rejected")
+        raise asyncio.QueueFull("Password hasher is full")
+    _pending += 1
+    metrics.set_gauge("password_hash.pending", _pending)
+    queued = time.perf_counter()
+    try:
+        async with _workers:
+            started = time.perf_counter()
+            metrics.latency("password_hash.queue").record(started - queued)
+            result = await asyncio.get_running_loop().run_in_executor(
+                _get_executor(), fn, *args
+            )
+            metrics.latency(f"password_hash.{name}").record(
+                time.perf_counter() - started
+            )
+            return result
+    finally:
+        _pending -= 1
+        metrics.set_gauge("password_hash.pending", _pending)
+
+
+async def hash_password(password: str) -> str:
+    """
+    Hash a password in the hashing pool.
+
+    Raises:
+        asyncio.QueueFull: If PASSWORD_HASH_MAX_PENDING hashes are already waiting
+    """
+    return await _run("hash", auth.hash_password, password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password in the hashing pool, see auth.verify_and_update_password.
+
+    Raises:
+        asyncio.QueueFull: If PASSWORD_HASH_MAX_PENDING hashes are already waiting
+    """
+    return await _run(
+        "verify", auth.verify_and_update_password, plain_password, hashed_password
+    )
+
+
+def start():
+    """Create the hashing pool with the app rather than on the first login."""
+    _get_executor()
+
+
+async def stop():
+    global _executor
+    if _executor is not None:
+        executor, _executor = _executor, None
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
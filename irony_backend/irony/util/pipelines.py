@@ -1,9 +1,14 @@
-from typing import List
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 from fastapi.background import P
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
 
 from irony.models.order_status_enum import OrderStatusEnum
 from irony.models.pyobjectid import PyObjectId
+from irony.models.service_agent.vo.order_page_vo import OrderPage
+from irony.util import pagination
+from irony.util.index_manager import register_indexes, register_query
 
 
 def get_pipeline(func_name: str, *args):
@@ -14,17 +19,58 @@ def get_pipeline(func_name: str, *args):
     return func_map[func_name](*args)
 
 
+# Only what the agent order lists render, see OrderSummaryVo. Keeps the status
+# history, items, services and user out of list responses.
+ORDER_SUMMARY_PROJECTION: Dict[str, Any] = {
+    "simple_id": 1,
+    "sub_id": 1,
+    "count_range": 1,
+    "time_slot": 1,
+    "total_count": 1,
+    "total_price": 1,
+    "order_status": {"$slice": ["$order_status", 1]},
+    "location.nickname": 1,
+    "location.location": 1,
+    "pickup_date_time": 1,
+    "updated_on": 1,
+}
+
+
+def _project(projection: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"$project": projection}] if projection else []
+
+
+def _select_orders(
+    service_location_ids: List[str],
+    ordered_statuses: List[OrderStatusEnum],
+    page: Optional[OrderPage],
+) -> List[Dict[str, Any]]:
+    # Without a page every matching order is read, sorted as the lists show them.
+    match = {
+        "service_location_id": {"$in": service_location_ids},
+        "order_status.0.status": {"$in": ordered_statuses},
+    }
+    if page is None:
+        return [
+            {"$match": match},
+            {"$sort": {"pickup_date_time.start": -1, "time_slot": 1}},
+        ]
+    return [
+        {"$match": {**match, **pagination.get_page_match(page)}},
+        {"$sort": {"pickup_date_time.start": -1, "_id": -1}},
+        {"$limit": page.limit},
+    ]
+
+
 def get_pipeline_orders_group_by_status_and_date_and_time_slot_for_service_location_ids(
-    service_location_ids: List[str], ordered_statuses: List[OrderStatusEnum]
+    service_location_ids: List[str],
+    ordered_statuses: List[OrderStatusEnum],
+    projection: Optional[Dict[str, Any]] = None,
+    page: Optional[OrderPage] = None,
 ):
     return [
-        {
-            "$match": {
-                "service_location_id": {"$in": service_location_ids},
-                "order_status.0.status": {"$in": ordered_statuses},
-            }
-        },
-        {"$sort": {"pickup_date_time.start": -1, "time_slot": 1}},
+        *_select_orders(service_location_ids, ordered_statuses, page),
+        *_project(projection),
         {"$addFields": {"latest_status": {"$first": "$order_status"}}},
         {
             "$group": {
@@ -47,16 +93,14 @@ def get_pipeline_orders_group_by_status_and_date_and_time_slot_for_service_locat
 
 
 def get_pipeline_orders_group_by_date_and_time_slot_for_service_location_ids(
-    service_location_ids: List[str], ordered_statuses: List[OrderStatusEnum]
+    service_location_ids: List[str],
+    ordered_statuses: List[OrderStatusEnum],
+    projection: Optional[Dict[str, Any]] = None,
+    page: Optional[OrderPage] = None,
 ):
     return [
-        {
-            "$match": {
-                "service_location_id": {"$in": service_location_ids},
-                "order_status.0.status": {"$in": ordered_statuses},
-            }
-        },
-        {"$sort": {"pickup_date_time.start": -1, "time_slot": 1}},
+        *_select_orders(service_location_ids, ordered_statuses, page),
+        *_project(projection),
         {
             "$group": {
                 "_id": {
@@ -76,36 +120,265 @@ def get_pipeline_orders_group_by_date_and_time_slot_for_service_location_ids(
 
 
 def get_pipeline_orders_by_status_for_service_location_ids(
-    service_location_ids: List[str], ordered_statuses: List[OrderStatusEnum]
+    service_location_ids: List[str],
+    ordered_statuses: List[OrderStatusEnum],
+    projection: Optional[Dict[str, Any]] = None,
+    page: Optional[OrderPage] = None,
+):
+    return [
+        *_select_orders(service_location_ids, ordered_statuses, page),
+        *_project(projection),
+    ]
+
+
+def get_pipeline_pending_order_requests(
+    current_time: datetime, order_request_ids: Optional[List[PyObjectId]] = None
 ):
+    match: Dict[str, Any] = {
+        "trigger_time": {"$lt": current_time},
+        "is_pending": True,
+        "try_count": {"$lt": 3},
+    }
+    if order_request_ids is not None:
+        match["_id"] = {"$in": order_request_ids}
     return [
+        {"$match": match},
         {
-            "$match": {
-                "service_location_id": {"$in": service_location_ids},
-                "order_status.0.status": {"$in": ordered_statuses},
+            "$lookup": {
+                "from": "service_locations",  # the collection to join
+                "localField": "service_location_id",  # field in orders referencing service_locations._id
+                "foreignField": "_id",  # field in service_locations to match
+                "as": "service_location",  # output array field for matched documents
             }
         },
-        {"$sort": {"pickup_date_time.start": -1, "time_slot": 1}},
+        {
+            "$unwind": "$service_location"  # flatten if each order has only one service location
+        },
+        {
+            "$lookup": {
+                "from": "service_locations",  # the collection to join
+                "localField": "delivery_service_locations_ids",  # field in orders referencing service_locations._id
+                "foreignField": "_id",  # field in service_locations to match
+                "as": "delivery_service_locations",  # output array field for matched documents
+            }
+        },
+        {
+            "$lookup": {
+                "from": "order",  # the collection to join
+                "localField": "order_id",
+                "foreignField": "_id",
+                "as": "order",
+            }
+        },
+        {"$unwind": "$order"},  # flatten if each order has only one order
     ]
 
 
-def get_pipeline_service_prices_for_locations(
-    service_location_ids: List[str | PyObjectId],
+def get_pipeline_orders_pending_order_request(
+    current_time: datetime, order_ids: Optional[List[PyObjectId]] = None
+):
+    match: Dict[str, Any] = {
+        "trigger_order_request_at": {"$lte": current_time},
+        "trigger_order_request_pending": True,
+    }
+    if order_ids is not None:
+        match["_id"] = {"$in": order_ids}
+    return [{"$match": match}]
+
+
+def get_pipeline_nearby_service_locations(
+    coordinates: List[float],
+    service_ids: List[PyObjectId],
+    time_slot: str,
+    max_distance: float,
 ):
+    """
+    Active service locations near `coordinates` serving every one of `service_ids`
+    in `time_slot`, grouped by delivery_type and nearest first within a group.
+    The in-memory ServiceLocationIndex answers the same question.
+    """
     return [
+        {
+            "$geoNear": {
+                "key": "coords",
+                "near": {"type": "Point", "coordinates": coordinates},
+                "distanceField": "distance",
+                "maxDistance": max_distance,
+                "spherical": True,
+            }
+        },
         {
             "$match": {
-                "service_location_id": {"$in": service_location_ids},
+                # Filter where range is greater or equal to distance
+                "$expr": {"$gte": ["$range", "$distance"]},
+                "is_active": True,
+                "service_ids": {"$all": service_ids},
+                "time_slots": {"$in": [time_slot]},
             }
         },
-        {"$sort": {"sort_order": 1}},
         {
-            "$group": {
-                "_id": {
-                    "service_location_id": "$service_location_id",
-                    "service_id": "$service_id",
-                },
-                "prices": {"$push": "$$ROOT"},
+            "$lookup": {
+                "from": "timeslot_volume",
+                "localField": "_id",
+                "foreignField": "service_location_id",
+                "as": "timeslot_volumes",
             }
         },
+        {"$group": {"_id": "$delivery_type", "documents": {"$push": "$$ROOT"}}},
     ]
+
+
+# Indexes the pipelines above and the hot lookups depend on. They are created by
+# index_manager.ensure_indexes and each registered query is checked with explain().
+_SAMPLE_ID = PyObjectId("000000000000000000000000")
+_OPEN_STATUSES = [
+    OrderStatusEnum.PICKUP_PENDING,
+    OrderStatusEnum.DELIVERY_PENDING,
+]
+
+register_indexes(
+    "order",
+    IndexModel(
+        [
+            ("service_location_id", ASCENDING),
+            ("order_status.0.status", ASCENDING),
+            ("pickup_date_time.start", DESCENDING),
+            ("time_slot", ASCENDING),
+        ],
+        name="service_location_status_pickup",
+    ),
+    IndexModel(
+        [
+            ("service_location_id", ASCENDING),
+            ("order_status.0.status", ASCENDING),
+            ("pickup_date_time.start", DESCENDING),
+            ("_id", DESCENDING),
+        ],
+        name="service_location_status_pickup_id",
+    ),
+    IndexModel(
+        [("time_slot", ASCENDING), ("order_status.0.status", ASCENDING)],
+        name="time_slot_status",
+    ),
+    IndexModel(
+        [("trigger_order_request_at", ASCENDING)],
+        name="pending_order_request_trigger",
+        partialFilterExpression={"trigger_order_request_pending": True},
+    ),
+)
+register_indexes(
+    "order_request",
+    IndexModel(
+        [("trigger_time", ASCENDING), ("try_count", ASCENDING)],
+        name="pending_trigger_time_try_count",
+        partialFilterExpression={"is_pending": True},
+    ),
+)
+register_indexes(
+    "service_locations",
+    IndexModel([("coords", GEOSPHERE)], name="coords_2dsphere"),
+)
+register_indexes(
+    "timeslot_volume",
+    IndexModel(
+        [("service_location_id", ASCENDING), ("operation_date", ASCENDING)],
+        name="service_location_operation_date",
+    ),
+)
+register_indexes(
+    "prices",
+    IndexModel(
+        [("service_location_id", ASCENDING), ("sort_order", ASCENDING)],
+        name="service_location_sort_order",
+    ),
+)
+register_indexes("last_message", IndexModel([("user", ASCENDING)], name="user"))
+register_indexes("user", IndexModel([("wa_id", ASCENDING)], name="wa_id"))
+register_indexes("service_agent", IndexModel([("mobile", ASCENDING)], name="mobile"))
+register_indexes(
+    "location",
+    IndexModel([("user", ASCENDING), ("last_used", DESCENDING)], name="user_last_used"),
+)
+register_indexes("config", IndexModel([("key", ASCENDING)], name="key"))
+
+register_query(
+    "orders_group_by_status_and_date_and_time_slot_for_agent_locations",
+    "order",
+    lambda: get_pipeline_orders_group_by_status_and_date_and_time_slot_for_service_location_ids(
+        [_SAMPLE_ID], _OPEN_STATUSES
+    ),
+)
+register_query(
+    "orders_group_by_date_and_time_slot_for_agent_locations",
+    "order",
+    lambda: get_pipeline_orders_group_by_date_and_time_slot_for_service_location_ids(
+        [_SAMPLE_ID], _OPEN_STATUSES
+    ),
+)
+register_query(
+    "orders_by_status_for_service_location_ids",
+    "order",
+    lambda: get_pipeline_orders_by_status_for_service_location_ids(
+        [_SAMPLE_ID], _OPEN_STATUSES
+    ),
+)
+register_query(
+    "orders_page_for_service_location_ids",
+    "order",
+    lambda: get_pipeline_orders_by_status_for_service_location_ids(
+        [_SAMPLE_ID],
+        _OPEN_STATUSES,
+        page=OrderPage(limit=100, after_start=datetime.now(), after_id=_SAMPLE_ID),
+    ),
+)
+register_query(
+    "pending_order_requests",
+    "order_request",
+    lambda: get_pipeline_pending_order_requests(datetime.now()),
+)
+register_query(
+    "orders_pending_order_request",
+    "order",
+    lambda: get_pipeline_orders_pending_order_request(datetime.now()),
+)
+register_query(
+    "orders_for_time_slot_schedule",
+    "order",
+    lambda: [
+        {
+            "$match": {
+                "time_slot": "TIME_SLOT_ID_1",
+                "order_status.0.status": {"$in": _OPEN_STATUSES},
+            }
+        }
+    ],
+)
+register_query(
+    "nearby_service_locations",
+    "service_locations",
+    lambda: get_pipeline_nearby_service_locations(
+        [0, 0], [_SAMPLE_ID], "TIME_SLOT_ID_1", 2000
+    ),
+)
+register_query(
+    "timeslot_volume_for_location",
+    "timeslot_volume",
+    lambda: [{"$match": {"service_location_id": _SAMPLE_ID}}],
+)
+register_query(
+    "last_message_by_user", "last_message", lambda: [{"$match": {"user": ""}}]
+)
+register_query("user_by_wa_id", "user", lambda: [{"$match": {"wa_id": ""}}])
+register_query(
+    "service_agent_by_mobile", "service_agent", lambda: [{"$match": {"mobile": ""}}]
+)
+register_query(
+    "last_named_location_of_user",
+    "location",
+    lambda: [
+        {"$match": {"user": "", "nickname": {"$exists": True}}},
+        {"$sort": {"last_used": -1}},
+        {"$limit": 1},
+    ],
+)
+register_query("config_by_key", "config", lambda: [{"$match": {"key": ""}}])
@@ -0,0 +1,135 @@
+import hashlib
+from collections import defaultdict
+from typing import Dict, List
+
+from pydantic import TypeAdapter
+
+from irony.config import config
+from irony.models.prices import Prices
+from irony.models.service import Service
+from irony.models.service_agent.vo.prices_response_vo import (
+    PricesResponseVo,
+    ServicePrices,
+)
+
+_service_prices_list = TypeAdapter(List[ServicePrices])
+
+# PricesResponseVo with its data left open, each location's JSON is spliced in.
+_RESPONSE_PREFIX, _RESPONSE_SUFFIX = (
+    PricesResponseVo(data={}).model_dump_json().encode().rsplit(b"{}", 1)
+)
+_NO_PRICES_RESPONSE = PricesResponseVo(message="No orders found").model_dump_json()
+
+
+def build_catalog(price_docs: List[Dict]) -> Dict:
+    """
+    DB_CACHE slices of the price catalog.
+
+    Args:
+        price_docs (List[Dict]): Every price document, in sort_order
+
+    Returns:
+        Dict: "prices_by_id" of price id -> Prices and "location_service_prices"
+            of service location id -> service id -> Prices in sort order
+    """
+    prices_by_id: Dict[str, Prices] = {}
+    location_service_prices: Dict[str, Dict[str, List[Prices]]] = defaultdict(
+        lambda: defaultdict(list)
+    )
+    for price_doc in price_docs:
+        price = Prices(**price_doc)
+        prices_by_id[str(price.id)] = price
+        location_service_prices[str(price.service_location_id)][
+            str(price.service_id)
+        ].append(price)
+    return {
+        "prices_by_id": prices_by_id,
+        "location_service_prices": {
+            location: dict(service_prices)
+            for location, service_prices in location_service_prices.items()
+        },
+    }
+
+
+def serialize_location_prices(
+    location_service_prices: Dict[str, Dict[str, List[Prices]]],
+    id_to_service_map: Dict,
+) -> Dict:
+    """
+    Pre-serialize the prices each service location sends, rebuilt whenever
+    prices or services are reloaded.
+
+    Args:
+        location_service_prices (Dict[str, Dict[str, List[Prices]]]): Prices by
+            service location and service
+        id_to_service_map (Dict): Service id -> Service
+
+    Returns:
+        Dict: "location_prices_json" of service location id -> JSON of its
+            ServicePrices list, and "location_prices_digest" of their hashes
+    """
+    services: Dict[str, Service] = {
+        str(service_id): service for service_id, service in id_to_service_map.items()
+    }
+    location_prices_json: Dict[str, bytes] = {}
+    for location, service_prices in location_service_prices.items():
+        service_prices_list = [
+            ServicePrices(service=services[service_id], prices=prices)
+            for service_id, prices in service_prices.items()
+            if service_id in services
+        ]
+        service_prices_list.sort(key=lambda x: x.service.call_to_action_key or "")
+        location_prices_json[location] = _service_prices_list.dump_json(
+            service_prices_list, by_alias=True
+        )
+    return {
+        "location_prices_json": location_prices_json,
+        "location_prices_digest": {
+            location: hashlib.sha1(prices_json).hexdigest()
+            for location, prices_json in location_prices_json.items()
+        },
+    }
+
+
+def get_prices(price_ids: List[str]) -> Dict[str, Prices]:
+    """Prices of the given ids found in the catalog, by price id."""
+    prices_by_id: Dict[str, Prices] = config.DB_CACHE.get("prices_by_id", {})
+    return {
+        price_id: prices_by_id[price_id]
+        for price_id in price_ids
+        if price_id in prices_by_id
+    }
+
+
+def get_response_json(service_location_ids: List[str]) -> bytes:
+    """
+    PricesResponseVo JSON of the given service locations, joined from their
+    pre-serialized prices.
+
+    Args:
+        service_location_ids (List[str]): Service locations of the agent
+
+    Returns:
+        bytes: The response body
+    """
+    location_prices_json: Dict[str, bytes] = config.DB_CACHE.get(
+        "location_prices_json", {}
+    )
+    data = [
+        b'"%s":%s' % (location.encode(), location_prices_json[location])
+        for location in service_location_ids
+        if location in location_prices_json
+    ]
+    if not data:
+        return _NO_PRICES_RESPONSE.encode()
+    return _RESPONSE_PREFIX + b"{" + b",".join(data) + b"}" + _RESPONSE_SUFFIX
+
+
+def get_digests(service_location_ids: List[str]) -> List[str]:
+    """Hashes of the prices the given service locations send."""
+    location_prices_digest: Dict[str, str] = config.DB_CACHE.get(
+        "location_prices_digest", {}
+    )
+    return [
+        location_prices_digest.get(location, "") for location in service_location_ids
+    ]
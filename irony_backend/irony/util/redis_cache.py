@@ -1,19 +1,105 @@
-import redis
+from typing import Dict, List, Optional
 
-# Initialize your Redis client
-r = redis.Redis(host="redis", port=6379, db=0)
+from redis import asyncio as aioredis
 
+from irony.config.logger import logger
+from irony.config.redis.redis_config import RedisConfig
+from irony.util import metrics
+from irony.util.ttl_cache import TTLCache
 
-def add_message_id(message):
-    unique_id = None
+_redis: Optional[aioredis.Redis] = None
+
+# Meta retries a message within seconds, most duplicates are caught here
+# without a round trip to redis.
+_seen_message_ids: TTLCache[bool] = TTLCache(
+    RedisConfig.LOCAL_MESSAGE_ID_CACHE_SIZE, RedisConfig.MESSAGE_ID_TTL_SECONDS
+)
+
+
+def get_redis() -> aioredis.Redis:
+    """Return the shared async redis client backed by one connection pool."""
+    global _redis
+    if _redis is None:
+        _redis = aioredis.Redis(
+            connection_pool=aioredis.ConnectionPool(
+                host=RedisConfig.HOST,
+                port=RedisConfig.PORT,
+                db=RedisConfig.DB,
+                max_connections=RedisConfig.MAX_CONNECTIONS,
+                socket_timeout=RedisConfig.SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=RedisConfig.SOCKET_CONNECT_TIMEOUT_SECONDS,
+                decode_responses=True,
+            )
+        )
+    return _redis
+
+
+async def close():
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+def _get_message_id(message) -> str:
     if "id" not in message:
         raise Exception("Message id not found in message object.")
-    unique_id = message["id"]
-    return add_id(unique_id)
+    return message["id"]
+
+
+async def add_message_id(message) -> bool:
+    return (await add_message_ids([message]))[0]
+
+
+async def add_message_ids(messages: List[dict]) -> List[bool]:
+    """
+    Mark webhook messages as seen, deduping the whole batch in one redis round trip.
+
+    Args:
+        messages (List[dict]): Whatsapp message objects
+
+    Returns:
+        List[bool]: For each message, True if it was not seen before
+    """
+    results = [False] * len(messages)
+    to_check: Dict[str, int] = {}
+    for index, message in enumerate(messages):
+        unique_id = _get_message_id(message)
+        if unique_id in _seen_message_ids or unique_id in to_check:
+            metrics.increment("redis_cache.message_id_local_hit")
+            continue
+        to_check[unique_id] = index
+
+    if not to_check:
+        return results
+
+    try:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for unique_id in to_check:
+                pipe.set(
+                    name=unique_id,
+                    value=1,
+                    ex=RedisConfig.MESSAGE_ID_TTL_SECONDS,
+                    nx=True,
+                )
+            added = await pipe.execute()
+    except Exception as e:
+        # Fail open, a duplicate reply is better than dropping a user's message.
+        logger.error(f"Redis unavailable for message id dedupe: {e}")
+        added = [True] * len(to_check)
+
+    for (unique_id, index), was_added in zip(to_check.items(), added):
+        _seen_message_ids.set(unique_id, True)
+        results[index] = bool(was_added)
+    return results
 
 
-def add_id(unique_id):
+async def add_id(unique_id) -> bool:
     # Try to set the key with NX flag (only set if not exists)
-    # and set the expiration to 10 seconds.
+    # and set the expiration to MESSAGE_ID_TTL_SECONDS.
     # Will return True if the key was set successfully, if already exists will return False
-    return r.set(name=unique_id, value=1, ex=10, nx=True)
+    return bool(
+        await get_redis().set(
+            name=unique_id, value=1, ex=RedisConfig.MESSAGE_ID_TTL_SECONDS, nx=True
+        )
+    )
@@ -0,0 +1,14 @@
+from bson import ObjectId
+
+ORDERS = "orders"
+
+
+def field(kind: str, service_location_id) -> str:
+    """Field of the revision of one service location's orders."""
+    return f"{kind}:{service_location_id}"
+
+
+def new_generation() -> str:
+    # Random rather than counted, so a generation is never reused even when
+    # redis loses the hash.
+    return str(ObjectId())
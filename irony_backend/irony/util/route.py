@@ -1,55 +1,338 @@
 import asyncio
+import hashlib
+import json
+import time
+from collections import Counter, defaultdict, deque
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 import httpx
 from fastapi import HTTPException
 from irony.db import db
 from irony.models.order import Order
 from irony.config.logger import logger
 from irony.config import config
+from irony.config.route.route_config import RouteConfig
+from irony.util import http_client, metrics, redis_cache, route_solver
+from irony.util.ttl_cache import TTLCache
 
-async def get_optimized_route(coordinates: List[str]) -> Dict[Any, Any]:
-    """Get optimized route indices from OSRM service"""
-    try:
-        # Convert coordinates list to OSRM format
-        coords_string = ";".join(coordinates)
-        url = f"{config.OSRM_URL}/trip/v1/driving/{coords_string}"
-        
-        params = {
-            "roundtrip": "true",
-            "source": "first"
-        }
+OSRM = "osrm"
+LOCAL = "local"
+ENGINES = (OSRM, LOCAL)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=30.0)
+# A solved round trip: stops in visiting order, starting with the source, and
+# the distance/duration of each leg, leg i going from stops[i] to stops[i + 1]
+# and the last one back to stops[0]. "inserted" counts stops added by
+# insertion since /trip last solved it.
+Trip = Dict[str, Any]
 
-        
-        if response.status_code == 400:
-            data = response.json()
-            if data["code"] ==  "NoTrips":
-                logger.error(f"OSRM service error: {data['message']}")
-                raise HTTPException(status_code=400, detail="No route found")     
-        elif response.status_code != 200:
-            logger.error(f"OSRM service error: {response.text}")
-            raise HTTPException(status_code=500, detail="Route optimization service error")
+_trips: TTLCache[Trip] = TTLCache(
+    RouteConfig.TRIP_CACHE_SIZE, RouteConfig.TRIP_CACHE_TTL_SECONDS
+)
+# (from, to) coordinate strings -> (duration, distance)
+_pairs: TTLCache[Tuple[float, float]] = TTLCache(
+    RouteConfig.MATRIX_CACHE_SIZE, RouteConfig.MATRIX_CACHE_TTL_SECONDS
+)
+
+
+def _trip_key(coordinates: List[str], engine: str = OSRM) -> str:
+    # The source is fixed, the order of the other stops does not change the trip.
+    return f"{engine}:" + ";".join([coordinates[0]] + sorted(coordinates[1:]))
+
+
+def _redis_key(trip_key: str) -> str:
+    return RouteConfig.TRIP_KEY_PREFIX + hashlib.sha1(trip_key.encode()).hexdigest()
+
+
+async def _get_cached_trips(trip_keys: List[str]) -> Dict[str, Trip]:
+    found = {key: _trips.get(key) for key in trip_keys}
+    missing = [key for key, trip in found.items() if trip is None]
+    if missing and RouteConfig.SHARE_TRIPS_IN_REDIS:
+        try:
+            values = await redis_cache.get_redis().mget(
+                [_redis_key(key) for key in missing]
+            )
+            for key, value in zip(missing, values):
+                if value is not None:
+                    found[key] = json.loads(value)
+                    _trips.set(key, found[key])
+        except Exception as e:
+            logger.error(f"Unable to read cached trips from redis: {e}")
+    return {key: trip for key, trip in found.items() if trip is not None}
+
+
+async def _cache_trip(trip_key: str, trip: Trip):
+    _trips.set(trip_key, trip)
+    if not RouteConfig.SHARE_TRIPS_IN_REDIS:
+        return
+    try:
+        await redis_cache.get_redis().set(
+            _redis_key(trip_key),
+            json.dumps(trip),
+            ex=RouteConfig.TRIP_CACHE_TTL_SECONDS,
+        )
+    except Exception as e:
+        logger.error(f"Unable to cache trip in redis: {e}")
 
+
+def _raise_for_osrm_error(response: httpx.Response):
+    if response.status_code == 400:
         data = response.json()
-        # Extract waypoint indices in optimized order
-        route_legs = data.get("trips", [0])[0].get("legs", [])
-        distance_list = [leg.get("distance") for leg in route_legs]
-        
-        return {"waypoints": [waypoint["waypoint_index"] for waypoint in data.get("waypoints", [])], "distances": distance_list}
-   
+        if data["code"] == "NoTrips":
+            logger.error(f"OSRM service error: {data['message']}")
+            raise HTTPException(status_code=400, detail="No route found")
+    if response.status_code != 200:
+        logger.error(f"OSRM service error: {response.text}")
+        raise HTTPException(status_code=500, detail="Route optimization service error")
+
+
+async def _request_trip(coordinates: List[str]) -> Trip:
+    # Convert coordinates list to OSRM format
+    coords_string = ";".join(coordinates)
+    url = f"{config.OSRM_URL}/trip/v1/driving/{coords_string}"
+
+    params = {
+        "roundtrip": "true",
+        "source": "first"
+    }
+
+    start_time = time.perf_counter()
+    response = await http_client.get_client(http_client.OSRM).request(
+        "GET", url, params=params
+    )
+    metrics.latency("route.osrm_trip").record(time.perf_counter() - start_time)
+    _raise_for_osrm_error(response)
+
+    data = response.json()
+    stops: List[str] = [""] * len(coordinates)
+    for coordinate, waypoint in zip(coordinates, data.get("waypoints", [])):
+        stops[waypoint["waypoint_index"]] = coordinate
+    route_legs = data.get("trips", [0])[0].get("legs", [])
+    return {
+        "stops": stops,
+        "distances": [leg.get("distance") for leg in route_legs],
+        "durations": [leg.get("duration") for leg in route_legs],
+        "inserted": 0,
+    }
+
+
+async def _request_table(
+    coordinates: List[str], sources: List[int], destinations: List[int]
+):
+    url = f"{config.OSRM_URL}/table/v1/driving/{';'.join(coordinates)}"
+    params = {
+        "sources": ";".join(str(index) for index in sources),
+        "destinations": ";".join(str(index) for index in destinations),
+        "annotations": "duration,distance",
+    }
+    start_time = time.perf_counter()
+    response = await http_client.get_client(http_client.OSRM).request(
+        "GET", url, params=params
+    )
+    metrics.latency("route.osrm_table").record(time.perf_counter() - start_time)
+    _raise_for_osrm_error(response)
+
+    data = response.json()
+    for row, source in enumerate(sources):
+        for column, destination in enumerate(destinations):
+            _pairs.set(
+                (coordinates[source], coordinates[destination]),
+                (data["durations"][row][column], data["distances"][row][column]),
+            )
+
+
+async def get_costs_to_and_from(
+    stops: List[str], stop: str
+) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
+    """
+    (duration, distance) from every stop to `stop` and from `stop` to every stop.
+    Pairs are memoized, so a stop already measured against the others is free
+    and a new one costs one /table row and one column.
+    """
+    if any(
+        (other, stop) not in _pairs or (stop, other) not in _pairs for other in stops
+    ):
+        coordinates = stops + [stop]
+        new_index = len(stops)
+        others = list(range(len(stops)))
+        await asyncio.gather(
+            _request_table(coordinates, others, [new_index]),
+            _request_table(coordinates, [new_index], others),
+        )
+    return (
+        [_pairs.get((other, stop)) for other in stops],
+        [_pairs.get((stop, other)) for other in stops],
+    )
+
+
+async def _insert_stop(trip: Trip, stop: str) -> Trip:
+    stops = trip["stops"]
+    to_stop, from_stop = await get_costs_to_and_from(stops, stop)
+    if any(cost is None or cost[0] is None for cost in to_stop + from_stop):
+        raise HTTPException(status_code=400, detail="No route found")
+
+    # Cheapest insertion: the leg i -> i + 1 that grows the trip duration least.
+    best_leg = min(
+        range(len(stops)),
+        key=lambda leg: to_stop[leg][0]
+        + from_stop[(leg + 1) % len(stops)][0]
+        - trip["durations"][leg],
+    )
+    next_stop = (best_leg + 1) % len(stops)
+    return {
+        "stops": stops[: best_leg + 1] + [stop] + stops[best_leg + 1 :],
+        "distances": trip["distances"][:best_leg]
+        + [to_stop[best_leg][1], from_stop[next_stop][1]]
+        + trip["distances"][best_leg + 1 :],
+        "durations": trip["durations"][:best_leg]
+        + [to_stop[best_leg][0], from_stop[next_stop][0]]
+        + trip["durations"][best_leg + 1 :],
+        "inserted": trip.get("inserted", 0) + 1,
+    }
+
+
+async def _extend_cached_trip(coordinates: List[str]) -> Optional[Trip]:
+    # Look for the trip of this stop set minus any one stop, all in one lookup.
+    if len(coordinates) < 3:
+        return None
+    source, stops = coordinates[0], coordinates[1:]
+    candidates: Dict[str, str] = {}
+    for stop in set(stops):
+        remaining = list(stops)
+        remaining.remove(stop)
+        candidates[_trip_key([source] + remaining)] = stop
+    cached = await _get_cached_trips(list(candidates.keys()))
+    if not cached:
+        return None
+    trip_key, trip = next(iter(cached.items()))
+    if (
+        len(trip["stops"]) != len(trip["durations"])
+        or trip.get("inserted", 0) >= RouteConfig.MAX_INSERTED_STOPS
+    ):
+        return None
+    return await _insert_stop(trip, candidates[trip_key])
+
+
+def _to_route_data(trip: Trip, coordinates: List[str]) -> Dict[Any, Any]:
+    # Identical coordinates are interchangeable, hand their positions out in order.
+    positions: Dict[str, deque] = defaultdict(deque)
+    for position, stop in enumerate(trip["stops"]):
+        positions[stop].append(position)
+    return {
+        "waypoints": [positions[coordinate].popleft() for coordinate in coordinates],
+        "distances": trip["distances"],
+    }
+
+
+def _local_matrices(
+    coordinates: List[str],
+) -> Tuple[List[List[float]], List[List[float]]]:
+    # Cached /table durations when every pair is known, haversine otherwise.
+    pairs = [[_pairs.get((a, b)) for b in coordinates] for a in coordinates]
+    if all(
+        pair is not None and pair[0] is not None
+        for i, row in enumerate(pairs)
+        for j, pair in enumerate(row)
+        if i != j
+    ):
+        durations = [[pair[0] if pair else 0.0 for pair in row] for row in pairs]
+        distances = [[pair[1] if pair else 0.0 for pair in row] for row in pairs]
+        return durations, distances
+    points = []
+    for coordinate in coordinates:
+        x, y = coordinate.split(",")
+        points.append((float(x), float(y)))
+    distances = route_solver.haversine_matrix(points)
+    return distances, distances
+
+
+def _solve_trip_locally(coordinates: List[str]) -> Trip:
+    start_time = time.perf_counter()
+    costs, distances = _local_matrices(coordinates)
+    tour = route_solver.solve_trip(costs, RouteConfig.LOCAL_TIME_BUDGET_SECONDS)
+    legs = [(tour[k], tour[(k + 1) % len(tour)]) for k in range(len(tour))]
+    metrics.latency("route.local_solve").record(time.perf_counter() - start_time)
+    return {
+        "stops": [coordinates[stop] for stop in tour],
+        "distances": [distances[a][b] for a, b in legs],
+        "durations": [costs[a][b] for a, b in legs],
+        "inserted": 0,
+    }
+
+
+async def _get_osrm_trip(coordinates: List[str]) -> Trip:
+    trip_key = _trip_key(coordinates)
+    trip = (await _get_cached_trips([trip_key])).get(trip_key)
+    if trip is not None and Counter(trip["stops"]) == Counter(coordinates):
+        metrics.increment("route.trip_cache_hit")
+        return trip
+
+    trip = None
+    if RouteConfig.INSERT_INTO_CACHED_TRIP:
+        trip = await _extend_cached_trip(coordinates)
+        if trip is not None:
+            metrics.increment("route.trip_extended")
+    if trip is None:
+        trip = await _request_trip(coordinates)
+        metrics.increment("route.trip_requested")
+    await _cache_trip(trip_key, trip)
+    return trip
+
+
+async def _get_local_trip(coordinates: List[str]) -> Trip:
+    trip_key = _trip_key(coordinates, LOCAL)
+    trip = (await _get_cached_trips([trip_key])).get(trip_key)
+    if trip is None or Counter(trip["stops"]) != Counter(coordinates):
+        trip = _solve_trip_locally(coordinates)
+        await _cache_trip(trip_key, trip)
+    return trip
+
+
+async def get_optimized_route(
+    coordinates: List[str], engine: Optional[str] = None
+) -> Dict[Any, Any]:
+    """
+    Get optimized route indices from OSRM service or the in-process solver.
+    OSRM trips are cached by their stop set, and a stop set one stop larger
+    than a cached trip is solved by inserting that stop with the /table matrix
+    cache. When OSRM fails or misses its deadline the local solver answers.
+
+    Args:
+        coordinates (List[str]): "x,y" stops, the first one is the source
+        engine (str): OSRM or LOCAL, RouteConfig.ENGINE when not given
+    """
+    engine = engine or RouteConfig.ENGINE
+    if engine not in ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unknown route engine {engine}")
+    try:
+        if engine == OSRM:
+            try:
+                trip = await asyncio.wait_for(
+                    _get_osrm_trip(coordinates), RouteConfig.OSRM_DEADLINE_SECONDS
+                )
+                return _to_route_data(trip, coordinates)
+            except HTTPException as e:
+                if e.status_code < 500 or not RouteConfig.FALLBACK_TO_LOCAL:
+                    raise
+                logger.warning(f"OSRM failed, routing locally: {e.detail}")
+            except (httpx.RequestError, asyncio.TimeoutError) as e:
+                if not RouteConfig.FALLBACK_TO_LOCAL:
+                    raise
+                logger.warning(f"OSRM unavailable, routing locally: {e!r}")
+            metrics.increment("route.local_fallback")
+        return _to_route_data(await _get_local_trip(coordinates), coordinates)
+
     except HTTPException:
         raise
-    except httpx.RequestError as e:
-        logger.error(f"Error making request to OSRM service: {e}")
+    except (httpx.RequestError, asyncio.TimeoutError) as e:
+        logger.error(f"Error making request to OSRM service: {e!r}")
         raise HTTPException(status_code=503, detail="Route optimization service unavailable")
     except Exception as e:
         logger.error(f"Error in route optimization: {e}")
         raise HTTPException(status_code=500, detail="Route optimization failed")
 
-async def route_sort_orders(orders: List[Order]) -> List[Order]:
+async def route_sort_orders(
+    orders: List[Order], engine: Optional[str] = None
+) -> List[Order]:
     """
     Get optimized route and distances for orders
     Returns a dict containing:
@@ -67,7 +350,7 @@ async def route_sort_orders(orders: List[Order]) -> List[Order]:
             return orders
 
         # Get optimized route data
-        route_data = await get_optimized_route(coordinates)
+        route_data = await get_optimized_route(coordinates, engine)
         
         # Create new sorted list based on waypoint indices
         sorted_orders: List[Order] = [None] * len(orders)  # type: ignore
@@ -0,0 +1,113 @@
+import time
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Same radius as the service location index, distances come out in meters.
+EARTH_RADIUS_METERS = 6378100.0
+
+Matrix = Sequence[Sequence[float]]
+
+
+def haversine_matrix(points: List[Tuple[float, float]]) -> List[List[float]]:
+    """Pairwise great circle distances in meters between (longitude, latitude) points."""
+    radians = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    lon, lat = radians[:, 0], radians[:, 1]
+    sin_half_dlat = np.sin((lat[None, :] - lat[:, None]) / 2)
+    sin_half_dlon = np.sin((lon[None, :] - lon[:, None]) / 2)
+    haversine = (
+        sin_half_dlat**2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * sin_half_dlon**2
+    )
+    distances = 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(haversine, 1.0)))
+    return distances.tolist()
+
+
+def tour_cost(tour: List[int], cost: Matrix) -> float:
+    return sum(cost[tour[k]][tour[(k + 1) % len(tour)]] for k in range(len(tour)))
+
+
+def nearest_neighbour(cost: Matrix) -> List[int]:
+    """Round trip from stop 0, always moving on to the closest unvisited stop."""
+    unvisited = set(range(1, len(cost)))
+    tour = [0]
+    while unvisited:
+        last = tour[-1]
+        closest = min(unvisited, key=lambda stop: cost[last][stop])
+        unvisited.remove(closest)
+        tour.append(closest)
+    return tour
+
+
+def _two_opt_pass(tour: List[int], cost: Matrix, deadline: float) -> bool:
+    # Reverse tour[i + 1 .. j] when that shortens the trip. The cost of walking
+    # the reversed segment backwards is tracked too, so asymmetric matrices work.
+    n = len(tour)
+    for i in range(n - 2):
+        if time.perf_counter() > deadline:
+            return False
+        a, b = tour[i], tour[i + 1]
+        forward = reverse = 0.0
+        for j in range(i + 2, n):
+            forward += cost[tour[j - 1]][tour[j]]
+            reverse += cost[tour[j]][tour[j - 1]]
+            c, d = tour[j], tour[(j + 1) % n]
+            delta = (
+                cost[a][c] + cost[b][d] - cost[a][b] - cost[c][d] + reverse - forward
+            )
+            if delta < -1e-9:
+                tour[i + 1 : j + 1] = reversed(tour[i + 1 : j + 1])
+                return True
+    return False
+
+
+def _or_opt_pass(tour: List[int], cost: Matrix, deadline: float) -> bool:
+    # Move a run of 1 to 3 stops to a cheaper place, keeping its direction.
+    n = len(tour)
+    for length in (1, 2, 3):
+        for start in range(1, n - length + 1):
+            if time.perf_counter() > deadline:
+                return False
+            end = start + length - 1
+            before, after = tour[start - 1], tour[(end + 1) % n]
+            first, last = tour[start], tour[end]
+            removed_gain = (
+                cost[before][first] + cost[last][after] - cost[before][after]
+            )
+            rest = tour[:start] + tour[end + 1 :]
+            for position in range(len(rest)):
+                left, right = rest[position], rest[(position + 1) % len(rest)]
+                if left == before:
+                    continue
+                delta = (
+                    cost[left][first] + cost[last][right] - cost[left][right]
+                ) - removed_gain
+                if delta < -1e-9:
+                    tour[:] = (
+                        rest[: position + 1] + tour[start : end + 1] + rest[position + 1 :]
+                    )
+                    return True
+    return False
+
+
+def solve_trip(cost: Matrix, time_budget: float) -> List[int]:
+    """
+    Round trip starting and ending at stop 0: nearest neighbour construction
+    improved with 2-opt and Or-opt moves until none helps or the budget is spent.
+
+    Args:
+        cost (Matrix): cost[i][j] of going from stop i to stop j
+        time_budget (float): Seconds the improvement phase may take
+
+    Returns:
+        List[int]: Stop indexes in visiting order, starting with 0
+    """
+    deadline = time.perf_counter() + time_budget
+    tour = nearest_neighbour(cost)
+    if len(tour) < 4:
+        return tour
+    while time.perf_counter() <= deadline:
+        if _two_opt_pass(tour, cost, deadline):
+            continue
+        if not _or_opt_pass(tour, cost, deadline):
+            break
+    return tour
@@ -0,0 +1,394 @@
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from irony.config import config
+from irony.config.logger import logger
+from irony.config.matching.matching_config import MatchingConfig
+from irony.db import db
+from irony.models.pyobjectid import PyObjectId
+from irony.models.service_location import DeliveryTypeEnum, ServiceLocation
+from irony.models.timeslot_volume import TimeslotVolume
+from irony.util import metrics, pipelines
+
+# Radius MongoDB uses for spherical $geoNear on GeoJSON points.
+EARTH_RADIUS_METERS = 6378100.0
+
+
+def _haversine(lat, lon, cos_lat, other_lat, other_lon, other_cos_lat):
+    # Broadcasts, so it serves one point against many rows or a whole matrix.
+    sin_half_dlat = np.sin((other_lat - lat) / 2)
+    sin_half_dlon = np.sin((other_lon - lon) / 2)
+    haversine = sin_half_dlat**2 + cos_lat * other_cos_lat * sin_half_dlon**2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(haversine, 1.0)))
+
+
+def _bits(columns: Iterable[int], words: int) -> np.ndarray:
+    bits = np.zeros(words, dtype=np.uint64)
+    for column in columns:
+        bits[column // 64] |= np.uint64(1 << (column % 64))
+    return bits
+
+
+def _bitset(values: List[Optional[List]], columns: Dict) -> np.ndarray:
+    # One row of 64 bit words per location, bit n set when it has value n.
+    for row_values in values:
+        for value in row_values or []:
+            columns.setdefault(value, len(columns))
+    words = max(1, -(-len(columns) // 64))
+    bitset = np.zeros((len(values), words), dtype=np.uint64)
+    for row, row_values in enumerate(values):
+        bitset[row] = _bits((columns[value] for value in row_values or []), words)
+    return bitset
+
+
+class ServiceLocationIndex:
+    """Immutable index of active service locations for candidate lookups.
+
+    Locations are sorted by latitude, with coordinates as radians in NumPy
+    arrays and service_ids/time_slots as bitsets with one bit per distinct
+    value. A lookup binary searches the latitude band that can be
+    within the radius, masks it and runs one haversine over what is left.
+    Results match get_pipeline_nearby_service_locations.
+    """
+
+    def __init__(self, service_locations: Iterable[ServiceLocation]):
+        located = [
+            service_location
+            for service_location in service_locations
+            if service_location.is_active
+            and service_location.coords
+            and service_location.range is not None
+        ]
+        # GeoJSON order, x is the longitude, the same way $geoNear reads it.
+        located.sort(key=lambda location: location.coords.coordinates[1])
+        self.service_locations = tuple(located)
+        coordinates = np.array(
+            [service_location.coords.coordinates for service_location in located],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        self._lon = np.radians(coordinates[:, 0])
+        self._lat = np.radians(coordinates[:, 1])
+        self._cos_lat = np.cos(self._lat)
+        self._range = np.array(
+            [service_location.range for service_location in located], dtype=np.float64
+        )
+        self._service_columns: Dict[PyObjectId, int] = {}
+        self._services = _bitset(
+            [service_location.service_ids for service_location in located],
+            self._service_columns,
+        )
+        self._time_slot_columns: Dict[str, int] = {}
+        self._time_slots = _bitset(
+            [service_location.time_slots for service_location in located],
+            self._time_slot_columns,
+        )
+
+    def __len__(self) -> int:
+        return len(self.service_locations)
+
+    def _latitude_band(self, lat, max_distance: float):
+        # Nothing further than max_distance along a meridian can be within it.
+        delta = max_distance / EARTH_RADIUS_METERS
+        return (
+            np.searchsorted(self._lat, lat - delta, side="left"),
+            np.searchsorted(self._lat, lat + delta, side="right"),
+        )
+
+    def _required_bits(self, service_ids: List[PyObjectId], time_slot: str):
+        # Like $all, an empty list or an unknown service matches nothing.
+        if not service_ids or time_slot not in self._time_slot_columns:
+            return None
+        columns = [self._service_columns.get(service_id) for service_id in service_ids]
+        if None in columns:
+            return None
+        return (
+            _bits(columns, self._services.shape[1]),
+            _bits([self._time_slot_columns[time_slot]], self._time_slots.shape[1]),
+        )
+
+    def _has_all(self, rows, service_bits, time_slot_bits):
+        return ((self._services[rows] & service_bits) == service_bits).all(
+            axis=1
+        ) & (self._time_slots[rows] & time_slot_bits).any(axis=1)
+
+    def nearby(
+        self,
+        coordinates: List[float],
+        service_ids: List[PyObjectId],
+        time_slot: str,
+        max_distance: float,
+    ) -> List[ServiceLocation]:
+        """
+        Service locations within `max_distance` and their own range of `coordinates`
+        that serve all `service_ids` in `time_slot`.
+
+        Args:
+            coordinates (List[float]): GeoJSON point coordinates of the order
+            service_ids (List[PyObjectId]): Services the order needs
+            time_slot (str): Time slot key of the order
+            max_distance (float): Search radius in meters
+
+        Returns:
+            List[ServiceLocation]: Copies with distance set, nearest first
+        """
+        required = self._required_bits(service_ids, time_slot)
+        if required is None:
+            return []
+
+        lon = np.radians(coordinates[0])
+        lat = np.radians(coordinates[1])
+        low, high = self._latitude_band(lat, max_distance)
+        rows = low + np.flatnonzero(self._has_all(slice(low, high), *required))
+        if not rows.size:
+            return []
+
+        distances = _haversine(
+            lat, lon, np.cos(lat), self._lat[rows], self._lon[rows], self._cos_lat[rows]
+        )
+        within = (distances <= max_distance) & (distances <= self._range[rows])
+        return self._nearest_first(rows[within], distances[within])
+
+    def nearby_batch(
+        self,
+        coordinates: List[List[float]],
+        service_ids: List[List[PyObjectId]],
+        time_slots: List[str],
+        max_distance: float,
+    ) -> List[List[ServiceLocation]]:
+        """
+        `nearby` for many orders at once. The (order, location) pairs of every
+        order's latitude band are masked and measured together, BATCH_CHUNK_SIZE
+        orders at a time.
+
+        Args:
+            coordinates (List[List[float]]): GeoJSON point coordinates per order
+            service_ids (List[List[PyObjectId]]): Services each order needs
+            time_slots (List[str]): Time slot key per order
+            max_distance (float): Search radius in meters
+
+        Returns:
+            List[List[ServiceLocation]]: Candidates per order, in the given order
+        """
+        chunk_size = MatchingConfig.BATCH_CHUNK_SIZE
+        results: List[List[ServiceLocation]] = []
+        for start in range(0, len(coordinates), chunk_size):
+            end = start + chunk_size
+            results.extend(
+                self._nearby_chunk(
+                    coordinates[start:end],
+                    service_ids[start:end],
+                    time_slots[start:end],
+                    max_distance,
+                )
+            )
+        return results
+
+    def _nearby_chunk(
+        self,
+        coordinates: List[List[float]],
+        service_ids: List[List[PyObjectId]],
+        time_slots: List[str],
+        max_distance: float,
+    ) -> List[List[ServiceLocation]]:
+        orders = len(coordinates)
+        if not orders or not len(self):
+            return [[] for _ in range(orders)]
+
+        service_bits = np.zeros((orders, self._services.shape[1]), dtype=np.uint64)
+        time_slot_bits = np.zeros((orders, self._time_slots.shape[1]), dtype=np.uint64)
+        matchable = np.zeros(orders, dtype=bool)
+        for order, (order_service_ids, time_slot) in enumerate(
+            zip(service_ids, time_slots)
+        ):
+            required = self._required_bits(order_service_ids, time_slot)
+            if required is not None:
+                service_bits[order], time_slot_bits[order] = required
+                matchable[order] = True
+
+        points = np.radians(np.asarray(coordinates, dtype=np.float64).reshape(-1, 2))
+        lon, lat = points[:, 0], points[:, 1]
+        low, high = self._latitude_band(lat, max_distance)
+        counts = np.where(matchable, high - low, 0)
+
+        # Flatten every order's band into (order, location) pairs, ordered by order.
+        order_rows = np.repeat(np.arange(orders), counts)
+        band_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.repeat(low, counts) + np.arange(counts.sum()) - band_starts
+
+        keep = self._has_all(
+            rows, service_bits[order_rows], time_slot_bits[order_rows]
+        )
+        order_rows, rows = order_rows[keep], rows[keep]
+
+        distances = _haversine(
+            lat[order_rows],
+            lon[order_rows],
+            np.cos(lat)[order_rows],
+            self._lat[rows],
+            self._lon[rows],
+            self._cos_lat[rows],
+        )
+        within = (distances <= max_distance) & (distances <= self._range[rows])
+        order_rows, rows = order_rows[within], rows[within]
+        distances = distances[within]
+
+        bounds = np.searchsorted(order_rows, np.arange(orders + 1))
+        return [
+            self._nearest_first(
+                rows[bounds[order] : bounds[order + 1]],
+                distances[bounds[order] : bounds[order + 1]],
+            )
+            for order in range(orders)
+        ]
+
+    def _nearest_first(self, rows: np.ndarray, distances: np.ndarray):
+        nearest_first = np.argsort(distances, kind="stable")
+        return [
+            self.service_locations[row].model_copy(update={"distance": float(distance)})
+            for row, distance in zip(rows[nearest_first], distances[nearest_first])
+        ]
+
+
+def build_index(service_location_docs: List[Dict]) -> ServiceLocationIndex:
+    return ServiceLocationIndex(ServiceLocation(**doc) for doc in service_location_docs)
+
+
+def get_index() -> Optional[ServiceLocationIndex]:
+    return config.DB_CACHE.get("service_location_index")
+
+
+def group_by_delivery_type(
+    service_locations: List[ServiceLocation],
+) -> Dict[DeliveryTypeEnum, List[ServiceLocation]]:
+    grouped: Dict[DeliveryTypeEnum, List[ServiceLocation]] = {}
+    for service_location in service_locations:
+        if service_location.delivery_type:
+            grouped.setdefault(service_location.delivery_type, []).append(
+                service_location
+            )
+    return grouped
+
+
+async def _attach_timeslot_volumes(service_locations: List[ServiceLocation]):
+    # Quotas change on every allotment, so they are read fresh, and only for the
+    # locations check_limit_and_allot_order is called with. A batch holds one
+    # copy of a location per order it matched.
+    auto_accept: Dict[PyObjectId, List[ServiceLocation]] = {}
+    for service_location in service_locations:
+        if service_location.auto_accept:
+            service_location.timeslot_volumes = []
+            auto_accept.setdefault(service_location.id, []).append(service_location)
+    if not auto_accept:
+        return
+    async for timeslot_volume in db.timeslot_volume.find(
+        {"service_location_id": {"$in": list(auto_accept.keys())}}
+    ):
+        timeslot_volume = TimeslotVolume(**timeslot_volume)
+        for service_location in auto_accept[timeslot_volume.service_location_id]:
+            service_location.timeslot_volumes.append(timeslot_volume)
+
+
+async def find_nearby_from_db(
+    coordinates: List[float],
+    service_ids: List[PyObjectId],
+    time_slot: str,
+    max_distance: float,
+) -> Dict[DeliveryTypeEnum, List[ServiceLocation]]:
+    pipeline = pipelines.get_pipeline_nearby_service_locations(
+        coordinates, service_ids, time_slot, max_distance
+    )
+    grouped: Dict[DeliveryTypeEnum, List[ServiceLocation]] = {}
+    async for group in db.service_locations.aggregate(pipeline):
+        if group["_id"] and group["documents"]:
+            grouped[DeliveryTypeEnum(group["_id"])] = [
+                ServiceLocation(**doc) for doc in group["documents"]
+            ]
+    return grouped
+
+
+async def find_nearby(
+    coordinates: List[float],
+    service_ids: List[PyObjectId],
+    time_slot: str,
+    max_distance: float,
+) -> Dict[DeliveryTypeEnum, List[ServiceLocation]]:
+    """
+    Candidate service locations for an order, grouped by delivery type and
+    nearest first. Answered from the in-memory index when it is loaded,
+    otherwise by the $geoNear pipeline.
+
+    Args:
+        coordinates (List[float]): GeoJSON point coordinates of the order
+        service_ids (List[PyObjectId]): Services the order needs
+        time_slot (str): Time slot key of the order
+        max_distance (float): Search radius in meters
+
+    Returns:
+        Dict[DeliveryTypeEnum, List[ServiceLocation]]: Candidates per delivery type
+    """
+    index = get_index() if MatchingConfig.USE_SERVICE_LOCATION_INDEX else None
+    if index is None:
+        metrics.increment("service_location_index.fallback")
+        return await find_nearby_from_db(
+            coordinates, service_ids, time_slot, max_distance
+        )
+
+    start_time = time.perf_counter()
+    service_locations = index.nearby(coordinates, service_ids, time_slot, max_distance)
+    metrics.latency("service_location_index.lookup").record(
+        time.perf_counter() - start_time
+    )
+    await _attach_timeslot_volumes(service_locations)
+    logger.debug(
+        f"Service location index matched {len(service_locations)} of {len(index)} locations"
+    )
+    return group_by_delivery_type(service_locations)
+
+
+async def find_nearby_batch(
+    coordinates: List[List[float]],
+    service_ids: List[List[PyObjectId]],
+    time_slots: List[str],
+    max_distance: float,
+) -> List[Dict[DeliveryTypeEnum, List[ServiceLocation]]]:
+    """
+    find_nearby for a batch of orders, matched in one vectorized pass with a
+    single timeslot_volume query. Falls back to one pipeline per order.
+
+    Args:
+        coordinates (List[List[float]]): GeoJSON point coordinates per order
+        service_ids (List[List[PyObjectId]]): Services each order needs
+        time_slots (List[str]): Time slot key per order
+        max_distance (float): Search radius in meters
+
+    Returns:
+        List[Dict[DeliveryTypeEnum, List[ServiceLocation]]]: Candidates per order
+    """
+    index = get_index() if MatchingConfig.USE_SERVICE_LOCATION_INDEX else None
+    if index is None:
+        metrics.increment("service_location_index.fallback", len(coordinates))
+        return list(
+            await asyncio.gather(
+                *(
+                    find_nearby_from_db(
+                        order_coordinates, order_service_ids, time_slot, max_distance
+                    )
+                    for order_coordinates, order_service_ids, time_slot in zip(
+                        coordinates, service_ids, time_slots
+                    )
+                )
+            )
+        )
+
+    start_time = time.perf_counter()
+    matches = index.nearby_batch(coordinates, service_ids, time_slots, max_distance)
+    metrics.latency("service_location_index.batch_lookup").record(
+        time.perf_counter() - start_time
+    )
+    await _attach_timeslot_volumes(
+        [service_location for match in matches for service_location in match]
+    )
+    return [group_by_delivery_type(match) for match in matches]
@@ -0,0 +1,55 @@
+from typing import AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+# Comment line keeping an idle event stream open.
+SSE_HEARTBEAT = ": heartbeat\n\n"
+
+# Stops proxies from holding streamed lines back until the response ends.
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def _ndjson_lines(items: AsyncIterator[BaseModel]) -> AsyncIterator[str]:
+    async for item in items:
+        yield item.model_dump_json(by_alias=True) + "\n"
+
+
+def ndjson_response(items: AsyncIterator[BaseModel]) -> StreamingResponse:
+    """
+    Response sending each item as one line of JSON as soon as it is produced.
+
+    Args:
+        items (AsyncIterator[BaseModel]): Items to send, in order
+
+    Returns:
+        StreamingResponse: application/x-ndjson response
+    """
+    return StreamingResponse(
+        _ndjson_lines(items),
+        media_type="application/x-ndjson",
+        headers=STREAM_HEADERS,
+    )
+
+
+def sse_message(data: str, event: Optional[str] = None) -> str:
+    """Format one server-sent event, `data` must be a single line."""
+    if event:
+        return f"event: {event}\ndata: {data}\n\n"
+    return f"data: {data}\n\n"
+
+
+def sse_response(messages: AsyncIterator[str]) -> StreamingResponse:
+    """
+    Response sending server-sent events as they are produced.
+
+    Args:
+        messages (AsyncIterator[str]): Events formatted with sse_message, or
+            SSE_HEARTBEAT
+
+    Returns:
+        StreamingResponse: text/event-stream response
+    """
+    return StreamingResponse(
+        messages, media_type="text/event-stream", headers=STREAM_HEADERS
+    )
@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[V]):
+    """Process-local LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Optional[V]:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def add(self, key: Hashable, value: V) -> bool:
+        """Set `key` only if it is absent. Returns True when it was added."""
+        if key in self:
+            return False
+        self.set(key, value)
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Optional[V]:
+        entry = self._data.pop(key, _MISSING)
+        if entry is _MISSING or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -4,13 +4,6 @@ from irony.config import config
 from irony.models.location import Location, UserLocation
 
 
-def replace_message_keys_with_values(message_body, replacements):
-    message_body["interactive"]["body"]["text"] = replace_keys_with_values(
-        message_body["interactive"]["body"]["text"], replacements
-    )
-    return message_body
-
-
 def replace_keys_with_values(input_string, replacements):
     for key, value in replacements.items():
         input_string = input_string.replace(key, value)
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from irony.config.logger import logger
+from irony.config.whatsapp.webhook_config import WebhookConfig
+from irony.lease_lock import OWNER_ID
+from irony.models.whatsapp.contact_details import ContactDetails
+from irony.util import metrics, redis_cache
+from irony.util.keyed_executor import KeyedExecutor
+
+Handler = Callable[[Dict[str, Any], ContactDetails], Awaitable[Any]]
+
+# Messages wait in one redis list per wa_id, drained by whichever worker holds
+# that wa_id's claim, so one user's messages run in arrival order across every
+# worker and host. Pending lists the wa_ids with queued messages for the sweep.
+
+# Queues the message and claims the wa_id when no worker drains it yet.
+# Returns 1 when the caller must drain.
+PUSH_SCRIPT = """
+redis.call('RPUSH', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[3], 'NX', ARGV[4], ARGV[5])
+if redis.call('SET', KEYS[2], ARGV[2], 'NX', 'PX', ARGV[3]) then
+    return 1
+end
+return 0
+"""
+
+# Claims a wa_id left with queued messages, after its drainer went away.
+CLAIM_SCRIPT = """
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('ZREM', KEYS[3], ARGV[3])
+    return 0
+end
+if redis.call('SET', KEYS[2], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+return 0
+"""
+
+# Pops the next message while the claim is ours, extending it. Drops the claim
+# once the queue is empty, in the same step, so no message is left undrained.
+NEXT_SCRIPT = """
+if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+    return false
+end
+local message = redis.call('LPOP', KEYS[1])
+if message then
+    redis.call('PEXPIRE', KEYS[2], ARGV[2])
+    return message
+end
+redis.call('DEL', KEYS[2])
+redis.call('ZREM', KEYS[3], ARGV[3])
+return false
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_executor: Optional[KeyedExecutor] = None
+_handler: Optional[Handler] = None
+_sweeper: Optional[asyncio.Task] = None
+
+
+def _keys(wa_id: str):
+    prefix = WebhookConfig.KEY_PREFIX
+    return [
+        f"{prefix}:messages:{wa_id}",
+        f"{prefix}:claim:{wa_id}",
+        f"{prefix}:pending",
+    ]
+
+
+def _claim_ttl_ms() -> int:
+    return int(WebhookConfig.CLAIM_TTL_SECONDS * 1000)
+
+
+def start(handler: Handler):
+    global _executor, _handler, _sweeper
+    _handler = handler
+    _executor = KeyedExecutor(
+        "webhook", WebhookConfig.MAX_CONCURRENCY, WebhookConfig.MAX_QUEUE_SIZE
+    )
+    _sweeper = asyncio.create_task(_sweep())
+    mode = "async" if WebhookConfig.ASYNC_PROCESSING else "inline"
+    logger.info(
+        f"Webhook executor started in {mode} mode with concurrency {WebhookConfig.MAX_CONCURRENCY}"
+    )
+
+
+async def stop():
+    global _executor, _handler, _sweeper
+    if _sweeper is not None:
+        _sweeper.cancel()
+        await asyncio.gather(_sweeper, return_exceptions=True)
+        _sweeper = None
+    if _executor is not None:
+        await _executor.stop(WebhookConfig.DRAIN_TIMEOUT_SECONDS)
+        _executor = None
+        _handler = None
+    logger.info("Webhook executor stopped")
+
+
+def is_running() -> bool:
+    return _executor is not None
+
+
+async def _handle(handler: Handler, item: Dict[str, Any]):
+    await handler(item["message"], ContactDetails(**item["contact_details"]))
+    metrics.latency("webhook.enqueue_to_handled").record(
+        time.time() - item["enqueued_at"]
+    )
+
+
+async def _drain(wa_id: str):
+    handler = _handler
+    if handler is None:
+        return
+    script = redis_cache.get_redis().register_script(NEXT_SCRIPT)
+    keys = _keys(wa_id)
+    try:
+        while True:
+            raw = await script(keys=keys, args=[OWNER_ID, _claim_ttl_ms(), wa_id])
+            if raw is None:
+                return
+            try:
+                await _handle(handler, json.loads(raw))
+            except Exception as e:
+                metrics.increment("webhook.failed")
+                logger.error(f"Error handling message of {wa_id}: {e}", exc_info=True)
+    except BaseException:
+        # Cancelled or redis failed, let another worker take over right away.
+        try:
+            await redis_cache.get_redis().register_script(RELEASE_SCRIPT)(
+                keys=[keys[1]], args=[OWNER_ID]
+            )
+        except Exception as e:
+            logger.error(f"Unable to release webhook claim of {wa_id}: {e}")
+        raise
+
+
+async def _run_in_lane(wa_id: str, job):
+    assert _executor is not None
+    if WebhookConfig.ASYNC_PROCESSING:
+        try:
+            _executor.submit(wa_id, job)
+            return
+        except asyncio.QueueFull:
+            metrics.increment("webhook.queue_full")
+    await _executor.run(wa_id, job)
+
+
+async def dispatch(message: Dict[str, Any], contact_details: ContactDetails):
+    """
+    Queue `message` behind the sender's earlier messages and drain them here
+    if no worker is doing so already.
+
+    In async mode this only enqueues the message. In inline mode, or when the
+    executor is full, a draining worker waits for the queued messages to be
+    handled so the webhook response applies back pressure to Meta.
+
+    Args:
+        message (Dict[str, Any]): Whatsapp message object
+        contact_details (ContactDetails): Sender of the message
+    """
+    if _executor is None or _handler is None:
+        raise Exception("Webhook executor is not running.")
+
+    wa_id = contact_details.wa_id
+    item = {
+        "message": message,
+        "contact_details": contact_details.model_dump(),
+        "enqueued_at": time.time(),
+    }
+    try:
+        claimed = await redis_cache.get_redis().register_script(PUSH_SCRIPT)(
+            keys=_keys(wa_id),
+            args=[json.dumps(item), OWNER_ID, _claim_ttl_ms(), time.time(), wa_id],
+        )
+    except Exception as e:
+        # Still ordered within this worker, as before queues moved to redis.
+        logger.error(f"Unable to queue message of {wa_id}, handling it here: {e}")
+        metrics.increment("webhook.redis_failed")
+        handler = _handler
+        await _run_in_lane(wa_id, lambda: _handle(handler, item))
+        return
+
+    metrics.increment("webhook.enqueued")
+    if claimed:
+        await _run_in_lane(wa_id, lambda: _drain(wa_id))
+
+
+async def _sweep():
+    # Picks up wa_ids whose drainer died before emptying their queue.
+    while True:
+        await asyncio.sleep(WebhookConfig.SWEEP_INTERVAL_SECONDS)
+        try:
+            _redis = redis_cache.get_redis()
+            pending_key = _keys("")[2]
+            wa_ids = await _redis.zrangebyscore(
+                pending_key,
+                "-inf",
+                time.time() - WebhookConfig.CLAIM_TTL_SECONDS,
+                start=0,
+                num=100,
+            )
+            claim = _redis.register_script(CLAIM_SCRIPT)
+            for wa_id in wa_ids:
+                claimed = await claim(
+                    keys=_keys(wa_id), args=[OWNER_ID, _claim_ttl_ms(), wa_id]
+                )
+                if claimed:
+                    metrics.increment("webhook.swept")
+                    await _run_in_lane(wa_id, lambda wa_id=wa_id: _drain(wa_id))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Webhook sweep failed: {e}")
@@ -1,6 +1,5 @@
 from datetime import datetime
-import random
-from typing import Dict
+from typing import Dict, List, Tuple
 
 from irony.db import db
 from irony.config import config
@@ -9,9 +8,10 @@ from irony.exception.WhatsappException import WhatsappException
 from irony.models.order_status_enum import OrderStatusEnum
 from irony.models.whatsapp.contact_details import ContactDetails
 from irony.models.location import Location, UserLocation
-from irony.models.message import MessageConfig, MessageType
+from irony.models.message import MessageType
 from irony.models.order_status import OrderStatus
 from irony.util.message import Message
+from irony.util.message_template import MessageTemplate
 
 sample_interactive = {
     "messaging_product": "whatsapp",
@@ -22,20 +22,6 @@ sample_interactive = {
 }
 
 
-def get_random_one_from_messages(message_doc: MessageConfig):
-    if message_doc.message_options is None:
-        logger.error(
-            "Developer concern, No message options for message_doc with _id : %s, message_key: %s",
-            message_doc.id,
-            message_doc.message_key,
-        )
-        raise WhatsappException(config.DEFAULT_ERROR_REPLY_MESSAGE)
-
-    return message_doc.message_options[
-        random.randint(0, len(message_doc.message_options) - 1)
-    ]
-
-
 def get_contact_details_dict(value) -> dict[str, ContactDetails]:
     contact_list = value.get("contacts", [])
     contact_details_dict: Dict[str, ContactDetails] = {}
@@ -52,6 +38,39 @@ def get_contact_details_dict(value) -> dict[str, ContactDetails]:
     return contact_details_dict
 
 
+def get_messages_from_payload(payload) -> List[Tuple[dict, ContactDetails]]:
+    """
+    Collect every message of every entry and change in a webhook payload.
+
+    Args:
+        payload (dict): Webhook payload sent by Meta
+
+    Returns:
+        List[Tuple[dict, ContactDetails]]: Messages with the contact who sent them
+
+    Raises:
+        ValueError: If the payload is not a whatsapp webhook payload
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("entry", []), list):
+        raise ValueError("Invalid whatsapp webhook payload.")
+
+    messages: List[Tuple[dict, ContactDetails]] = []
+    for entry in payload.get("entry", []):
+        for change in entry.get("changes", []):
+            value = change.get("value", {})
+            contacts_details_dict = get_contact_details_dict(value)
+            for message in value.get("messages", []):
+                if "id" not in message or "from" not in message:
+                    logger.error(f"Skipping message without id or sender : {message}")
+                    continue
+                contact_details = contacts_details_dict.get(message["from"], None)
+                if contact_details is None:
+                    logger.error(f"Skipping message without contact details : {message}")
+                    continue
+                messages.append((message, contact_details))
+    return messages
+
+
 async def send_error_reply_message(
     contact_details: ContactDetails, error: WhatsappException
 ):
@@ -103,41 +122,24 @@ async def get_new_order_status(order_id, status: OrderStatusEnum):
     )
 
 
-def get_reply_message(message_key, message_type="interactive", message_sub_type=""):
-    message_doc: MessageConfig = config.DB_CACHE["message_config"][message_key]
-    message_body = message_doc.message
-    message_text: str = get_random_one_from_messages(message_doc)
-    if message_type == "text":
-        message_body["text"]["body"] = message_text
-    elif message_type == "interactive":
-        message_body["interactive"]["body"]["text"] = message_text
-        if message_sub_type == "reply":
-            call_to_actions = [
-                {
-                    "type": "reply",
-                    "reply": config.DB_CACHE["call_to_action"][key],
-                }
-                for key in message_doc.call_to_action
-            ]
-            message_body["interactive"]["action"]["buttons"] = call_to_actions
-        elif message_sub_type == "radio":
-            call_to_actions = [
-                config.DB_CACHE["call_to_action"][key]
-                for key in message_doc.call_to_action
-            ]
-            message_body["interactive"]["action"]["sections"][0][
-                "rows"
-            ] = call_to_actions
-    # logger.info("message body bitch : ", message_body)
-    # logger.info(message_body)
-    return message_body
+def get_message_template(message_key) -> MessageTemplate:
+    return config.DB_CACHE["message_templates"][message_key]
+
+
+def get_reply_message(
+    message_key,
+    message_type="interactive",
+    message_sub_type="",
+    replacements=None,
+    button_id_suffix=None,
+):
+    return get_message_template(message_key).render(
+        message_type, message_sub_type, replacements, button_id_suffix
+    )
 
 
 def get_free_text_message(text):
-    message_doc: MessageConfig = config.DB_CACHE["message_config"]["free_text"]
-    message_body = message_doc.message
-    message_body["text"]["body"] = text
-    return message_body
+    return get_message_template("free_text").render(message_type="text", text=text)
 
 
 async def verify_context_id(contact_details, context):
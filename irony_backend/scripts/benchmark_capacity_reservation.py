@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import sys
+import time
+
+from irony.db import db
+from irony.util import capacity_reservation
+from irony.util.metrics import LatencyStats
+
+BENCHMARK_COLLECTION = "timeslot_volume_benchmark"
+TIME_SLOT = "TIME_SLOT_ID_1"
+SERVICE = "SERVICE_ID_1"
+
+
+# Fires `requests` concurrent reservations of `count` clothes against one
+# timeslot_volume and checks the quota was filled exactly, never oversold.
+async def benchmark(requests: int, limit: int, count: int, concurrency: int):
+    collection = db[BENCHMARK_COLLECTION]
+    await collection.drop()
+    inserted = await collection.insert_one(
+        {
+            "current_clothes": 0,
+            "timeslot_distributions": {TIME_SLOT: {"current": 0, "limit": limit}},
+            "services_distribution": {SERVICE: {"current": 0, "limit": limit}},
+        }
+    )
+
+    stats = LatencyStats(max_samples=requests)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def reserve() -> bool:
+        async with semaphore:
+            start = time.perf_counter()
+            reserved = await capacity_reservation.reserve_capacity(
+                inserted.inserted_id, TIME_SLOT, SERVICE, count, collection=collection
+            )
+            stats.record(time.perf_counter() - start)
+            return reserved
+
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(reserve() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+        document = await collection.find_one({"_id": inserted.inserted_id})
+        successes = sum(results)
+        expected = min(requests, limit // count)
+        timeslot_current = document["timeslot_distributions"][TIME_SLOT]["current"]
+        service_current = document["services_distribution"][SERVICE]["current"]
+
+        print(f"requests: {requests}, concurrency: {concurrency}")
+        print(f"reserved: {successes}, expected: {expected}")
+        print(
+            f"timeslot current: {timeslot_current}, service current: {service_current}, limit: {limit}"
+        )
+        print(f"throughput: {requests / elapsed:.1f} reservations/s")
+        print(f"latency: {stats.snapshot()}")
+
+        if (
+            successes != expected
+            or timeslot_current != expected * count
+            or service_current != expected * count
+            or document["current_clothes"] != expected * count
+        ):
+            print("Capacity was oversold or left unused")
+            sys.exit(1)
+    finally:
+        await collection.drop()
+
+
+parser = argparse.ArgumentParser(
+    description="Benchmark concurrent capacity reservations against one quota"
+)
+parser.add_argument("--requests", type=int, default=2000)
+parser.add_argument("--limit", type=int, default=500)
+parser.add_argument("--count", type=int, default=3)
+parser.add_argument("--concurrency", type=int, default=200)
+args = parser.parse_args()
+
+asyncio.run(benchmark(args.requests, args.limit, args.count, args.concurrency))
@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import random
+import time
+
+from bson import ObjectId
+
+from irony import cache
+from irony.db import db
+from irony.models.location import Location
+from irony.models.order_request import OrderRequest
+from irony.models.service_location import DeliveryTypeEnum, ServiceLocation
+from irony.util import service_location_index
+from irony.util.service_location_index import ServiceLocationIndex
+
+BENCHMARK_COLLECTION = "order_request_benchmark"
+TIME_SLOTS = ["TIME_SLOT_ID_1", "TIME_SLOT_ID_2", "TIME_SLOT_ID_3", "TIME_SLOT_ID_4"]
+# Roughly the area the seeded service locations cover.
+CENTER = (78.33, 17.44)
+SPREAD_DEGREES = 0.1
+
+
+def _random_point(center=CENTER, spread=SPREAD_DEGREES):
+    return [
+        center[0] + random.uniform(-spread, spread),
+        center[1] + random.uniform(-spread, spread),
+    ]
+
+
+def _synthetic_index(locations: int) -> ServiceLocationIndex:
+    service_ids = [ObjectId() for _ in range(4)]
+    return ServiceLocationIndex(
+        ServiceLocation(
+            _id=ObjectId(),
+            coords=Location(coordinates=_random_point()),
+            range=random.uniform(1000, 3000),
+            is_active=True,
+            service_ids=random.sample(service_ids, k=len(service_ids) - 1),
+            time_slots=random.sample(TIME_SLOTS, k=3),
+            delivery_type=random.choice(list(DeliveryTypeEnum)),
+        )
+        for _ in range(locations)
+    )
+
+
+def _random_orders(index: ServiceLocationIndex, batch_size: int):
+    # Orders are placed around existing locations and ask for what they serve,
+    # so most of them find candidates.
+    coordinates, service_ids, time_slots = [], [], []
+    for _ in range(batch_size):
+        origin = random.choice(index.service_locations)
+        coordinates.append(_random_point(origin.coords.coordinates, 0.02))
+        service_ids.append(random.sample(origin.service_ids or [], k=1))
+        time_slots.append(random.choice(origin.time_slots or [""]))
+    return coordinates, service_ids, time_slots
+
+
+def _order_request_documents(grouped_candidates):
+    return [
+        OrderRequest(
+            order_id=ObjectId(),
+            service_location_id=service_location.id,
+            distance=service_location.distance,
+            is_pending=True,
+            try_count=0,
+        ).model_dump(exclude_defaults=True)
+        for service_location in grouped_candidates.get(DeliveryTypeEnum.SELF_PICKUP, [])
+    ]
+
+
+def _time_matching(index, batch_size: int, rounds: int, max_distance: float):
+    coordinates, service_ids, time_slots = _random_orders(index, batch_size)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for order in range(batch_size):
+            index.nearby(
+                coordinates[order], service_ids[order], time_slots[order], max_distance
+            )
+    per_order = (time.perf_counter() - start) / rounds / batch_size
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        matches = index.nearby_batch(coordinates, service_ids, time_slots, max_distance)
+    batched = (time.perf_counter() - start) / rounds / batch_size
+
+    candidates = sum(len(match) for match in matches) / batch_size
+    print(
+        f"batch {batch_size:>4}: index per order {per_order * 1e6:8.1f}us, "
+        f"index batched {batched * 1e6:8.1f}us, {candidates:.1f} candidates per order"
+    )
+
+
+async def _time_round_trips(index, batch_size: int, max_distance: float):
+    # What create_order_requests did per order before batching: one $geoNear
+    # pipeline and one insert each, against one vectorized pass and one insert.
+    coordinates, service_ids, time_slots = _random_orders(index, batch_size)
+    collection = db[BENCHMARK_COLLECTION]
+
+    start = time.perf_counter()
+    for order in range(batch_size):
+        grouped = await service_location_index.find_nearby_from_db(
+            coordinates[order], service_ids[order], time_slots[order], max_distance
+        )
+        documents = _order_request_documents(grouped)
+        if documents:
+            await collection.insert_many(documents)
+    per_order = (time.perf_counter() - start) / batch_size
+
+    start = time.perf_counter()
+    matches = index.nearby_batch(coordinates, service_ids, time_slots, max_distance)
+    documents = [
+        document
+        for match in matches
+        for document in _order_request_documents(
+            service_location_index.group_by_delivery_type(match)
+        )
+    ]
+    if documents:
+        await collection.insert_many(documents)
+    batched = (time.perf_counter() - start) / batch_size
+
+    print(
+        f"{'':>10}  pipeline + insert per order {per_order * 1e3:8.3f}ms, "
+        f"batched with one insert {batched * 1e3:8.3f}ms"
+    )
+
+
+async def benchmark(
+    locations: int, batch_sizes, rounds: int, max_distance: float, mongo: bool
+):
+    if mongo:
+        index = (await cache.load_service_locations())["service_location_index"]
+        if not len(index):
+            print("No active service locations to benchmark against")
+            return
+    else:
+        index = _synthetic_index(locations)
+
+    print(f"{len(index)} service locations, {rounds} rounds per batch size")
+    try:
+        for batch_size in batch_sizes:
+            _time_matching(index, batch_size, rounds, max_distance)
+            if mongo:
+                await _time_round_trips(index, batch_size, max_distance)
+    finally:
+        if mongo:
+            await db[BENCHMARK_COLLECTION].drop()
+
+
+# Per-order cost of matching due orders one at a time versus as one batch. With
+# --mongo the index is loaded from the database and the Mongo round trips the
+# batch saves are timed as well.
+parser = argparse.ArgumentParser(
+    description="Benchmark per-order versus batched order matching"
+)
+parser.add_argument("--locations", type=int, default=2000)
+parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 50, 500])
+parser.add_argument("--rounds", type=int, default=20)
+parser.add_argument("--max-distance", type=float, default=2000)
+parser.add_argument(
+    "--mongo", action="store_true", help="use the real service_locations collection"
+)
+args = parser.parse_args()
+
+asyncio.run(
+    benchmark(
+        args.locations, args.batch_sizes, args.rounds, args.max_distance, args.mongo
+    )
+)
@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+
+from irony.db import db
+from irony.models.order_status_enum import OrderStatusEnum
+from irony.models.order_summary_vo import OrderSummaryVo
+from irony.models.order_vo import OrderVo
+from irony.models.service_agent.vo.fetch_orders_response import FetchOrdersResponse
+from irony.services.agent.order import fetch_orders_service
+from irony.util import pipelines
+from irony.util.metrics import LatencyStats
+
+BENCHMARK_COLLECTION = "order_summary_benchmark"
+TIME_SLOTS = ["TIME_SLOT_ID_1", "TIME_SLOT_ID_2", "TIME_SLOT_ID_3", "TIME_SLOT_ID_4"]
+STATUSES = [
+    OrderStatusEnum.PICKUP_PENDING,
+    OrderStatusEnum.WORK_IN_PROGRESS,
+    OrderStatusEnum.DELIVERY_PENDING,
+]
+HISTORY = [
+    OrderStatusEnum.SERVICE_PENDING,
+    OrderStatusEnum.LOCATION_PENDING,
+    OrderStatusEnum.TIME_SLOT_PENDING,
+    OrderStatusEnum.FINDING_IRONMAN,
+]
+
+
+def _random_order(service_location_id: ObjectId) -> dict:
+    # Shaped like orders placed over whatsapp and picked up: a status history,
+    # a few items, the services and the user's saved location.
+    now = datetime.now().replace(microsecond=0)
+    date = (now + timedelta(days=random.randint(-3, 3))).replace(
+        hour=0, minute=0, second=0
+    )
+    start = date + timedelta(hours=random.randint(7, 20))
+    history = HISTORY + [random.choice(STATUSES)]
+    return {
+        "_id": ObjectId(),
+        "simple_id": f"{random.randint(0, 10**6):06d}",
+        "user_id": ObjectId(),
+        "user_wa_id": f"91{random.randint(10**9, 10**10 - 1)}",
+        "service_location_id": service_location_id,
+        "count_range": "CLOTHES_COUNT_1",
+        "time_slot": random.choice(TIME_SLOTS),
+        "total_price": 240.0,
+        "total_count": 12,
+        "is_active": True,
+        "auto_alloted": True,
+        "notes": "Please call before coming, the gate is locked after 9",
+        "created_on": now,
+        "updated_on": now,
+        "trigger_order_request_at": now,
+        "pickup_date_time": {"date": date, "start": start, "end": start},
+        "location": {
+            "_id": ObjectId(),
+            "user": "user",
+            "nickname": "Home",
+            "address": "Flat 402, Block B, Green Meadows Apartments, Gachibowli, Hyderabad",
+            "location": {
+                "type": "Point",
+                "coordinates": [
+                    78.33 + random.uniform(-0.05, 0.05),
+                    17.44 + random.uniform(-0.05, 0.05),
+                ],
+            },
+            "url": "https://www.google.com/maps/search/?api=1&query=17.44,78.33",
+            "created_on": now,
+            "last_used": now,
+        },
+        "services": [
+            {
+                "_id": ObjectId(),
+                "service_category": "LAUNDRY",
+                "service_type": "IRON",
+                "service_name": "Ironing",
+                "call_to_action_key": "SERVICE_ID_1",
+            }
+        ],
+        "order_items": [
+            {"price_id": str(ObjectId()), "count": 4, "amount": 80.0}
+            for _ in range(3)
+        ],
+        "order_status": [
+            {"status": status, "created_on": now, "updated_on": now}
+            for status in reversed(history)
+        ],
+    }
+
+
+def _project_summary(order: dict) -> dict:
+    # What $project with ORDER_SUMMARY_PROJECTION returns for an order.
+    summary = {
+        key: order[key]
+        for key in pipelines.ORDER_SUMMARY_PROJECTION
+        if "." not in key and key in order
+    }
+    summary["_id"] = order["_id"]
+    summary["order_status"] = order["order_status"][:1]
+    summary["location"] = {
+        key: order["location"][key]
+        for key in ("nickname", "location")
+        if key in order["location"]
+    }
+    return summary
+
+
+def _group(documents):
+    # What the status/date/time slot $group returns.
+    groups = {}
+    for document in documents:
+        key = (
+            document["order_status"][0]["status"],
+            document["pickup_date_time"]["date"],
+            document["time_slot"],
+        )
+        groups.setdefault(key, []).append(document)
+    return [
+        {
+            "_id": {"latest_status": status, "pick_up_date": date, "time_slot": slot},
+            "orders": orders,
+        }
+        for (status, date, slot), orders in groups.items()
+    ]
+
+
+def _respond(grouped_orders, order_model) -> bytes:
+    grouped_orders = fetch_orders_service._parse_grouped_orders(
+        grouped_orders, order_model
+    )
+    grouped_dict = fetch_orders_service._group_by_status_and_date_and_time_slot(
+        grouped_orders
+    )
+    response = FetchOrdersResponse(
+        data=fetch_orders_service._construct_fetch_order_response(
+            grouped_dict, STATUSES
+        )
+    )
+    return response.model_dump_json(by_alias=True).encode()
+
+
+async def _fetch_grouped(service_location_id, summary: bool):
+    pipeline = pipelines.get_pipeline_orders_group_by_status_and_date_and_time_slot_for_service_location_ids(
+        [service_location_id],
+        STATUSES,
+        pipelines.ORDER_SUMMARY_PROJECTION if summary else None,
+    )
+    return await db[BENCHMARK_COLLECTION].aggregate(pipeline).to_list(None)
+
+
+async def _measure(
+    orders, service_location_id, summary: bool, rounds: int, mongo: bool
+):
+    order_model = OrderSummaryVo if summary else OrderVo
+    stats = LatencyStats(max_samples=rounds)
+    wire_bytes = response_bytes = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        if mongo:
+            grouped_orders = await _fetch_grouped(service_location_id, summary)
+        else:
+            documents = orders
+            if summary:
+                documents = [_project_summary(order) for order in orders]
+            grouped_orders = _group(documents)
+        fetched = time.perf_counter()
+        # Measured before the orders are read into models, outside the timing.
+        wire_bytes = sum(len(bson.encode(group)) for group in grouped_orders)
+        responding = time.perf_counter()
+        response_bytes = len(_respond(grouped_orders, order_model))
+        stats.record(fetched - start + time.perf_counter() - responding)
+    return wire_bytes, response_bytes, stats.snapshot()
+
+
+# Payload size and latency of the agent order list with full orders against the
+# summary projection. Without --mongo the aggregation output is built in
+# process, so only model validation and serialization are timed.
+async def benchmark(order_counts, rounds: int, mongo: bool):
+    collection = db[BENCHMARK_COLLECTION]
+    try:
+        for order_count in order_counts:
+            service_location_id = ObjectId()
+            orders = [_random_order(service_location_id) for _ in range(order_count)]
+            if mongo:
+                await collection.drop()
+                await collection.insert_many(orders)
+
+            print(f"{order_count} orders per agent, {rounds} rounds")
+            for summary in (False, True):
+                wire_bytes, response_bytes, latency = await _measure(
+                    orders, service_location_id, summary, rounds, mongo
+                )
+                print(
+                    f"  {'summary' if summary else 'full':>7}: "
+                    f"mongo {wire_bytes / 1024:9.1f}KB, "
+                    f"response {response_bytes / 1024:9.1f}KB, "
+                    f"p50 {latency['p50_ms']:8.2f}ms, p95 {latency['p95_ms']:8.2f}ms"
+                )
+    finally:
+        if mongo:
+            await collection.drop()
+
+
+parser = argparse.ArgumentParser(
+    description="Benchmark full versus summary orders in the agent order lists"
+)
+parser.add_argument("--orders", type=int, nargs="+", default=[100, 1000, 10000])
+parser.add_argument("--rounds", type=int, default=20)
+parser.add_argument(
+    "--mongo", action="store_true", help="run the aggregation against mongo"
+)
+args = parser.parse_args()
+
+asyncio.run(benchmark(args.orders, args.rounds, args.mongo))
@@ -0,0 +1,31 @@
+import argparse
+import asyncio
+
+from irony import cache
+from irony.util import redis_cache
+
+
+# Run after editing call_to_action, service, message_config, config,
+# service_locations or prices documents by hand, every worker reloads the
+# bumped collections within a second.
+async def bump_cache(collections):
+    try:
+        await cache.bump(*collections)
+        print(f"Bumped cache for {collections}")
+    finally:
+        await redis_cache.close()
+
+
+parser = argparse.ArgumentParser(description="Reload cached collections on all workers")
+parser.add_argument(
+    "collections",
+    nargs="*",
+    help=f"Collections to reload, all when none are given: {', '.join(cache.LOADERS)}",
+)
+args = parser.parse_args()
+# Checked here, argparse also tests an empty list against choices.
+unknown = set(args.collections) - set(cache.LOADERS)
+if unknown:
+    parser.error(f"unknown collections: {', '.join(sorted(unknown))}")
+
+asyncio.run(bump_cache(args.collections or list(cache.LOADERS)))
@@ -0,0 +1,33 @@
+import argparse
+import asyncio
+import sys
+
+from irony.util import index_manager
+from irony.util import pipelines  # registers the indexes and queries
+
+
+# Creates all registered indexes and, with --verify, explains every registered
+# query. Exits with status 1 on a failed index or a COLLSCAN, so it can gate deploys.
+async def ensure_indexes(verify: bool):
+    failed_indexes = await index_manager.ensure_indexes()
+    for collection, names in failed_indexes.items():
+        print(f"Failed to create indexes on {collection}: {names}")
+
+    failed_queries = {}
+    if verify:
+        failed_queries = await index_manager.verify_query_plans(raise_on_collscan=False)
+        for name, problems in failed_queries.items():
+            print(f"{name}: {problems}")
+
+    if failed_indexes or failed_queries:
+        sys.exit(1)
+    print("All indexes present and registered queries use them")
+
+
+parser = argparse.ArgumentParser(description="Create and verify Mongo indexes")
+parser.add_argument(
+    "--verify", action="store_true", help="explain() registered queries"
+)
+args = parser.parse_args()
+
+asyncio.run(ensure_indexes(args.verify))
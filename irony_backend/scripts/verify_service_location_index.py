@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import random
+import sys
+
+from irony import cache
+from irony.util import service_location_index
+
+# $geoNear and the index compute distances slightly differently, locations this
+# close to a boundary may fall on either side of it.
+DISTANCE_TOLERANCE_METERS = 1.0
+
+
+def _is_borderline(service_location, max_distance: float) -> bool:
+    limit = min(max_distance, service_location.range)
+    return abs(service_location.distance - limit) <= DISTANCE_TOLERANCE_METERS
+
+
+def _compare(index_result, db_result, max_distance: float):
+    problems = []
+    for delivery_type in set(index_result) | set(db_result):
+        from_index = {
+            service_location.id: service_location
+            for service_location in index_result.get(delivery_type, [])
+        }
+        from_db = {
+            service_location.id: service_location
+            for service_location in db_result.get(delivery_type, [])
+        }
+        for missing_id in from_db.keys() - from_index.keys():
+            if not _is_borderline(from_db[missing_id], max_distance):
+                problems.append(f"{delivery_type}: {missing_id} missing from index")
+        for extra_id in from_index.keys() - from_db.keys():
+            if not _is_borderline(from_index[extra_id], max_distance):
+                problems.append(f"{delivery_type}: {extra_id} not returned by mongo")
+        for common_id in from_index.keys() & from_db.keys():
+            difference = abs(from_index[common_id].distance - from_db[common_id].distance)
+            if difference > DISTANCE_TOLERANCE_METERS:
+                problems.append(
+                    f"{delivery_type}: {common_id} distance differs by {difference:.2f}m"
+                )
+    return problems
+
+
+# Uses the $geoNear pipeline as the oracle for the in-memory index: queries
+# around randomly picked active service locations and compares both answers.
+async def verify(samples: int, max_distance: float, jitter: float):
+    index = (await cache.load_service_locations())["service_location_index"]
+    if not len(index):
+        print("No active service locations to verify against")
+        return
+
+    failures = 0
+    for _ in range(samples):
+        origin = random.choice(index.service_locations)
+        coordinates = [
+            origin.coords.coordinates[0] + random.uniform(-jitter, jitter),
+            origin.coords.coordinates[1] + random.uniform(-jitter, jitter),
+        ]
+        service_ids = random.sample(
+            origin.service_ids or [], k=min(len(origin.service_ids or []), 2)
+        )
+        time_slot = random.choice(origin.time_slots or [""])
+
+        index_result = service_location_index.group_by_delivery_type(
+            index.nearby(coordinates, service_ids, time_slot, max_distance)
+        )
+        db_result = await service_location_index.find_nearby_from_db(
+            coordinates, service_ids, time_slot, max_distance
+        )
+        problems = _compare(index_result, db_result, max_distance)
+        if problems:
+            failures += 1
+            print(f"Mismatch at {coordinates} {service_ids} {time_slot}: {problems}")
+
+    print(f"Verified {samples} lookups over {len(index)} locations, {failures} mismatched")
+    if failures:
+        sys.exit(1)
+
+
+parser = argparse.ArgumentParser(
+    description="Compare the in-memory service location index with $geoNear"
+)
+parser.add_argument("--samples", type=int, default=500)
+parser.add_argument("--max-distance", type=float, default=2000)
+parser.add_argument(
+    "--jitter", type=float, default=0.02, help="degrees around each location"
+)
+args = parser.parse_args()
+
+asyncio.run(verify(args.samples, args.max_distance, args.jitter))